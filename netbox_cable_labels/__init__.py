@@ -30,13 +30,33 @@ class AutoCableLabelsConfig(PluginConfig):
 
     # Plugin settings
     required_settings = []
-    default_settings = {"label_template": "#{{cable.pk}}"}
+    default_settings = {
+        "label_template": "#{{cable.pk}}",
+        "template_rules": [],
+        "defer_labeling": False,
+        "defer_bulk_imports": True,
+        "relabel_on_change": True,
+        "render_timeout": 1.0,
+        "render_query_limit": 50,
+        "max_loop_iterations": 100,
+        "max_label_length": 100,
+        "unique_labels": None,
+        "on_collision": "report",
+        "sequence_block_size": 20,
+        "template_check_interval": 5,
+        "render_cache": False,
+        "render_cache_ttl": 3600,
+    }
 
     def ready(self):
         """Perform plugin initialization tasks when Django is ready."""
         super().ready()
         # Import signals to register them
         from netbox_cable_labels import signals  # pylint: disable=unused-import,import-outside-toplevel
+        from netbox_cable_labels.utils import get_configured_dispatch_table  # pylint: disable=import-outside-toplevel
+
+        # Compile the template rules now, so that invalid rules are reported at startup
+        get_configured_dispatch_table()
 
 
 config = AutoCableLabelsConfig
@@ -0,0 +1,128 @@
+"""Static analysis of label templates."""
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+from jinja2 import nodes
+
+from .context import VARIABLE_PATHS
+from .utils import get_dispatch_table, parse_template
+
+# Template variables whose attributes are tracked, with the path they stand for relative to the cable
+ROOTS: dict[str, tuple[str, ...]] = VARIABLE_PATHS
+
+# Methods and filters that select items from a collection without changing what is read from them
+ACCESSORS = frozenset({"first", "last", "all"})
+
+# Cable attributes holding the termination objects of each side
+TERMINATION_SIDES = frozenset({"a_terminations", "b_terminations"})
+
+
+@dataclass(frozen=True)
+class TemplateDependencies:
+    """Attribute paths read by a template, relative to the cable.
+
+    `paths` holds one tuple per attribute chain, e.g. `cable.a_terminations.first().device.name`
+    is recorded as `("a_terminations", "device", "name")`.
+    """
+
+    paths: frozenset[tuple[str, ...]]
+
+    @property
+    def uses_pk(self) -> bool:
+        """Whether the rendered label depends on the primary key of the cable."""
+        return any(not path or path[0] in ("pk", "id") for path in self.paths)
+
+    @property
+    def cable_paths(self) -> frozenset[tuple[str, ...]]:
+        """Paths read from the cable itself, excluding its terminations."""
+        return frozenset(path for path in self.paths if path and path[0] not in TERMINATION_SIDES)
+
+    @property
+    def termination_paths(self) -> frozenset[tuple[str, ...]]:
+        """Paths read from termination objects, relative to the termination."""
+        return frozenset(path[1:] for path in self.paths if path and path[0] in TERMINATION_SIDES)
+
+    @property
+    def uses_terminations(self) -> bool:
+        """Whether the template reads the terminations of the cable."""
+        return any(path and path[0] in TERMINATION_SIDES for path in self.paths)
+
+
+class _DependencyVisitor:
+    """Collect the attribute chains of a parsed template rooted at one of the ROOTS."""
+
+    def __init__(self):
+        self.aliases = dict(ROOTS)
+        self.paths: set[tuple[str, ...]] = set()
+
+    def resolve(self, node) -> tuple[str, ...] | None:
+        """Return the path an expression reads, or None if it is not rooted at a tracked variable."""
+        if isinstance(node, nodes.Name):
+            return self.aliases.get(node.name)
+        if isinstance(node, nodes.Getattr):
+            base = self.resolve(node.node)
+            return None if base is None else base + (node.attr,)
+        if isinstance(node, nodes.Getitem):
+            base = self.resolve(node.node)
+            if base is not None and isinstance(node.arg, nodes.Const) and isinstance(node.arg.value, str):
+                return base + (node.arg.value,)
+            return base
+        if isinstance(node, nodes.Call | nodes.Filter) and node.node is not None:
+            return self.resolve(node.node)
+        return None
+
+    def visit(self, node):
+        if isinstance(node, nodes.Assign):
+            self._visit_aliased(node.target, node.node)
+        elif isinstance(node, nodes.For):
+            self._visit_aliased(node.target, node.iter)
+            for child in (node.test, *node.body, *node.else_):
+                if child is not None:
+                    self.visit(child)
+        elif isinstance(node, nodes.Expr) and (path := self.resolve(node)) is not None:
+            self.paths.add(tuple(part for part in path if part not in ACCESSORS))
+            self._visit_arguments(node)
+        else:
+            for child in node.iter_child_nodes():
+                self.visit(child)
+
+    def _visit_aliased(self, target, value):
+        """Record a variable standing for a tracked path; what is read from it is recorded where it is used."""
+        if isinstance(target, nodes.Name) and (path := self.resolve(value)) is not None:
+            self.aliases[target.name] = path
+            self._visit_arguments(value)
+        else:
+            self.visit(value)
+
+    def _visit_arguments(self, node):
+        """Visit the expressions passed to calls, filters and subscripts along a resolved chain."""
+        while node is not None:
+            if isinstance(node, nodes.Call | nodes.Filter):
+                for child in (*node.args, *node.kwargs, node.dyn_args, node.dyn_kwargs):
+                    if child is not None:
+                        self.visit(child)
+            elif isinstance(node, nodes.Getitem):
+                self.visit(node.arg)
+            node = getattr(node, "node", None)
+
+
+@lru_cache(maxsize=32)
+def analyze_template(label_template: str) -> TemplateDependencies:
+    """Return the attribute paths read by a template string."""
+    visitor = _DependencyVisitor()
+    visitor.visit(parse_template(label_template))
+    return TemplateDependencies(paths=frozenset(visitor.paths))
+
+
+@lru_cache(maxsize=8)
+def combine_dependencies(label_templates: tuple[str, ...]) -> TemplateDependencies:
+    """Return the attribute paths read by any of several template strings."""
+    return TemplateDependencies(
+        paths=frozenset().union(*(analyze_template(label_template).paths for label_template in label_templates))
+    )
+
+
+def get_template_dependencies() -> TemplateDependencies:
+    """Return the attribute paths read by the configured label templates, whichever rule selects them."""
+    return combine_dependencies(get_dispatch_table().templates)
@@ -0,0 +1,45 @@
+from jinja2 import TemplateSyntaxError
+from rest_framework import serializers
+
+from netbox_cable_labels.bulk import DEFAULT_BATCH_SIZE
+from netbox_cable_labels.utils import compile_template
+
+
+class LabelCablesJobSerializer(serializers.Serializer):
+    """Parameters of a LabelCablesJob."""
+
+    start = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    end = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    batch_size = serializers.IntegerField(required=False, default=DEFAULT_BATCH_SIZE, min_value=1)
+    schedule_at = serializers.DateTimeField(required=False, allow_null=True)
+    interval = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+
+    def validate(self, data):
+        if data.get("start") and data.get("end") and data["start"] > data["end"]:
+            raise serializers.ValidationError({"end": "Must be greater than or equal to start."})
+        return data
+
+
+class RenderLabelsSerializer(serializers.Serializer):
+    """Parameters of a request rendering the labels of a selection of cables."""
+
+    cables = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+    filters = serializers.DictField(required=False)
+    template = serializers.CharField(required=False, trim_whitespace=False)
+    apply = serializers.BooleanField(required=False, default=False)
+    overwrite = serializers.BooleanField(required=False, default=False)
+    batch_size = serializers.IntegerField(required=False, default=DEFAULT_BATCH_SIZE, min_value=1)
+
+    def validate_template(self, value):
+        try:
+            compile_template(value)
+        except TemplateSyntaxError as exc:
+            raise serializers.ValidationError(f"Invalid template: {exc}") from exc
+        return value
+
+    def validate(self, data):
+        if "cables" not in data and "filters" not in data:
+            raise serializers.ValidationError("Select cables with cables, filters or both.")
+        if data["apply"] and "template" in data:
+            raise serializers.ValidationError({"template": "A template override can only be previewed."})
+        return data
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path("render/", views.RenderLabelsView.as_view(), name="render_labels"),
+    path("jobs/", views.LabelCablesJobView.as_view(), name="label_cables_job"),
+]
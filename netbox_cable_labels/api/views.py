@@ -0,0 +1,119 @@
+import json
+from dataclasses import asdict
+from itertools import chain
+
+from core.api.serializers import JobSerializer
+from dcim.filtersets import CableFilterSet
+from dcim.models import Cable
+from django.db.models import F, Q
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from netbox_cable_labels.bulk import LabelRenderError, apply_labels, preview_labels
+from netbox_cable_labels.jobs import LabelCablesJob
+from netbox_cable_labels.uniqueness import LabelCollisionError
+
+from .serializers import LabelCablesJobSerializer, RenderLabelsSerializer
+
+
+class LabelCablesJobView(APIView):
+    """Enqueue a background job labeling the cables which have no label."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get_view_name(self):
+        return "Label Cables Job"
+
+    def post(self, request):
+        if not request.user.has_perm("dcim.change_cable"):
+            raise PermissionDenied("This user does not have permission to change cables.")
+
+        serializer = LabelCablesJobSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = LabelCablesJob.enqueue(user=request.user, **serializer.validated_data)
+
+        return Response(JobSerializer(job, context={"request": request}).data, status=status.HTTP_202_ACCEPTED)
+
+
+class RenderLabelsView(APIView):
+    """
+    Render the labels of a selection of cables, and optionally store them in one transaction.
+
+    The response is streamed as a JSON object: the labels under "results", then the label
+    collisions and the error which interrupted rendering, if any.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get_view_name(self):
+        return "Render Labels"
+
+    def post(self, request):
+        serializer = RenderLabelsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        action = "change" if data["apply"] else "view"
+        if not request.user.has_perm(f"dcim.{action}_cable"):
+            raise PermissionDenied(f"This user does not have permission to {action} cables.")
+        queryset = self.get_queryset(request.user, action, data)
+
+        collisions = []
+        try:
+            if data["apply"]:
+                batches = iter([apply_labels(queryset, data["batch_size"], user=request.user, collisions=collisions)])
+            else:
+                batches = preview_labels(
+                    queryset,
+                    data["batch_size"],
+                    values=True,
+                    collisions=collisions,
+                    label_template=data.get("template"),
+                )
+            # Render the first batch before streaming, so that errors it raises are reported with a 400
+            first = next(batches, [])
+        except (LabelRenderError, LabelCollisionError) as exc:
+            raise ValidationError(str(exc)) from exc
+
+        return StreamingHttpResponse(
+            stream_labels(chain([first], batches), collisions, data["apply"]), content_type="application/json"
+        )
+
+    @staticmethod
+    def get_queryset(user, action, data):
+        """
+        Return the selected cables the user is allowed to `action`, in primary key order.
+
+        Unless `overwrite` is set, labels are only applied to the cables without a label or
+        whose label is the one last generated, so that labels edited by hand are kept.
+        """
+        queryset = Cable.objects.restrict(user, action).order_by("pk")
+        if data["apply"] and not data["overwrite"]:
+            queryset = queryset.filter(Q(label="") | Q(label_fingerprint__label=F("label")))
+        if "cables" in data:
+            queryset = queryset.filter(pk__in=data["cables"])
+        if "filters" in data:
+            filterset = CableFilterSet(data["filters"], queryset)
+            if not filterset.is_valid():
+                raise ValidationError({"filters": filterset.errors})
+            queryset = filterset.qs
+        return queryset
+
+
+def stream_labels(batches, collisions, applied):
+    """Yield the JSON response of RenderLabelsView chunk by chunk, one chunk per batch of labels."""
+    yield f'{{"applied": {json.dumps(applied)}, "results": ['
+    separator, error = "", None
+    try:
+        for previews in batches:
+            if previews:
+                yield separator + ", ".join(json.dumps(preview._asdict()) for preview in previews)
+                separator = ", "
+    except (LabelRenderError, LabelCollisionError) as exc:
+        error = str(exc)
+    collisions = json.dumps([asdict(collision) for collision in collisions])
+    yield f'], "collisions": {collisions}, "error": {json.dumps(error)}}}'
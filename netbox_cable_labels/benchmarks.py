@@ -0,0 +1,280 @@
+"""
+Benchmarks of label rendering, of the save signals and of bulk label generation.
+
+Every benchmark runs on synthetic cables created inside a transaction which is rolled
+back once it completes, so they can be pointed at any database NetBox is configured with.
+"""
+
+import platform
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from statistics import mean
+
+import django
+from dcim.models import Device, DeviceRole, DeviceType, Interface, Manufacturer, Rack, Site
+from dcim.models.cables import Cable, CableTermination
+from django.db import connection, transaction
+from django.db.models.signals import post_save, pre_save
+
+from . import __version__, signals
+from .bulk import DEFAULT_BATCH_SIZE, iter_batches, label_cables, unlabeled_cables
+from .utils import clear_template_cache, render_label
+
+# Templates documented in TEMPLATES.md, keyed by their section
+TEMPLATE_EXAMPLES = {
+    "default": "#{{cable.pk}}",
+    "tia_606_c_basic": "{{cable.a_terminations.first().device.site.name}}-{{cable.a_terminations.first().device.name}}/{{cable.b_terminations.first().device.site.name}}-{{cable.b_terminations.first().device.name}}/{{cable.type|default('CAT6')}}/{{cable.pk}}",
+    "rack_based": "{{cable.a_terminations.first().device.rack.name}}-{{cable.a_terminations.first().device.position}}{{cable.a_terminations.first().device.face|first|upper}}/{{cable.b_terminations.first().device.rack.name}}-{{cable.b_terminations.first().device.position}}{{cable.b_terminations.first().device.face|first|upper}}/{{cable.type|default('UTP')}}/C{{'{:05d}'.format(cable.pk)}}",
+    "detailed_location": "{%- set a_term = cable.a_terminations.first() -%}{%- set b_term = cable.b_terminations.first() -%}{{a_term.device.site.name|upper}}-{{a_term.device.rack.name ~ ':' ~ a_term.device.name}}-{{a_term.name}}/{{b_term.device.site.name|upper}}-{{b_term.device.rack.name ~ ':' ~ b_term.device.name}}-{{b_term.name}}{%- if cable.length %}/{{cable.length}}m{% endif %}/ID{{'{:06d}'.format(cable.pk)}}",
+    "simple_dc": "{{cable.a_terminations.first().device.name}}-{{cable.a_terminations.first().name}} to {{cable.b_terminations.first().device.name}}-{{cable.b_terminations.first().name}}",
+    "patch_panel": "{% set a = cable.a_terminations.first() %}{% set b = cable.b_terminations.first() %}PP{{a.device.rack.name}}-{{a.name}} / PP{{b.device.rack.name}}-{{b.name}} / {{cable.color|default('BLU')|upper|truncate(3,True,'')}}",
+    "structured_cabling": "{{cable.a_terminations.first().device.location.name|default(cable.a_terminations.first().device.site.name)}}.{{cable.a_terminations.first().device.name}}.{{cable.a_terminations.first().name}}--{{cable.b_terminations.first().device.location.name|default(cable.b_terminations.first().device.site.name)}}.{{cable.b_terminations.first().device.name}}.{{cable.b_terminations.first().name}}",
+    "fiber_optic": "{% if 'fiber' in cable.type|lower or 'sm' in cable.type|lower or 'mm' in cable.type|lower %}FO-{% endif %}{{cable.a_terminations.first().device.rack.name}}-{{cable.a_terminations.first().name}}/{{cable.b_terminations.first().device.rack.name}}-{{cable.b_terminations.first().name}}/{{cable.type|upper}}/{{cable.color|default('YEL')|upper}}",
+    "termination_shortcuts": "{{a_rack.name}}-{{a_device.position}}{{a_device.face|first|upper}}/{{b_rack.name}}-{{b_device.position}}{{b_device.face|first|upper}}/C{{'{:05d}'.format(cable.pk)}}",
+}
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+# Interfaces created per synthetic device
+INTERFACES_PER_DEVICE = 1000
+
+
+@contextmanager
+def rolled_back() -> Iterator[None]:
+    """Run the block in a transaction (or savepoint) which is always rolled back."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+class QueryCounter:
+    """Database execute wrapper counting the queries issued on the default connection."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """Count the queries issued on the default connection within the block."""
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        yield counter
+
+
+class Fixtures:
+    """Synthetic devices and interfaces, connected by cables created in bulk or saved one by one."""
+
+    def __init__(self):
+        prefix = f"benchmark-{uuid.uuid4().hex[:8]}"
+        self.prefix = prefix
+        self.site = Site.objects.create(name=prefix, slug=prefix)
+        manufacturer = Manufacturer.objects.create(name=prefix, slug=prefix)
+        self.role = DeviceRole.objects.create(name=prefix, slug=prefix)
+        self.device_type = DeviceType.objects.create(manufacturer=manufacturer, model=prefix, slug=prefix)
+        self.rack = Rack.objects.create(name=prefix, site=self.site)
+        self.devices = 0
+
+    def create_interface_pairs(self, count: int) -> Iterator[tuple[list[Interface], list[Interface]]]:
+        """Yield lists of interfaces of an A side and a B side device, `count` pairs overall."""
+        for offset in range(0, count, INTERFACES_PER_DEVICE):
+            size = min(INTERFACES_PER_DEVICE, count - offset)
+            sides = []
+            for _side in "ab":
+                self.devices += 1
+                device = Device.objects.create(
+                    name=f"{self.prefix}-{self.devices}",
+                    device_type=self.device_type,
+                    role=self.role,
+                    site=self.site,
+                    rack=self.rack,
+                )
+                sides.append(
+                    Interface.objects.bulk_create(
+                        Interface(device=device, name=f"eth{index}", type="1000base-t") for index in range(size)
+                    )
+                )
+            yield sides[0], sides[1]
+
+    def create_unlabeled_cables(self, count: int) -> tuple[int, int]:
+        """
+        Create `count` unlabeled cables in bulk, bypassing Cable.save() and path tracing.
+
+        Returns the first and last primary keys of the cables created.
+        """
+        pks = []
+        for a_interfaces, b_interfaces in self.create_interface_pairs(count):
+            cables = Cable.objects.bulk_create(Cable(label="") for _ in a_interfaces)
+            terminations = []
+            for cable, a_interface, b_interface in zip(cables, a_interfaces, b_interfaces, strict=True):
+                terminations += [
+                    CableTermination(cable=cable, cable_end="A", termination=a_interface),
+                    CableTermination(cable=cable, cable_end="B", termination=b_interface),
+                ]
+            for termination in terminations:
+                termination.cache_related_objects()
+            CableTermination.objects.bulk_create(terminations)
+            pks += [cable.pk for cable in cables]
+        return min(pks), max(pks)
+
+
+def benchmark_render(iterations: int = 100) -> list[dict]:
+    """
+    Time render_label() with every template of TEMPLATE_EXAMPLES.
+
+    The cold render includes compiling the template; the warm time is the mean over
+    `iterations` renders of an already compiled template. Each template is passed to
+    render_label() explicitly, so that neither an active LabelTemplate version nor the
+    template rules replace it. The cable is loaded with the template's prefetch plan,
+    as in bulk generation.
+    """
+    results = []
+    with rolled_back():
+        start, end = Fixtures().create_unlabeled_cables(1)
+        for name, label_template in TEMPLATE_EXAMPLES.items():
+            result = {"template": name}
+            try:
+                cable = next(iter_batches(unlabeled_cables(start, end), 1, label_template))[0]
+                clear_template_cache()
+                started = time.perf_counter()
+                render_label(cable, label_template)
+                result["cold_ms"] = (time.perf_counter() - started) * 1000
+                timings = []
+                with count_queries() as queries:
+                    for _ in range(iterations):
+                        started = time.perf_counter()
+                        render_label(cable, label_template)
+                        timings.append(time.perf_counter() - started)
+                result["warm_ms"] = mean(timings) * 1000
+                result["queries_per_render"] = queries.count / iterations
+            except Exception as exc:  # noqa: BLE001
+                result["error"] = f"{type(exc).__name__}: {exc}"
+            results.append(result)
+    return results
+
+
+def _time_saves(fixtures: Fixtures, count: int) -> tuple[float, int]:
+    (a_interfaces, b_interfaces), *_ = fixtures.create_interface_pairs(count)
+    with count_queries() as queries:
+        started = time.perf_counter()
+        for a_interface, b_interface in zip(a_interfaces, b_interfaces, strict=True):
+            Cable(a_terminations=[a_interface], b_terminations=[b_interface]).save()
+        elapsed = time.perf_counter() - started
+    return elapsed / count * 1000, queries.count / count
+
+
+def benchmark_save(count: int = 100) -> dict:
+    """
+    Measure the overhead the plugin's receivers add to Cable.save(), with the configured template.
+
+    `count` cables are saved with the receivers disconnected, then as many with them connected.
+    """
+    count = min(count, INTERFACES_PER_DEVICE)
+    with rolled_back():
+        fixtures = Fixtures()
+        receivers = ((pre_save, signals.handle_cable_label), (post_save, signals.handle_new_cable_label))
+        for signal, receiver in receivers:
+            signal.disconnect(receiver, sender=Cable)
+        try:
+            baseline_ms, baseline_queries = _time_saves(fixtures, count)
+        finally:
+            for signal, receiver in receivers:
+                signal.connect(receiver, sender=Cable)
+        labeled_ms, labeled_queries = _time_saves(fixtures, count)
+    return {
+        "saves": count,
+        "baseline_ms": baseline_ms,
+        "labeled_ms": labeled_ms,
+        "overhead_ms": labeled_ms - baseline_ms,
+        "overhead_queries": labeled_queries - baseline_queries,
+    }
+
+
+def benchmark_generate(sizes=DEFAULT_SIZES, batch_size: int = DEFAULT_BATCH_SIZE) -> list[dict]:
+    """
+    Time the bulk labeling performed by `generate_labels` over synthetic sets of cables.
+
+    Each size is labeled with label_cables(), the loop behind the command, from freshly
+    created unlabeled cables.
+    """
+    results = []
+    for size in sizes:
+        with rolled_back():
+            start, end = Fixtures().create_unlabeled_cables(size)
+            labeled = 0
+            with count_queries() as queries:
+                started = time.perf_counter()
+                for batch in label_cables(unlabeled_cables(start, end), batch_size=batch_size):
+                    labeled += len(batch)
+                elapsed = time.perf_counter() - started
+        results.append(
+            {
+                "cables": size,
+                "labeled": labeled,
+                "seconds": elapsed,
+                "cables_per_second": labeled / elapsed if elapsed else 0.0,
+                "queries": queries.count,
+                "queries_per_cable": queries.count / labeled if labeled else 0.0,
+            }
+        )
+    return results
+
+
+def run_benchmarks(
+    sizes=DEFAULT_SIZES, iterations: int = 100, saves: int = 100, batch_size: int = DEFAULT_BATCH_SIZE
+) -> dict:
+    """Run every benchmark and return the report."""
+    return {
+        "environment": {
+            "plugin_version": __version__,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "timestamp": datetime.now(UTC).isoformat(),
+        },
+        "render": benchmark_render(iterations),
+        "save": benchmark_save(saves),
+        "generate": benchmark_generate(sizes, batch_size),
+    }
+
+
+def compare_reports(baseline: dict, report: dict, threshold: float = 0.1) -> list[str]:
+    """
+    Return the measurements of `report` which regressed by more than `threshold` from `baseline`.
+
+    Timings and query counts regress when they grow, throughputs when they shrink.
+    """
+    measurements = []
+    baseline_render = {result["template"]: result for result in baseline.get("render", [])}
+    for result in report.get("render", []):
+        previous = baseline_render.get(result["template"], {})
+        for key in ("cold_ms", "warm_ms", "queries_per_render"):
+            measurements.append((f"render {result['template']} {key}", previous.get(key), result.get(key), False))
+    for key in ("labeled_ms", "overhead_queries"):
+        measurements.append((f"save {key}", baseline.get("save", {}).get(key), report.get("save", {}).get(key), False))
+    baseline_generate = {result["cables"]: result for result in baseline.get("generate", [])}
+    for result in report.get("generate", []):
+        previous = baseline_generate.get(result["cables"], {})
+        for key, higher_is_better in (("cables_per_second", True), ("queries_per_cable", False)):
+            measurements.append(
+                (f"generate {result['cables']} {key}", previous.get(key), result.get(key), higher_is_better)
+            )
+
+    regressions = []
+    for name, previous, current, higher_is_better in measurements:
+        if previous is None or current is None:
+            continue
+        if previous:
+            change = (previous - current if higher_is_better else current - previous) / previous
+        else:
+            change = float("inf") if current > 0 and not higher_is_better else 0.0
+        if change > threshold:
+            regressions.append(f"{name}: {previous:.4g} -> {current:.4g} ({change:+.0%})")
+    return regressions
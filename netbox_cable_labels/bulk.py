@@ -0,0 +1,295 @@
+"""Batched label generation for large numbers of cables."""
+
+import uuid
+from collections.abc import Iterable, Iterator
+from functools import partial
+from itertools import islice
+from typing import NamedTuple
+
+from core.choices import ObjectChangeActionChoices
+from core.models import ObjectChange
+from dcim.models.cables import Cable
+from django.db import transaction
+from django.db.models import F, QuerySet
+
+from .metrics import preview_renders
+from .models import LabelFingerprint
+from .prefetch import get_prefetch_plan, prime_terminations
+from .render_cache import render_with_cache
+from .routing import DispatchTable
+from .sequences import SequencePreview, previewing
+from .uniqueness import Collision, cable_scopes, resolve_collisions
+from .utils import get_dispatch_table, get_template_fingerprint, render_label
+from .values import get_values_plan, iter_value_batches, update_labels
+
+# Number of cables read, rendered and written per transaction
+DEFAULT_BATCH_SIZE = 500
+
+
+class LabelRenderError(Exception):
+    """Raised when the label of a cable cannot be rendered."""
+
+    def __init__(self, cable: Cable):
+        self.cable = cable
+        super().__init__(f"Error while generating label for cable {cable}")
+
+
+class LabelPreview(NamedTuple):
+    """Label a cable would receive, next to its current one."""
+
+    cable_id: int
+    old_label: str
+    new_label: str
+
+
+def unlabeled_cables(start: int | None = None, end: int | None = None) -> QuerySet:
+    """Return the cables without a label, optionally within an inclusive range of primary keys."""
+    queryset = Cable.objects.filter(label="").order_by("pk")
+    if start is not None:
+        queryset = queryset.filter(pk__gte=start)
+    if end is not None:
+        queryset = queryset.filter(pk__lte=end)
+    return queryset
+
+
+def stale_cables(start: int | None = None, end: int | None = None) -> QuerySet:
+    """
+    Return the cables whose label was generated from another version of the template.
+
+    Labels edited since they were generated are left out.
+    """
+    queryset = (
+        Cable.objects.filter(label_fingerprint__label=F("label"))
+        .exclude(label_fingerprint__template_hash=get_template_fingerprint())
+        .order_by("pk")
+    )
+    if start is not None:
+        queryset = queryset.filter(pk__gte=start)
+    if end is not None:
+        queryset = queryset.filter(pk__lte=end)
+    return queryset
+
+
+def iter_batches(
+    queryset: QuerySet, batch_size: int = DEFAULT_BATCH_SIZE, label_template: str | None = None
+) -> Iterator[list[Cable]]:
+    """
+    Read cables from the queryset in lists of at most `batch_size` items.
+
+    The relations read by `label_template` (by default, any configured template) are
+    loaded with a fixed number of queries per batch, following its prefetch plan.
+    """
+    cables = get_prefetch_plan(label_template).apply(queryset).iterator(chunk_size=batch_size)
+    while batch := list(islice(cables, batch_size)):
+        prime_terminations(batch)
+        yield batch
+
+
+def _read_batches(queryset: QuerySet, label_template: str, batch_size: int, values: bool):
+    """Read cables rendered with `label_template`, as records if `values` is set and the template allows it."""
+    if values and (plan := get_values_plan(label_template)) is not None:
+        return iter_value_batches(queryset, plan, batch_size)
+    return iter_batches(queryset, batch_size, label_template)
+
+
+def iter_label_chunks(
+    queryset: QuerySet, batch_size: int = DEFAULT_BATCH_SIZE, values: bool = False, label_template: str | None = None
+) -> Iterator[list[tuple[str, list[Cable]]]]:
+    """
+    Read cables from the queryset in chunks of at most `batch_size` items, in primary key order.
+
+    Every chunk is a list of (template, cables) pairs, grouping its cables by the
+    template the rules select for them; each group is loaded following its own
+    template's plan. Set `values` to read records rather than model instances (see
+    netbox_cable_labels.values); templates which need model instances are always
+    read as cables. `label_template` replaces the configured templates and rules.
+    """
+    table = get_dispatch_table() if label_template is None else DispatchTable(label_template)
+    if not table.rules:
+        for batch in _read_batches(queryset, table.default, batch_size, values):
+            yield [(table.default, batch)]
+        return
+    pks = queryset.values_list("pk", flat=True).iterator(chunk_size=batch_size)
+    while chunk := list(islice(pks, batch_size)):
+        groups = []
+        for group_template, group in table.group(chunk).items():
+            group_queryset = Cable.objects.filter(pk__in=group).order_by("pk")
+            batches = _read_batches(group_queryset, group_template, batch_size, values)
+            groups += [(group_template, batch) for batch in batches]
+        yield groups
+
+
+def iter_label_batches(
+    queryset: QuerySet, batch_size: int = DEFAULT_BATCH_SIZE, values: bool = False, label_template: str | None = None
+) -> Iterator[tuple[str, list[Cable]]]:
+    """Read cables from the queryset in (template, cables) batches rendered with the same template."""
+    for chunk in iter_label_chunks(queryset, batch_size, values, label_template):
+        yield from chunk
+
+
+def _render(cable: Cable, label_template: str | None = None) -> str:
+    try:
+        return render_label(cable, label_template)
+    except Exception as exc:
+        raise LabelRenderError(cable) from exc
+
+
+def render_batch(cables: Iterable[Cable], snapshot: bool = False, label_template: str | None = None) -> list[Cable]:
+    """
+    Render labels in memory and return the cables whose label was set.
+
+    When `snapshot` is set, a pre-change snapshot is taken before the label is
+    assigned so that change records can be built afterwards. `label_template`
+    overrides the template selected for each cable; labels rendered with it are
+    shared through the render cache when enabled.
+    """
+    cables = list(cables)
+    if label_template is None:
+        labels = [_render(cable) for cable in cables]
+    else:
+        labels = render_with_cache(cables, label_template, lambda cable: _render(cable, label_template))
+    labeled = []
+    for cable, label in zip(cables, labels, strict=True):
+        if not label:
+            continue
+        if snapshot:
+            cable.snapshot()
+        cable.label = label
+        labeled.append(cable)
+    return labeled
+
+
+def save_batch(cables: list[Cable], user=None, request_id: uuid.UUID | None = None) -> list[Collision]:
+    """
+    Write the labels of `cables` with a single UPDATE statement and record their fingerprints.
+
+    `cables` are either Cable instances or records read by the values pipeline.
+
+    Save signals, path tracing and the regular change logging are bypassed. When
+    a `user` is given, one ObjectChange per cable is recorded in the same
+    transaction. Labels already used in their uniqueness scope are handled
+    following the `on_collision` setting; returns the collisions found.
+    """
+    if not cables:
+        return []
+    with transaction.atomic():
+        scopes = cable_scopes(cables)
+        pks, labels = [cable.pk for cable in cables], [cable.label for cable in cables]
+        labels, collisions = resolve_collisions(pks, labels, scopes)
+        for cable, label in zip(cables, labels, strict=True):
+            cable.label = label
+        if isinstance(cables[0], Cable):
+            Cable.objects.bulk_update(cables, ["label"])
+        else:
+            update_labels(cables)
+        record_fingerprints(cables, scopes=scopes)
+        if user is not None:
+            ObjectChange.objects.bulk_create(
+                _build_objectchange(cable, user, request_id or uuid.uuid4()) for cable in cables
+            )
+    return collisions
+
+
+def record_fingerprints(cables: Iterable[Cable], template_hash: str | None = None, scopes: list[str] | None = None):
+    """
+    Record the template version which generated the current label of `cables`.
+
+    `scopes` are the uniqueness scopes of the cables, read from the database if not given.
+    """
+    cables = list(cables)
+    template_hash = template_hash or get_template_fingerprint()
+    scopes = scopes if scopes is not None else cable_scopes(cables)
+    LabelFingerprint.objects.bulk_create(
+        [
+            LabelFingerprint(cable_id=cable.pk, template_hash=template_hash, label=cable.label, scope=scope)
+            for cable, scope in zip(cables, scopes, strict=True)
+        ],
+        update_conflicts=True,
+        unique_fields=["cable"],
+        update_fields=["template_hash", "label", "scope"],
+    )
+
+
+def _build_objectchange(cable: Cable, user, request_id: uuid.UUID) -> ObjectChange:
+    objectchange = cable.to_objectchange(ObjectChangeActionChoices.ACTION_UPDATE)
+    # bulk_create() skips ObjectChange.save(), which normally fills in user_name
+    objectchange.user = user
+    objectchange.user_name = user.username
+    objectchange.request_id = request_id
+    return objectchange
+
+
+def label_cables(
+    queryset: QuerySet,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    *,
+    user=None,
+    request_id: uuid.UUID | None = None,
+    values: bool = False,
+    collisions: list[Collision] | None = None,
+) -> Iterator[list[Cable]]:
+    """
+    Render and store labels for every cable in `queryset`, one transaction per batch.
+
+    Yields the cables labeled by each batch once it has been committed. Pass a
+    `user` to record an ObjectChange for every labeled cable. Set `values` to render
+    from flat value records rather than model instances; it is ignored with a `user`,
+    as change records need the instances. Label collisions are appended to `collisions`.
+    """
+    if user is not None and request_id is None:
+        request_id = uuid.uuid4()
+    for label_template, batch in iter_label_batches(queryset, batch_size, values=values and user is None):
+        labeled = render_batch(batch, snapshot=user is not None, label_template=label_template)
+        found = save_batch(labeled, user=user, request_id=request_id)
+        if collisions is not None:
+            collisions += found
+        yield labeled
+
+
+def apply_labels(
+    queryset: QuerySet,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    user=None,
+    collisions: list[Collision] | None = None,
+) -> list[LabelPreview]:
+    """
+    Render and store labels for every cable in `queryset` in a single transaction.
+
+    Unlike label_cables(), nothing is stored if any label fails to render or collides
+    under the "fail" policy. Returns the labels set, next to the labels they replaced.
+    """
+    with transaction.atomic():
+        old_labels = dict(queryset.values_list("pk", "label"))
+        return [
+            LabelPreview(cable.pk, old_labels[cable.pk], cable.label)
+            for labeled in label_cables(queryset, batch_size, user=user, collisions=collisions)
+            for cable in labeled
+        ]
+
+
+def preview_labels(
+    queryset: QuerySet,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    values: bool = False,
+    collisions: list[Collision] | None = None,
+    label_template: str | None = None,
+) -> Iterator[list[LabelPreview]]:
+    """
+    Render the labels of the cables in `queryset` without storing them.
+
+    Yields one list of previews per batch, so that memory use does not grow with
+    the size of the queryset. Previews go through the same collision handling as
+    stored labels, checked against the stored labels and the rest of their batch;
+    collisions are appended to `collisions`. `label_template` replaces the configured
+    templates and rules, to try out a template.
+    """
+    # Sequence counters are simulated: previews do not consume their values
+    sequences = SequencePreview()
+    for batch_template, batch in iter_label_batches(queryset, batch_size, values, label_template):
+        with previewing(sequences), preview_renders():
+            labels = render_with_cache(batch, batch_template, partial(_render, label_template=batch_template))
+        pks = [cable.pk for cable in batch]
+        labels, found = resolve_collisions(pks, labels, cable_scopes(batch))
+        if collisions is not None:
+            collisions += found
+        yield [LabelPreview(cable.pk, cable.label, label) for cable, label in zip(batch, labels, strict=True)]
@@ -0,0 +1,102 @@
+"""Variables exposed to label templates."""
+
+from functools import cached_property
+
+from dcim.models.cables import Cable
+
+# Template variables and the attribute path they stand for, relative to the cable
+VARIABLE_PATHS: dict[str, tuple[str, ...]] = {
+    "cable": (),
+    "a_terms": ("a_terminations",),
+    "b_terms": ("b_terminations",),
+    "a_term": ("a_terminations",),
+    "b_term": ("b_terminations",),
+    "a_device": ("a_terminations", "device"),
+    "b_device": ("b_terminations", "device"),
+    "a_rack": ("a_terminations", "device", "rack"),
+    "b_rack": ("b_terminations", "device", "rack"),
+    "a_location": ("a_terminations", "device", "location"),
+    "b_location": ("b_terminations", "device", "location"),
+    "a_site": ("a_terminations", "device", "site"),
+    "b_site": ("b_terminations", "device", "site"),
+}
+
+
+def _all(terminations) -> list:
+    if isinstance(terminations, list | tuple):
+        return list(terminations)
+    return list(terminations.all())
+
+
+def _first(terminations):
+    if isinstance(terminations, list | tuple):
+        return terminations[0] if terminations else None
+    return terminations.first()
+
+
+class LabelContext:
+    """
+    Lazily resolved template variables for a single render.
+
+    Every variable is looked up at most once, so templates can refer to `a_term`
+    or `a_device` repeatedly without issuing a query each time.
+    """
+
+    def __init__(self, cable: Cable):
+        self.cable = cable
+
+    def get_variables(self, names) -> dict:
+        """Return the values of the known variables among `names`."""
+        return {name: getattr(self, name) for name in names if name in VARIABLE_PATHS}
+
+    @cached_property
+    def a_terms(self) -> list:
+        return _all(self.cable.a_terminations)
+
+    @cached_property
+    def b_terms(self) -> list:
+        return _all(self.cable.b_terminations)
+
+    @cached_property
+    def a_term(self):
+        if "a_terms" in self.__dict__:
+            return self.a_terms[0] if self.a_terms else None
+        return _first(self.cable.a_terminations)
+
+    @cached_property
+    def b_term(self):
+        if "b_terms" in self.__dict__:
+            return self.b_terms[0] if self.b_terms else None
+        return _first(self.cable.b_terminations)
+
+    @cached_property
+    def a_device(self):
+        return getattr(self.a_term, "device", None)
+
+    @cached_property
+    def b_device(self):
+        return getattr(self.b_term, "device", None)
+
+    @cached_property
+    def a_rack(self):
+        return getattr(self.a_device, "rack", None)
+
+    @cached_property
+    def b_rack(self):
+        return getattr(self.b_device, "rack", None)
+
+    @cached_property
+    def a_location(self):
+        return getattr(self.a_device, "location", None)
+
+    @cached_property
+    def b_location(self):
+        return getattr(self.b_device, "location", None)
+
+    @cached_property
+    def a_site(self):
+        return getattr(self.a_device, "site", None)
+
+    @cached_property
+    def b_site(self):
+        return getattr(self.b_device, "site", None)
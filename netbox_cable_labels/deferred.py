@@ -0,0 +1,128 @@
+"""Deferred labeling of cables saved within a transaction."""
+
+import threading
+import weakref
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from functools import partial
+
+from dcim.models.cables import Cable
+from django.db import connections, transaction
+from django.db.models import F, Q
+from netbox.context import current_request
+
+from .bulk import label_cables
+from .utils import get_plugin_setting
+
+_local = threading.local()
+
+
+class _PendingBatch:
+    """Cables queued within one transaction, labeled by the on_commit callback holding the batch."""
+
+    def __init__(self):
+        self.pks: set[int] = set()
+
+
+def _get_batch(using: str) -> _PendingBatch:
+    """
+    Return the batch of the transaction in progress on the connection, starting one if needed.
+
+    A new batch registers its single on_commit callback. The thread only keeps a weak reference
+    to it: when the transaction, or the savepoint the callback was registered in, is rolled back,
+    Django drops the callback and the batch with it, and the next cable queued starts a new one.
+    """
+    if not hasattr(_local, "batches"):
+        _local.batches = {}
+    ref = _local.batches.get(using)
+    batch = ref() if ref is not None else None
+    if batch is None:
+        batch = _PendingBatch()
+        _local.batches[using] = weakref.ref(batch)
+        transaction.on_commit(partial(flush_pending_labels, batch, using), using=using, robust=True)
+    return batch
+
+
+@contextmanager
+def bulk_import() -> Iterator[None]:
+    """
+    Defer the labeling of the cables saved within the block to the commit of their transaction.
+
+    Applies whatever the `defer_labeling` setting, for scripts importing many cables at once.
+    Cable imports through NetBox's bulk import view are detected without it.
+    """
+    _local.importing = getattr(_local, "importing", 0) + 1
+    try:
+        yield
+    finally:
+        _local.importing -= 1
+
+
+def _is_bulk_import_request(request) -> bool:
+    # Imported here as the views pull in forms and tables, which are not loaded yet when signals are connected
+    from netbox.views.generic import BulkImportView  # pylint: disable=import-outside-toplevel
+
+    view_class = getattr(getattr(getattr(request, "resolver_match", None), "func", None), "view_class", None)
+    return request.method == "POST" and isinstance(view_class, type) and issubclass(view_class, BulkImportView)
+
+
+def bulk_import_active() -> bool:
+    """Whether cables are being saved by a bulk import, within bulk_import() or NetBox's bulk import view."""
+    if getattr(_local, "importing", 0):
+        return True
+    request = current_request.get()
+    return request is not None and bool(get_plugin_setting("defer_bulk_imports")) and _is_bulk_import_request(request)
+
+
+def deferral_enabled(using: str) -> bool:
+    """Whether labels of cables saved on the connection should be rendered on commit."""
+    if not connections[using].in_atomic_block:
+        return False
+    return bool(get_plugin_setting("defer_labeling")) or bulk_import_active()
+
+
+def defer_labels(pks: Iterable[int], using: str):
+    """
+    Queue saved cables to be labeled once the current transaction commits.
+
+    Outside of a transaction, they are labeled right away.
+    """
+    pks = set(pks)
+    if not pks:
+        return
+    if not connections[using].in_atomic_block:
+        label_pending_cables(pks)
+        return
+    _get_batch(using).pks.update(pks)
+
+
+def defer_label(pk: int, using: str):
+    """Queue a saved cable to be labeled once the current transaction commits."""
+    defer_labels([pk], using)
+
+
+def flush_pending_labels(batch: _PendingBatch, using: str = "default") -> int:
+    """
+    Label every cable of a committed transaction's batch, with one batched pass.
+
+    Cables left over by a rolled back savepoint are skipped unless their label still
+    needs generating.
+    """
+    batches = getattr(_local, "batches", {})
+    if (ref := batches.get(using)) is not None and ref() is batch:
+        del batches[using]
+    pks = list(batch.pks)
+    batch.pks.clear()
+    return label_pending_cables(pks) if pks else 0
+
+
+def label_pending_cables(pks: Iterable[int]) -> int:
+    """
+    Label the cables among `pks` which have no label or an automatically generated one.
+
+    Returns the number of cables labeled.
+    """
+    queryset = (
+        Cable.objects.filter(pk__in=pks).filter(Q(label="") | Q(label_fingerprint__label=F("label"))).order_by("pk")
+    )
+    return sum(len(labeled) for labeled in label_cables(queryset))
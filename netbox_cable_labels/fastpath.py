@@ -0,0 +1,354 @@
+"""
+Direct Python rendering of simple label templates, bypassing the Jinja2 runtime.
+
+Most label templates are concatenations of attribute paths with a few filters. Those
+are compiled into chains of closures which access attributes, call methods and apply
+filters through the sandboxed environment, with the same results as Jinja2, but without
+creating a template context and render generator per label. Repeated expressions, such
+as `cable.a_terminations.first()`, are evaluated once per label.
+
+Supported: template data, `{{ }}` output, `{% set name = ... %}`, `{% if %}`/`{% elif %}`/
+`{% else %}`, names, constants, attribute and item access (including slices), method calls,
+filters which take no context, `~`, `and`, `or`, `not`, comparisons and inline if expressions.
+Any other construct raises Unsupported at compile time, and the template is rendered by Jinja2.
+So do calls of global functions which take the context, such as `{{ counter() }}` if `counter`
+is decorated with `pass_context`. A context function only met while rendering, for instance as
+an attribute, has the whole label rendered again by Jinja2: the calls made before it, such as
+`next_sequence()`, run a second time, and the values they handed out are lost.
+"""
+
+import operator
+from collections.abc import Callable
+from typing import Any
+
+from jinja2 import Template, Undefined, nodes
+from jinja2.exceptions import SecurityError
+from jinja2.sandbox import SandboxedEnvironment
+from jinja2.utils import _PassArg
+
+from .sandbox import RenderBudget, generate_label
+
+_COMPARISONS = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "gteq": operator.ge,
+    "lt": operator.lt,
+    "lteq": operator.le,
+    "in": lambda left, right: left in right,
+    "notin": lambda left, right: left not in right,
+}
+
+_MISSING = object()
+
+# Maximum number of (type, attribute) pairs whose sandbox verdict is remembered
+ATTRIBUTE_CACHE_SIZE = 4096
+
+
+class Unsupported(Exception):
+    """Raised when a template uses a construct outside of the subset handled by the fast path."""
+
+
+class _Fallback(Exception):
+    """Raised while rendering when a value needs the full Jinja2 runtime, such as a context function."""
+
+
+class AttributeReader:
+    """
+    Read attributes with the verdicts of the sandboxed environment, remembered per type.
+
+    The sandbox decides whether an attribute may be read from the type of the object and
+    the attribute name only, so the check runs once per pair. Attributes which need the
+    sandbox at every access (refused or missing attributes, `str.format`, undefined values)
+    are read through the environment.
+    """
+
+    def __init__(self, environment: SandboxedEnvironment):
+        self.environment = environment
+        self.verdicts: dict[tuple[type, str], bool] = {}
+
+    def is_plain(self, obj, attribute: str) -> bool:
+        key = (type(obj), attribute)
+        verdict = self.verdicts.get(key)
+        if verdict is None:
+            if len(self.verdicts) >= ATTRIBUTE_CACHE_SIZE:
+                self.verdicts.clear()
+            verdict = self.verdicts[key] = not (
+                isinstance(obj, Undefined) or (isinstance(obj, str) and attribute in ("format", "format_map"))
+            ) and self.environment.is_safe_attribute(obj, attribute, None)
+        return verdict
+
+    def __call__(self, obj, attribute: str):
+        if self.is_plain(obj, attribute):
+            try:
+                return getattr(obj, attribute)
+            except AttributeError:
+                pass
+        return self.environment.getattr(obj, attribute)
+
+
+class _Frame:
+    """Variables and evaluated expressions of one render."""
+
+    __slots__ = ("memo", "variables")
+
+    def __init__(self, variables: dict):
+        self.variables = dict(variables)
+        self.memo: dict[int, Any] = {}
+
+
+Evaluator = Callable[[_Frame], Any]
+Statement = Callable[[_Frame, list], None]
+
+
+class FastPathCompiler:
+    """Compile the AST of a template within the supported subset into Python closures."""
+
+    def __init__(self, environment: SandboxedEnvironment, template: nodes.Template):
+        self.environment = environment
+        self.template = template
+        self.getattr = AttributeReader(environment)
+        # Expressions reading variables assigned by the template are not memoized
+        self.assigned = {
+            node.target.name for node in template.find_all(nodes.Assign) if isinstance(node.target, nodes.Name)
+        }
+        self.memo_keys: dict[str, int] = {}
+
+    def compile(self) -> Callable[[dict], str]:
+        """Return a function rendering the template from a dict of variables."""
+        statements = self.statements(self.template.body)
+
+        def render(variables: dict) -> str:
+            frame, output = _Frame(variables), []
+            for statement in statements:
+                statement(frame, output)
+            return "".join(output)
+
+        return render
+
+    def statements(self, body: list[nodes.Node]) -> list[Statement]:
+        return [self.statement(node) for node in body]
+
+    def statement(self, node: nodes.Node) -> Statement:
+        if isinstance(node, nodes.Output):
+            return self.output(node)
+        if isinstance(node, nodes.Assign) and isinstance(node.target, nodes.Name):
+            name, value = node.target.name, self.expression(node.node)
+
+            def assign(frame: _Frame, _output: list):
+                frame.variables[name] = value(frame)
+
+            return assign
+        if isinstance(node, nodes.If):
+            return self.condition(node)
+        raise Unsupported(type(node).__name__)
+
+    def output(self, node: nodes.Output) -> Statement:
+        parts: list[str | Evaluator] = []
+        for child in node.nodes:
+            if isinstance(child, nodes.TemplateData):
+                parts.append(child.data)
+            else:
+                parts.append(self.expression(child))
+
+        def output(frame: _Frame, output: list):
+            for part in parts:
+                output.append(part if isinstance(part, str) else str(part(frame)))
+
+        return output
+
+    def condition(self, node: nodes.If) -> Statement:
+        branches = [(self.expression(node.test), self.statements(node.body))]
+        branches += [(self.expression(elif_.test), self.statements(elif_.body)) for elif_ in node.elif_]
+        otherwise = self.statements(node.else_)
+
+        def condition(frame: _Frame, output: list):
+            for statement in next((body for test, body in branches if test(frame)), otherwise):
+                statement(frame, output)
+
+        return condition
+
+    def expression(self, node: nodes.Expr) -> Evaluator:
+        method = getattr(self, f"expression_{type(node).__name__.lower()}", None)
+        if method is None:
+            raise Unsupported(type(node).__name__)
+        evaluator = method(node)
+        if self.is_memoizable(node):
+            return self.memoized(node, evaluator)
+        return evaluator
+
+    def is_memoizable(self, node: nodes.Expr) -> bool:
+        """Whether `node` has the same value wherever it appears in one render."""
+        # Calls of global functions, such as next_sequence(), may return a new value every time
+        if isinstance(node, nodes.Call) and isinstance(node.node, nodes.Name):
+            return False
+        return isinstance(node, (nodes.Getattr, nodes.Getitem, nodes.Call)) and not self.reads_assigned(node)
+
+    def reads_assigned(self, node: nodes.Node) -> bool:
+        return any(name.name in self.assigned for name in node.find_all(nodes.Name))
+
+    def memoized(self, node: nodes.Expr, evaluator: Evaluator) -> Evaluator:
+        key = self.memo_keys.setdefault(repr(node), len(self.memo_keys))
+
+        def memoized(frame: _Frame):
+            value = frame.memo.get(key, _MISSING)
+            if value is _MISSING:
+                value = frame.memo[key] = evaluator(frame)
+            return value
+
+        return memoized
+
+    def expression_const(self, node: nodes.Const) -> Evaluator:
+        value = node.value
+        return lambda _frame: value
+
+    def expression_name(self, node: nodes.Name) -> Evaluator:
+        if node.ctx != "load":
+            raise Unsupported("Name")
+        name, environment = node.name, self.environment
+
+        def name_(frame: _Frame):
+            value = frame.variables.get(name, _MISSING)
+            if value is _MISSING:
+                value = environment.globals.get(name, _MISSING)
+            if value is _MISSING:
+                return environment.undefined(name=name)
+            return value
+
+        return name_
+
+    def expression_getattr(self, node: nodes.Getattr) -> Evaluator:
+        obj, attribute, getattr_ = self.expression(node.node), node.attr, self.getattr
+        return lambda frame: getattr_(obj(frame), attribute)
+
+    def expression_getitem(self, node: nodes.Getitem) -> Evaluator:
+        obj, argument, getitem = self.expression(node.node), self.expression(node.arg), self.environment.getitem
+        return lambda frame: getitem(obj(frame), argument(frame))
+
+    def expression_slice(self, node: nodes.Slice) -> Evaluator:
+        bounds = [self.expression(bound) if bound is not None else None for bound in (node.start, node.stop, node.step)]
+        return lambda frame: slice(*(bound(frame) if bound is not None else None for bound in bounds))
+
+    def expression_call(self, node: nodes.Call) -> Evaluator:
+        if node.dyn_args is not None or node.dyn_kwargs is not None:
+            raise Unsupported("Call")
+        # Rendered by Jinja2 from the start rather than falling back once other calls were made
+        if (
+            isinstance(node.node, nodes.Name)
+            and node.node.name not in self.assigned
+            and _PassArg.from_obj(self.environment.globals.get(node.node.name)) is not None
+        ):
+            raise Unsupported(f"Call of {node.node.name}")
+        callee = self.expression(node.node)
+        args = [self.expression(arg) for arg in node.args]
+        kwargs = {keyword.key: self.expression(keyword.value) for keyword in node.kwargs}
+        environment = self.environment
+
+        def call(frame: _Frame):
+            function = callee(frame)
+            if not environment.is_safe_callable(function):
+                raise SecurityError(f"{function!r} is not safely callable")
+            if _PassArg.from_obj(function) in tuple(_PassArg):
+                raise _Fallback
+            try:
+                return function(*(arg(frame) for arg in args), **{key: value(frame) for key, value in kwargs.items()})
+            except StopIteration:
+                return environment.undefined("value was undefined because a callable raised a StopIteration exception")
+
+        return call
+
+    def expression_filter(self, node: nodes.Filter) -> Evaluator:
+        if node.node is None or node.dyn_args is not None or node.dyn_kwargs is not None:
+            raise Unsupported("Filter")
+        function = self.environment.filters.get(node.name)
+        if function is None:
+            raise Unsupported(f"Filter {node.name}")
+        pass_arg = _PassArg.from_obj(function)
+        if pass_arg not in (None, _PassArg.environment):
+            raise Unsupported(f"Filter {node.name}")
+        value = self.expression(node.node)
+        args = [self.expression(arg) for arg in node.args]
+        kwargs = {keyword.key: self.expression(keyword.value) for keyword in node.kwargs}
+        prefix = (self.environment,) if pass_arg is _PassArg.environment else ()
+
+        def filter_(frame: _Frame):
+            return function(
+                *prefix,
+                value(frame),
+                *(arg(frame) for arg in args),
+                **{key: argument(frame) for key, argument in kwargs.items()},
+            )
+
+        return filter_
+
+    def expression_concat(self, node: nodes.Concat) -> Evaluator:
+        parts = [self.expression(part) for part in node.nodes]
+        return lambda frame: "".join(str(part(frame)) for part in parts)
+
+    def expression_condexpr(self, node: nodes.CondExpr) -> Evaluator:
+        test, expr1 = self.expression(node.test), self.expression(node.expr1)
+        expr2 = self.expression(node.expr2) if node.expr2 is not None else None
+        environment = self.environment
+
+        def condexpr(frame: _Frame):
+            if test(frame):
+                return expr1(frame)
+            if expr2 is None:
+                return environment.undefined(
+                    "the inline if-expression evaluated to false and no else section was defined."
+                )
+            return expr2(frame)
+
+        return condexpr
+
+    def expression_and(self, node: nodes.And) -> Evaluator:
+        left, right = self.expression(node.left), self.expression(node.right)
+        return lambda frame: left(frame) and right(frame)
+
+    def expression_or(self, node: nodes.Or) -> Evaluator:
+        left, right = self.expression(node.left), self.expression(node.right)
+        return lambda frame: left(frame) or right(frame)
+
+    def expression_not(self, node: nodes.Not) -> Evaluator:
+        operand = self.expression(node.node)
+        return lambda frame: not operand(frame)
+
+    def expression_compare(self, node: nodes.Compare) -> Evaluator:
+        first = self.expression(node.expr)
+        operands = []
+        for operand in node.ops:
+            if operand.op not in _COMPARISONS:
+                raise Unsupported(f"Operator {operand.op}")
+            operands.append((_COMPARISONS[operand.op], self.expression(operand.expr)))
+
+        def compare(frame: _Frame):
+            left = first(frame)
+            for comparison, expr in operands:
+                right = expr(frame)
+                if not comparison(left, right):
+                    return False
+                left = right
+            return True
+
+        return compare
+
+
+def compile_fast_path(environment: SandboxedEnvironment, template: Template, ast: nodes.Template):
+    """
+    Return a function rendering `template` within a budget, from the compiled `ast`.
+
+    Raises Unsupported if the template uses a construct the fast path does not handle.
+    Labels needing the full runtime at render time are rendered by `template` instead.
+    """
+    render = FastPathCompiler(environment, ast).compile()
+
+    def render_label(variables: dict, budget: RenderBudget) -> str:
+        try:
+            label = render(variables)
+        except _Fallback:
+            return generate_label(template, variables, budget)
+        budget.check_length(len(label))
+        budget.check_time()
+        return label
+
+    return render_label
@@ -0,0 +1,68 @@
+"""Background jobs labeling cables."""
+
+import logging
+
+from netbox.jobs import JobRunner
+
+from .bulk import DEFAULT_BATCH_SIZE, iter_label_chunks, render_batch, save_batch, unlabeled_cables
+from .sequences import close_reserving_connections
+
+logger = logging.getLogger("netbox_cable_labels.jobs")
+
+
+class LabelCablesJob(JobRunner):
+    """
+    Label the cables of a primary key range which have no label, one batch at a time.
+
+    Progress is recorded in the job data after every committed batch, so that an
+    interrupted job can be resumed with `resume_job()`.
+    """
+
+    class Meta:
+        name = "Label cables"
+
+    def log(self, message: str):
+        """Write a message to the job log (NetBox >= 4.4) or to the plugin logger."""
+        getattr(self, "logger", logger).info(message)
+
+    def save_progress(self, **data):
+        """Merge `data` into the job data and store it."""
+        self.job.data = {**(self.job.data or {}), **data}
+        self.job.save(update_fields=["data"])
+
+    def run(
+        self, *_args, start: int | None = None, end: int | None = None, batch_size: int = DEFAULT_BATCH_SIZE, **_kwargs
+    ):
+        queryset = unlabeled_cables(start, end)
+
+        total = 0
+        try:
+            self.save_progress(start=start, end=end, batch_size=batch_size, labeled=total)
+            self.log(f"Labeling cables {start or 'first'} to {end or 'last'} in batches of {batch_size}")
+            for chunk in iter_label_chunks(queryset, batch_size):
+                labeled = []
+                for label_template, batch in chunk:
+                    labeled += render_batch(batch, label_template=label_template)
+                for collision in save_batch(labeled):
+                    self.log(str(collision))
+                total += len(labeled)
+                # Cables of a chunk are grouped by template: only its largest key marks the progress
+                last_pk = max(batch[-1].pk for _label_template, batch in chunk)
+                self.save_progress(last_pk=last_pk, labeled=total)
+                self.log(f"Labeled {len(labeled)} cable(s) up to #{last_pk} ({total} so far)")
+            self.log(f"Labeled {total} cable(s)")
+        finally:
+            # Jobs run outside of requests, whose boundaries close the connections next_sequence() opened
+            close_reserving_connections()
+
+
+def resume_job(job, user=None):
+    """Enqueue a LabelCablesJob continuing after the last batch committed by `job`."""
+    data = job.data or {}
+    start = data["last_pk"] + 1 if data.get("last_pk") is not None else data.get("start")
+    return LabelCablesJob.enqueue(
+        user=user or job.user,
+        start=start,
+        end=data.get("end"),
+        batch_size=data.get("batch_size", DEFAULT_BATCH_SIZE),
+    )
@@ -0,0 +1,79 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from netbox_cable_labels.benchmarks import DEFAULT_SIZES, compare_reports, run_benchmarks
+from netbox_cable_labels.bulk import DEFAULT_BATCH_SIZE
+from netbox_cable_labels.sequences import close_reserving_connections
+
+
+def _sizes(value):
+    try:
+        sizes = tuple(int(size) for size in value.split(","))
+    except ValueError as exc:
+        raise CommandError("--sizes must be a comma separated list of integers") from exc
+    if any(size < 1 for size in sizes):
+        raise CommandError("--sizes must only contain positive integers")
+    return sizes
+
+
+class Command(BaseCommand):
+    """Benchmark label rendering, the save signals and bulk label generation.
+    Synthetic cables are created in a transaction which is rolled back afterwards."""
+
+    help = "Benchmarks label rendering and generation on synthetic cables and writes a JSON report."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default=",".join(str(size) for size in DEFAULT_SIZES),
+            help="Comma separated numbers of cables to label in bulk (default: %(default)s)",
+        )
+        parser.add_argument(
+            "--iterations", type=int, default=100, help="Warm renders timed per template (default: 100)"
+        )
+        parser.add_argument("--saves", type=int, default=100, help="Cables saved to time the signals (default: 100)")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Batch size of the bulk labeling (default: {DEFAULT_BATCH_SIZE})",
+        )
+        parser.add_argument("--output", help="File the JSON report is written to (default: standard output)")
+        parser.add_argument("--compare", help="JSON report of a previous run to check for regressions")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.1,
+            help="Relative change considered a regression by --compare (default: 0.1)",
+        )
+
+    def handle(self, *_args, **options):
+        if options["iterations"] < 1 or options["saves"] < 1 or options["batch_size"] < 1:
+            raise CommandError("--iterations, --saves and --batch-size must be positive integers")
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as baseline_file:
+                baseline = json.load(baseline_file)
+
+        try:
+            report = run_benchmarks(
+                sizes=_sizes(options["sizes"]),
+                iterations=options["iterations"],
+                saves=options["saves"],
+                batch_size=options["batch_size"],
+            )
+        finally:
+            close_reserving_connections()
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as report_file:
+                report_file.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+        if baseline is not None:
+            if regressions := compare_reports(baseline, report, options["threshold"]):
+                raise CommandError("Regressions found:\n" + "\n".join(regressions))
+            self.stderr.write("No regression found")
@@ -1,7 +1,24 @@
-from dcim.models.cables import Cable
+import csv
+import json
+
+from core.models import Job
+from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand, CommandError
 
-from netbox_cable_labels.utils import render_label
+from netbox_cable_labels.bulk import (
+    DEFAULT_BATCH_SIZE,
+    LabelRenderError,
+    label_cables,
+    preview_labels,
+    stale_cables,
+    unlabeled_cables,
+)
+from netbox_cable_labels.jobs import LabelCablesJob, resume_job
+from netbox_cable_labels.metrics import MODE_LABEL, MODE_PREVIEW, render_summary
+from netbox_cable_labels.parallel import label_in_parallel
+from netbox_cable_labels.sequences import close_reserving_connections
+from netbox_cable_labels.uniqueness import LabelCollisionError, get_uniqueness_scope
+from netbox_cable_labels.values import get_values_plan
 
 
 class Command(BaseCommand):
@@ -10,13 +27,214 @@ class Command(BaseCommand):
 
     help = "Uses the predefined template to generate labels for all cables with a missing label."
 
-    def handle(self, *_args, **_options):
-        cables_qs = Cable.objects.filter(label="")
-        for cable in cables_qs:
-            try:
-                cable.label = render_label(cable)
-                cable.save()
-            except Exception as exc:  # pylint: disable=broad-except
-                raise exc from CommandError(f"Error while generating label for cable {cable}")
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Number of cables rendered and written per transaction (default: {DEFAULT_BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--changelog",
+            action="store_true",
+            help="Record an ObjectChange for every labeled cable (requires --user)",
+        )
+        parser.add_argument("--user", help="Username the change records are attributed to")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes labeling ranges of cables in parallel (default: 1)",
+        )
+        parser.add_argument(
+            "--since-template-change",
+            action="store_true",
+            help="Regenerate the labels produced by a previous version of the template, unless edited by hand",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Output the labels that would be generated without saving them",
+        )
+        parser.add_argument(
+            "--format",
+            choices=("jsonl", "csv"),
+            default="jsonl",
+            help="Output format of --dry-run (default: jsonl)",
+        )
+        parser.add_argument("--output", help="File --dry-run writes to (default: standard output)")
+        parser.add_argument(
+            "--background",
+            action="store_true",
+            help="Enqueue a background job labeling the cables instead of labeling them in this process",
+        )
+        parser.add_argument(
+            "--resume",
+            type=int,
+            metavar="JOB_ID",
+            help="Enqueue a background job continuing an interrupted one after its last committed batch",
+        )
+        parser.add_argument(
+            "--values-only",
+            action="store_true",
+            help="Render from the field values read by the template instead of model instances",
+        )
+
+    def handle(self, *_args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be a positive integer")
+        if options["workers"] < 1:
+            raise CommandError("--workers must be a positive integer")
+        if options["user"] and not options["changelog"]:
+            raise CommandError("--user requires --changelog")
+        if options["resume"] is not None:
+            self.handle_resume(options)
+            return
+        self.check_options(options)
+        if options["background"]:
+            job = LabelCablesJob.enqueue(batch_size=options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"Enqueued job {job.pk} ({job.job_id})"))
+            return
+
+        cables_qs = stale_cables() if options["since_template_change"] else unlabeled_cables()
+        values = options["values_only"] and self.check_values_plan()
+        try:
+            if options["dry_run"]:
+                self.handle_dry_run(cables_qs, options["format"], options["output"], options["batch_size"], values)
+            elif options["workers"] > 1:
+                self.handle_parallel(options["workers"], options["batch_size"], self.get_user(options))
+            else:
+                self.handle_serial(cables_qs, options["batch_size"], self.get_user(options), values)
+        finally:
+            # No request boundary closes the connections next_sequence() reserved blocks with
+            close_reserving_connections()
+
+    def check_options(self, options):
+        """Reject the combinations of options the command does not support."""
+        parallel = options["background"] or options["workers"] > 1
+        if options["since_template_change"] and parallel:
+            raise CommandError("--since-template-change cannot be combined with --background or --workers")
+        if options["workers"] > 1 and get_uniqueness_scope() is not None:
+            raise CommandError("--workers cannot be used with unique_labels: workers do not see each other's labels")
+        if options["values_only"] and (options["changelog"] or parallel):
+            raise CommandError("--values-only cannot be combined with --changelog, --background or --workers")
+        if options["dry_run"] and (options["changelog"] or parallel):
+            raise CommandError("--dry-run cannot be combined with --changelog, --background or --workers")
+        if options["output"] and not options["dry_run"]:
+            raise CommandError("--output requires --dry-run")
+        if options["background"] and options["changelog"]:
+            raise CommandError("--changelog cannot be combined with --background")
+        if options["changelog"] and not options["user"]:
+            raise CommandError("--changelog requires --user")
+
+    @staticmethod
+    def get_user(options):
+        """Return the user the change records are attributed to, if --changelog is set."""
+        if not options["changelog"]:
+            return None
+        try:
+            return get_user_model().objects.get(username=options["user"])
+        except get_user_model().DoesNotExist as exc:
+            raise CommandError(f'User "{options["user"]}" does not exist') from exc
+
+    def handle_serial(self, cables_qs, batch_size, user, values=False):
+        """Label cables in this process, one transaction per batch."""
+        before = render_summary()
+        total = 0
+        collisions = []
+        try:
+            for labeled in label_cables(
+                cables_qs, batch_size=batch_size, user=user, values=values, collisions=collisions
+            ):
+                for cable in labeled:
+                    self.stdout.write(self.style.SUCCESS(f'Successfully updated cable "{cable}"'))
+                total += len(labeled)
+        except (LabelRenderError, LabelCollisionError) as exc:
+            raise CommandError(str(exc)) from exc
+
+        if total:
+            self.stdout.write(f"Labeled {total} cable(s)")
+        self.write_collisions(collisions)
+        self.write_summary(self.stdout, before)
+
+    def handle_resume(self, options):
+        """Enqueue a job continuing the background job given to --resume."""
+        conflicting = ("dry_run", "changelog", "since_template_change", "values_only")
+        if any(options[option] for option in conflicting) or options["workers"] > 1:
+            raise CommandError(
+                "--resume cannot be combined with --dry-run, --changelog, --since-template-change, --values-only "
+                "or --workers"
+            )
+        try:
+            job = Job.objects.get(pk=options["resume"], name=LabelCablesJob.name)
+        except Job.DoesNotExist as exc:
+            raise CommandError(f"Job {options['resume']} is not a cable labeling job") from exc
+        resumed = resume_job(job)
+        self.stdout.write(self.style.SUCCESS(f"Enqueued job {resumed.pk} ({resumed.job_id}) resuming job {job.pk}"))
+
+    def write_collisions(self, collisions):
+        """Report the labels which were already used in their uniqueness scope."""
+        for collision in collisions:
+            self.stderr.write(self.style.WARNING(str(collision)))
+        if collisions:
+            self.stderr.write(f"{len(collisions)} label collision(s)")
+
+    def check_values_plan(self) -> bool:
+        """Whether the template can be rendered from field values, warning if it cannot."""
+        if get_values_plan() is None:
+            self.stderr.write(self.style.WARNING("The label template needs model instances, ignoring --values-only"))
+            return False
+        return True
+
+    def write_summary(self, stream, before, mode=MODE_LABEL):
+        """Write the render metrics accumulated since `before`, if any label was rendered."""
+        summary = render_summary(mode) - before
+        if summary.renders:
+            stream.write(str(summary))
+
+    def handle_parallel(self, workers, batch_size, user):
+        """Label cables with one worker process per range of primary keys."""
+        total = 0
+        errors = []
+        collisions = []
+        for result in label_in_parallel(workers, batch_size, user=user):
+            end = f"#{result.end}" if result.end is not None else "last"
+            self.stdout.write(self.style.SUCCESS(f"Labeled {result.labeled} cable(s) from #{result.start} to {end}"))
+            total += result.labeled
+            collisions += result.collisions
+            if result.error:
+                errors.append(result.error)
+
+        if total:
+            self.stdout.write(f"Labeled {total} cable(s)")
+        self.write_collisions(collisions)
+        if errors:
+            raise CommandError("\n".join(errors))
+
+    def handle_dry_run(self, cables_qs, output_format, output, batch_size, values=False):
+        """Stream the labels that would be generated, one line per cable."""
+        stream = open(output, "w", encoding="utf-8", newline="") if output else self.stdout  # noqa: SIM115
+        writer = csv.writer(stream) if output_format == "csv" else None
+        before = render_summary(mode=MODE_PREVIEW)
+        total = 0
+        collisions = []
+        try:
+            if writer:
+                writer.writerow(["cable_id", "old_label", "new_label"])
+            for previews in preview_labels(cables_qs, batch_size, values=values, collisions=collisions):
+                for preview in previews:
+                    if writer:
+                        writer.writerow(preview)
+                    else:
+                        stream.write(json.dumps(preview._asdict()) + "\n")
+                stream.flush()
+                total += len(previews)
+        except (LabelRenderError, LabelCollisionError) as exc:
+            raise CommandError(str(exc)) from exc
+        finally:
+            if output:
+                stream.close()
 
-            self.stdout.write(self.style.SUCCESS(f'Successfully updated cable "{cable}"'))
+        self.stderr.write(f"Previewed {total} cable(s)")
+        self.write_collisions(collisions)
+        self.write_summary(self.stderr, before, MODE_PREVIEW)
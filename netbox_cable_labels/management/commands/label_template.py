@@ -0,0 +1,68 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from netbox_cable_labels.models import LabelTemplate
+
+
+class Command(BaseCommand):
+    """Manage the stored versions of the label template.
+    The active version replaces label_template and template_rules of PLUGINS_CONFIG."""
+
+    help = "Lists, adds and activates versions of the label template, picked up by running workers."
+
+    def add_arguments(self, parser):
+        action = parser.add_mutually_exclusive_group()
+        action.add_argument("--set", metavar="TEMPLATE", help="Add a version with this template and activate it")
+        action.add_argument("--activate", type=int, metavar="VERSION", help="Activate an existing version")
+        action.add_argument(
+            "--deactivate",
+            action="store_true",
+            help="Deactivate the active version, falling back to the template of PLUGINS_CONFIG",
+        )
+        parser.add_argument("--rules", metavar="FILE", help="JSON file holding the template rules of --set")
+        parser.add_argument("--comment", default="", help="Description of the version added by --set")
+
+    def handle(self, *_args, **options):
+        if options["rules"] and not options["set"]:
+            raise CommandError("--rules requires --set")
+        if options["set"] is not None:
+            self.add_version(options["set"], options["rules"], options["comment"])
+        elif options["activate"] is not None:
+            try:
+                version = LabelTemplate.objects.get(version=options["activate"])
+            except LabelTemplate.DoesNotExist as exc:
+                raise CommandError(f"Version {options['activate']} does not exist") from exc
+            version.activate()
+            self.stdout.write(self.style.SUCCESS(f"Activated version {version.version}"))
+        elif options["deactivate"]:
+            for version in LabelTemplate.objects.filter(is_active=True):
+                version.is_active = False
+                version.save()
+                self.stdout.write(self.style.SUCCESS(f"Deactivated version {version.version}"))
+        else:
+            self.list_versions()
+
+    def add_version(self, template, rules_file, comment):
+        """Store and activate a new version of the template."""
+        rules = []
+        if rules_file:
+            with open(rules_file, encoding="utf-8") as rules_stream:
+                rules = json.load(rules_stream)
+        version = LabelTemplate(template=template, rules=rules, comment=comment)
+        try:
+            version.full_clean(exclude=["version"])
+        except ValidationError as exc:
+            raise CommandError("; ".join(exc.messages)) from exc
+        version.activate()
+        self.stdout.write(self.style.SUCCESS(f"Activated version {version.version}"))
+
+    def list_versions(self):
+        """Write one line per version, the latest first."""
+        for version in LabelTemplate.objects.all():
+            active = "*" if version.is_active else " "
+            rules = f" ({len(version.rules)} rule(s))" if version.rules else ""
+            comment = f" - {version.comment}" if version.comment else ""
+            created = f"{version.created:%Y-%m-%d %H:%M}"
+            self.stdout.write(f"{active} {version.version:>4} {created} {version.template}{rules}{comment}")
@@ -0,0 +1,150 @@
+"""
+Prometheus metrics on the cost of rendering labels.
+
+The metrics are registered with the default prometheus_client registry, so NetBox's own
+/metrics endpoint exports them (when METRICS_ENABLED is set) and aggregates the values of
+every worker process in multiprocess mode.
+"""
+
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import wraps
+
+from prometheus_client import REGISTRY, Counter, Histogram
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Upper bounds of the queries-per-render histogram buckets
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Values of the `mode` label of the render metrics: labels stored, or only previewed
+MODE_LABEL = "label"
+MODE_PREVIEW = "preview"
+
+_render_mode: ContextVar[str] = ContextVar("netbox_cable_labels_render_mode", default=MODE_LABEL)
+
+RENDER_SECONDS = Histogram(
+    "netbox_cable_labels_render_seconds",
+    "Time spent rendering a cable label.",
+    labelnames=("mode",),
+    buckets=LATENCY_BUCKETS,
+)
+RENDER_QUERIES = Histogram(
+    "netbox_cable_labels_render_queries",
+    "SQL queries issued while rendering a cable label.",
+    labelnames=("mode",),
+    buckets=QUERY_BUCKETS,
+)
+RENDER_ERRORS = Counter("netbox_cable_labels_render_errors", "Cable labels which failed to render.", ("mode",))
+SIGNAL_SECONDS = Histogram(
+    "netbox_cable_labels_signal_seconds",
+    "Time spent in the signal receivers of the plugin.",
+    labelnames=("receiver",),
+    buckets=LATENCY_BUCKETS,
+)
+TEMPLATE_CACHE_LOOKUPS = Counter(
+    "netbox_cable_labels_template_cache_lookups",
+    "Lookups of compiled templates in the template cache of the process, by result.",
+    labelnames=("mode", "result"),
+)
+RENDER_CACHE_LOOKUPS = Counter(
+    "netbox_cable_labels_render_cache_lookups",
+    "Lookups of rendered labels in the shared render cache, by result.",
+    labelnames=("result",),
+)
+
+
+@contextmanager
+def preview_renders() -> Iterator[None]:
+    """Record the renders within the block under the preview mode, apart from the labels being stored."""
+    token = _render_mode.set(MODE_PREVIEW)
+    try:
+        yield
+    finally:
+        _render_mode.reset(token)
+
+
+def metric_value(name: str, **labels: str) -> float:
+    """Return the current value of a sample of this process, such as `netbox_cable_labels_render_seconds_count`."""
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def record_render(seconds: float, queries: int, failed: bool = False):
+    """Record the cost of rendering one label."""
+    mode = _render_mode.get()
+    RENDER_SECONDS.labels(mode).observe(seconds)
+    RENDER_QUERIES.labels(mode).observe(queries)
+    if failed:
+        RENDER_ERRORS.labels(mode).inc()
+
+
+def record_template_cache_lookup(hit: bool):
+    """Record one lookup of the compiled template cache."""
+    TEMPLATE_CACHE_LOOKUPS.labels(_render_mode.get(), "hit" if hit else "miss").inc()
+
+
+def record_render_cache_lookup(hit: bool):
+    """Record one lookup of the shared render cache."""
+    RENDER_CACHE_LOOKUPS.labels("hit" if hit else "miss").inc()
+
+
+def instrument_receiver(func: Callable) -> Callable:
+    """Record the time spent in a signal receiver under its function name."""
+    histogram = SIGNAL_SECONDS.labels(func.__name__)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - started)
+
+    return wrapper
+
+
+@dataclass(frozen=True)
+class RenderSummary:
+    """Totals of the render metrics at one point in time; subtract two to measure a run."""
+
+    renders: int = 0
+    seconds: float = 0.0
+    queries: int = 0
+    errors: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+    def __sub__(self, other: "RenderSummary") -> "RenderSummary":
+        return RenderSummary(
+            renders=self.renders - other.renders,
+            seconds=self.seconds - other.seconds,
+            queries=self.queries - other.queries,
+            errors=self.errors - other.errors,
+            cache_hits=self.cache_hits - other.cache_hits,
+            cache_misses=self.cache_misses - other.cache_misses,
+        )
+
+    def __str__(self) -> str:
+        mean = self.seconds / self.renders * 1000 if self.renders else 0.0
+        return (
+            f"Rendered {self.renders} label(s) in {self.seconds:.3f}s (mean {mean:.2f}ms), "
+            f"{self.queries} render queries, {self.errors} error(s), "
+            f"template cache {self.cache_hits} hit(s) / {self.cache_misses} miss(es)"
+        )
+
+
+def render_summary(mode: str = MODE_LABEL) -> RenderSummary:
+    """Return the current totals of the render metrics of this process, for the renders of `mode`."""
+    lookups = "netbox_cable_labels_template_cache_lookups_total"
+    return RenderSummary(
+        renders=int(metric_value("netbox_cable_labels_render_seconds_count", mode=mode)),
+        seconds=metric_value("netbox_cable_labels_render_seconds_sum", mode=mode),
+        queries=int(metric_value("netbox_cable_labels_render_queries_sum", mode=mode)),
+        errors=int(metric_value("netbox_cable_labels_render_errors_total", mode=mode)),
+        cache_hits=int(metric_value(lookups, mode=mode, result="hit")),
+        cache_misses=int(metric_value(lookups, mode=mode, result="miss")),
+    )
@@ -0,0 +1,30 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        ("dcim", "0200_populate_mac_addresses"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LabelFingerprint",
+            fields=[
+                (
+                    "cable",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="label_fingerprint",
+                        serialize=False,
+                        to="dcim.cable",
+                    ),
+                ),
+                ("template_hash", models.CharField(db_index=True, max_length=64)),
+                ("label", models.CharField(max_length=100)),
+            ],
+        ),
+    ]
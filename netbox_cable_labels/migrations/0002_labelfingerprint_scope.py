@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("netbox_cable_labels", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="labelfingerprint",
+            name="scope",
+            field=models.CharField(blank=True, default="", max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name="labelfingerprint",
+            index=models.Index(fields=["scope", "label"], name="ncl_fingerprint_scope_label"),
+        ),
+    ]
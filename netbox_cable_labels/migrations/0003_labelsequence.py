@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("netbox_cable_labels", "0002_labelfingerprint_scope"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LabelSequence",
+            fields=[
+                ("scope", models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ("value", models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
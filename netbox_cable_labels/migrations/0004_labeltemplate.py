@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("netbox_cable_labels", "0003_labelsequence"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LabelTemplate",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("version", models.PositiveIntegerField(editable=False, unique=True)),
+                ("template", models.TextField()),
+                ("rules", models.JSONField(blank=True, default=list)),
+                ("is_active", models.BooleanField(default=False)),
+                ("comment", models.CharField(blank=True, max_length=200)),
+                ("created", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "ordering": ["-version"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("is_active", True)),
+                        fields=("is_active",),
+                        name="ncl_labeltemplate_single_active",
+                    )
+                ],
+            },
+        ),
+    ]
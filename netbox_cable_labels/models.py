@@ -0,0 +1,101 @@
+from django.db import IntegrityError, models, transaction
+
+
+class LabelFingerprint(models.Model):
+    """Version of the label template which produced the label of a cable.
+
+    A label is considered automatically generated as long as it matches the
+    label recorded here; once edited by hand, it no longer does.
+    """
+
+    cable = models.OneToOneField(
+        to="dcim.Cable",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="label_fingerprint",
+    )
+    template_hash = models.CharField(max_length=64, db_index=True)
+    label = models.CharField(max_length=100)
+    # Uniqueness scope of the label when it was generated (see netbox_cable_labels.uniqueness)
+    scope = models.CharField(max_length=50, blank=True, default="")
+
+    class Meta:
+        indexes = [models.Index(fields=["scope", "label"], name="ncl_fingerprint_scope_label")]
+
+    def __str__(self):
+        return f"{self.label} ({self.template_hash[:12]})"
+
+
+class LabelSequence(models.Model):
+    """Counter handed out by the `next_sequence()` template function.
+
+    `value` is the last value reserved by any process; values are handed out in
+    blocks, see netbox_cable_labels.sequences.
+    """
+
+    scope = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.scope}: {self.value}"
+
+
+# Number of versions a new LabelTemplate tries before giving up on concurrent saves
+VERSION_ATTEMPTS = 5
+
+
+class LabelTemplate(models.Model):
+    """Version of the label template and template rules, replacing the configured ones while active.
+
+    At most one version is active. Running workers pick up a newly activated version
+    without a restart, see netbox_cable_labels.registry.
+    """
+
+    version = models.PositiveIntegerField(unique=True, editable=False)
+    template = models.TextField()
+    rules = models.JSONField(default=list, blank=True)
+    is_active = models.BooleanField(default=False)
+    comment = models.CharField(max_length=200, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-version"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["is_active"], condition=models.Q(is_active=True), name="ncl_labeltemplate_single_active"
+            )
+        ]
+
+    def __str__(self):
+        return f"Version {self.version}"
+
+    def clean(self):
+        # pylint: disable-next=import-outside-toplevel
+        from .utils import validate_template_source
+
+        validate_template_source(self.template, self.rules)
+
+    def save(self, *args, **kwargs):
+        if self.version is not None:
+            super().save(*args, **kwargs)
+            return
+        # Versions are numbered without a lock: when a concurrent save takes the same number,
+        # the insert fails on the unique version and the next number is tried
+        for attempt in range(VERSION_ATTEMPTS):
+            self.version = (LabelTemplate.objects.aggregate(models.Max("version"))["version__max"] or 0) + 1
+            try:
+                with transaction.atomic(using=kwargs.get("using")):
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                taken = LabelTemplate.objects.filter(version=self.version).exists()
+                self.version = None
+                if not taken or attempt == VERSION_ATTEMPTS - 1:
+                    raise
+
+    def activate(self):
+        """Make this version the active one, deactivating the others."""
+        with transaction.atomic():
+            LabelTemplate.objects.filter(is_active=True).exclude(pk=self.pk).update(is_active=False)
+            self.is_active = True
+            self.save()
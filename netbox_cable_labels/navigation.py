@@ -0,0 +1,9 @@
+from netbox.plugins import PluginMenuItem
+
+menu_items = (
+    PluginMenuItem(
+        link="plugins:netbox_cable_labels:template_preview",
+        link_text="Label Template Preview",
+        permissions=["dcim.view_cable"],
+    ),
+)
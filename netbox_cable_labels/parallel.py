@@ -0,0 +1,111 @@
+"""Labeling of cables across several worker processes."""
+
+# Worker processes import this module before Django is set up, so models and
+# the modules using them are only imported within functions.
+
+import uuid
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from itertools import pairwise
+from multiprocessing import get_context
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .uniqueness import Collision
+
+
+@dataclass
+class RangeResult:
+    """Outcome of labeling one range of cable primary keys."""
+
+    start: int
+    end: int | None
+    labeled: int = 0
+    error: str | None = None
+    collisions: list["Collision"] = field(default_factory=list)
+
+
+def init_worker():
+    """Set up Django in a freshly spawned worker process."""
+    import django
+
+    django.setup()
+
+
+def partition_pk_range(queryset, parts: int) -> list[tuple[int, int | None]]:
+    """
+    Split the primary keys of `queryset` into at most `parts` inclusive ranges of similar size.
+
+    The last range is left open-ended.
+    """
+    pks = queryset.order_by("pk").values_list("pk", flat=True)
+    count = pks.count()
+    if not count:
+        return []
+    parts = min(parts, count)
+    bounds = [pks[count * index // parts] for index in range(parts)]
+    return [(start, next_start - 1) for start, next_start in pairwise(bounds)] + [(bounds[-1], None)]
+
+
+def label_range(
+    start: int, end: int | None, batch_size: int, user_id: int | None = None, request_id: uuid.UUID | None = None
+) -> RangeResult:
+    """
+    Label the unlabeled cables of a primary key range.
+
+    Stops at the first render error, or at the first label collision when `on_collision`
+    is "fail"; other collisions are returned with the result.
+    """
+    from django.contrib.auth import get_user_model
+
+    from .bulk import LabelRenderError, label_cables, unlabeled_cables
+    from .sequences import close_reserving_connections
+    from .uniqueness import LabelCollisionError
+
+    result = RangeResult(start=start, end=end)
+    user = get_user_model().objects.get(pk=user_id) if user_id is not None else None
+    try:
+        for labeled in label_cables(
+            unlabeled_cables(start, end), batch_size, user=user, request_id=request_id, collisions=result.collisions
+        ):
+            result.labeled += len(labeled)
+    except (LabelRenderError, LabelCollisionError) as exc:
+        result.error = str(exc)
+    finally:
+        # Worker processes are reused for other ranges, and never see a request boundary
+        close_reserving_connections()
+    return result
+
+
+def label_in_parallel(
+    workers: int, batch_size: int, user=None, request_id: uuid.UUID | None = None
+) -> Iterator[RangeResult]:
+    """
+    Label the cables without a label with one process per primary key range.
+
+    Each process opens its own database connection and labels its range in
+    batches. Results are yielded as ranges complete.
+
+    Processes only check their labels against the labels already committed, not against
+    those another process is generating, so this cannot be used with `unique_labels`.
+    """
+    from django.core.exceptions import ImproperlyConfigured
+
+    from .bulk import unlabeled_cables
+    from .uniqueness import get_uniqueness_scope
+
+    if get_uniqueness_scope() is not None:
+        raise ImproperlyConfigured("Cables cannot be labeled in parallel when unique_labels is set")
+    ranges = partition_pk_range(unlabeled_cables(), workers)
+    if not ranges:
+        return
+    if user is not None and request_id is None:
+        request_id = uuid.uuid4()
+    user_id = user.pk if user is not None else None
+    with ProcessPoolExecutor(
+        max_workers=len(ranges), mp_context=get_context("spawn"), initializer=init_worker
+    ) as executor:
+        futures = [executor.submit(label_range, start, end, batch_size, user_id, request_id) for start, end in ranges]
+        for future in as_completed(futures):
+            yield future.result()
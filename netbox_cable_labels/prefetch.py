@@ -0,0 +1,153 @@
+"""Query plans loading the relations a label template reads."""
+
+from collections.abc import Iterable
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+
+from dcim.models.cables import Cable, CableTermination
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch, QuerySet, prefetch_related_objects
+
+from .analysis import TemplateDependencies, analyze_template, get_template_dependencies
+
+
+@dataclass(frozen=True)
+class PrefetchPlan:
+    """Lookups to apply to a Cable queryset so that rendering issues no further queries."""
+
+    select_related: tuple[str, ...] = ()
+    prefetch_related: tuple[str, ...] = ()
+    load_terminations: bool = False
+    termination_select_related: tuple[str, ...] = ()
+    termination_prefetch_related: tuple[str, ...] = ()
+
+    def get_prefetch_lookups(self) -> list[str | Prefetch]:
+        """Return the prefetch_related() lookups, including the terminations of the cable."""
+        lookups: list[str | Prefetch] = list(self.prefetch_related)
+        if self.load_terminations:
+            queryset = CableTermination.objects.select_related(*self.termination_select_related).prefetch_related(
+                "termination", *self.termination_prefetch_related
+            )
+            lookups.append(Prefetch("terminations", queryset=queryset))
+        return lookups
+
+    def apply(self, queryset: QuerySet) -> QuerySet:
+        """Return `queryset` with the plan's select_related and prefetch_related lookups."""
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if lookups := self.get_prefetch_lookups():
+            queryset = queryset.prefetch_related(*lookups)
+        return queryset
+
+
+def _relation_lookups(model, path: tuple[str, ...]) -> tuple[str, str]:
+    """
+    Return the (select_related, prefetch_related) lookups for the relations traversed by `path`.
+
+    Traversal stops at the first attribute which is not a concrete relation of the current
+    model. Single-valued relations are joined until a multi-valued relation is reached;
+    from there on the remaining relations are prefetched.
+    """
+    joined: list[str] = []
+    prefetched: list[str] = []
+    for name in path:
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation or field.related_model is None:
+            break
+        if prefetched or field.many_to_many or field.one_to_many:
+            prefetched.append(name)
+        else:
+            joined.append(name)
+        model = field.related_model
+    return "__".join(joined), "__".join(joined + prefetched) if prefetched else ""
+
+
+def build_prefetch_plan(dependencies: TemplateDependencies) -> PrefetchPlan:
+    """Map the attribute paths read by a template to the lookups loading them."""
+    select_related, prefetch_related = set(), set()
+    for path in dependencies.cable_paths:
+        joined, prefetched = _relation_lookups(Cable, path)
+        select_related.add(joined)
+        prefetch_related.add(prefetched)
+
+    termination_select_related, termination_prefetch_related = set(), set()
+    for path in dependencies.termination_paths:
+        # Device components are reached through the device cached on their CableTermination
+        if path[:1] == ("device",):
+            joined, prefetched = _relation_lookups(CableTermination, ("_device", *path[1:]))
+            termination_select_related.add(joined)
+            termination_prefetch_related.add(prefetched)
+
+    return PrefetchPlan(
+        select_related=tuple(sorted(filter(None, select_related))),
+        prefetch_related=tuple(sorted(filter(None, prefetch_related))),
+        load_terminations=dependencies.uses_terminations,
+        termination_select_related=tuple(sorted(filter(None, termination_select_related))),
+        termination_prefetch_related=tuple(sorted(filter(None, termination_prefetch_related))),
+    )
+
+
+@lru_cache(maxsize=32)
+def _get_prefetch_plan(dependencies: TemplateDependencies) -> PrefetchPlan:
+    return build_prefetch_plan(dependencies)
+
+
+def get_prefetch_plan(label_template: str | None = None) -> PrefetchPlan:
+    """Return the prefetch plan of `label_template`, or of every configured label template."""
+    if label_template is not None:
+        return _get_prefetch_plan(analyze_template(label_template))
+    return _get_prefetch_plan(get_template_dependencies())
+
+
+def prime_terminations(cables: Iterable[Cable]):
+    """
+    Attach the devices loaded with the CableTerminations to their termination objects.
+
+    Termination objects are loaded through a generic relation, so their `device` cannot be
+    joined directly. CableTermination keeps a copy of it, which is reused here.
+    """
+    device_field = CableTermination._meta.get_field("_device")
+    for cable in cables:
+        for cable_termination in getattr(cable, "_prefetched_objects_cache", {}).get("terminations", ()):
+            if not device_field.is_cached(cable_termination) or cable_termination._device is None:
+                continue
+            termination = cable_termination.termination
+            try:
+                field = termination._meta.get_field("device")
+            except (AttributeError, FieldDoesNotExist):
+                continue
+            if not field.is_cached(termination) and termination.device_id == cable_termination._device_id:
+                field.set_cached_value(termination, cable_termination._device)
+
+
+def prefetch_cables(cables: list[Cable], plan: PrefetchPlan | None = None):
+    """Load the relations read by the label template onto already fetched cables."""
+    plan = plan or get_prefetch_plan()
+    lookups = [*plan.select_related, *plan.get_prefetch_lookups()]
+    if lookups:
+        prefetch_related_objects(cables, *lookups)
+        prime_terminations(cables)
+
+
+@contextmanager
+def prefetched(cable: Cable, plan: PrefetchPlan | None = None):
+    """
+    Temporarily load the relations read by the label template onto a single cable.
+
+    Cables which are not saved yet are left untouched: their relations only exist in memory.
+    """
+    if cable._state.adding:
+        yield cable
+        return
+    existing = set(getattr(cable, "_prefetched_objects_cache", {}))
+    prefetch_cables([cable], plan)
+    try:
+        yield cable
+    finally:
+        cache = getattr(cable, "_prefetched_objects_cache", {})
+        for lookup in set(cache) - existing:
+            del cache[lookup]
@@ -0,0 +1,73 @@
+"""Regeneration of labels when the objects they are rendered from change."""
+
+from dcim.models import Device, Location, Rack, Site
+from dcim.models.cables import Cable
+from django.db.models import F
+
+from .analysis import get_template_dependencies
+from .deferred import defer_labels
+from .utils import get_plugin_setting, snapshot_changed
+
+# Objects related to the terminations of a cable: path from a termination, and lookup from Cable
+RELATED_OBJECTS = {
+    Device: (("device",), "terminations___device"),
+    Rack: (("device", "rack"), "terminations___rack"),
+    Location: (("device", "location"), "terminations___location"),
+    Site: (("device", "site"), "terminations___site"),
+}
+
+
+def read_attributes(prefix: tuple[str, ...]) -> set[str] | None:
+    """
+    Return the attributes the label template reads from the object at `prefix`.
+
+    `prefix` is a path relative to a termination (an empty one stands for the
+    termination itself). None means the object is used as a whole.
+    """
+    attributes: set[str] = set()
+    for path in get_template_dependencies().termination_paths:
+        if path[: len(prefix)] != prefix:
+            continue
+        if len(path) == len(prefix):
+            return None
+        attributes.add(path[len(prefix)])
+    return attributes
+
+
+def _is_read(attributes: set[str] | None) -> bool:
+    return attributes is None or bool(attributes)
+
+
+def propagation_enabled() -> bool:
+    """Whether labels are regenerated when the objects they are rendered from change."""
+    return bool(get_plugin_setting("relabel_on_change"))
+
+
+def relabel_related_cables(instance, using: str):
+    """
+    Queue the cables whose label was generated from a changed Device, Rack, Location or Site.
+
+    Only cables with an automatically generated label are regenerated, and only if the
+    attributes the template reads from the object have changed.
+    """
+    prefix, lookup = RELATED_OBJECTS[type(instance)]
+    attributes = read_attributes(prefix)
+    if not _is_read(attributes) or not snapshot_changed(instance, attributes):
+        return
+    pks = (
+        Cable.objects.filter(**{lookup: instance}, label_fingerprint__label=F("label"))
+        .values_list("pk", flat=True)
+        .distinct()
+    )
+    defer_labels(pks, using)
+
+
+def relabel_termination_cable(instance, using: str):
+    """Queue the cable attached to a changed termination (interface, port, ...) for relabeling."""
+    if instance.cable_id is None:
+        return
+    attributes = read_attributes(())
+    if not _is_read(attributes) or not snapshot_changed(instance, attributes):
+        return
+    pks = Cable.objects.filter(pk=instance.cable_id, label_fingerprint__label=F("label")).values_list("pk", flat=True)
+    defer_labels(pks, using)
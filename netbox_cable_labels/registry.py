@@ -0,0 +1,87 @@
+"""
+Active version of the label template, shared by every worker process.
+
+Each process keeps the active LabelTemplate in memory. At most once every
+`template_check_interval` seconds, it compares the version stamp published in the Django
+cache with the stamp it loaded the template under, and only reads the database when the
+stamp changed. Activating a version publishes a new stamp once its transaction commits, so
+the change reaches every gunicorn and RQ worker without a restart.
+"""
+
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+
+from .models import LabelTemplate
+
+# Cache key of the version stamp
+STAMP_CACHE_KEY = "netbox_cable_labels:template_stamp"
+
+
+@dataclass(frozen=True)
+class ActiveTemplate:
+    """Template and template rules of the active LabelTemplate version."""
+
+    version: int
+    template: str
+    rules: list
+
+
+class TemplateRegistry:
+    """Per-process copy of the active template version, refreshed when its stamp changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget the loaded version, so that the next lookup reads the database."""
+        self._stamp: str | None = None
+        self._checked = float("-inf")
+        self._active: ActiveTemplate | None = None
+        self._loaded = False
+
+    def get(self, interval: float) -> ActiveTemplate | None:
+        """Return the active template version, or None to use the configured template."""
+        now = time.monotonic()
+        if self._loaded and now - self._checked < interval:
+            return self._active
+        with self._lock:
+            if self._loaded and now - self._checked < interval:
+                return self._active
+            # A missing stamp, after a cache flush for instance, counts as a stamp of its own
+            stamp = cache.get(STAMP_CACHE_KEY, "")
+            if not self._loaded or stamp != self._stamp:
+                try:
+                    # Within a savepoint, so that a failed read does not abort the transaction of the caller
+                    with transaction.atomic():
+                        self._active = self.load()
+                except DatabaseError:
+                    # The table does not exist before the migrations are applied
+                    return None
+                self._stamp, self._loaded = stamp, True
+            self._checked = now
+            return self._active
+
+    @staticmethod
+    def load() -> ActiveTemplate | None:
+        """Read the active version from the database."""
+        version = LabelTemplate.objects.filter(is_active=True).values_list("version", "template", "rules").first()
+        return ActiveTemplate(*version) if version is not None else None
+
+
+template_registry = TemplateRegistry()
+
+
+def publish_template_change(using: str | None = None):
+    """Publish a new version stamp once the current transaction commits, for every worker to reload."""
+
+    def publish():
+        cache.set(STAMP_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+        template_registry.reset()
+
+    transaction.on_commit(publish, using=using)
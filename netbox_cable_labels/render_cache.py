@@ -0,0 +1,123 @@
+"""
+Rendered labels shared by every worker process through the Django cache.
+
+With `render_cache` enabled, a label is stored under the fingerprint of its template and a
+digest of the exact values the template reads, as listed by its values plan (see
+netbox_cable_labels.values). Rendering the same template from the same values, in any
+process, then returns the stored label. Templates which need model instances, or which
+call functions such as next_sequence(), are always rendered.
+"""
+
+import hashlib
+import json
+from collections.abc import Callable
+from functools import lru_cache
+
+from dcim.models.cables import Cable
+from django.core.cache import cache
+from jinja2 import nodes
+
+from .metrics import record_render_cache_lookup
+from .utils import get_dispatch_table, get_plugin_setting, parse_template, template_fingerprint
+from .values import Record, RecordShape, ValuesPlan, get_values_plan, iter_value_batches
+
+# Prefix of the cache keys of rendered labels
+KEY_PREFIX = "netbox_cable_labels:label:"
+
+
+def render_cache_enabled() -> bool:
+    """Whether rendered labels are shared through the Django cache."""
+    return bool(get_plugin_setting("render_cache"))
+
+
+@lru_cache(maxsize=32)
+def is_cacheable(label_template: str) -> bool:
+    """Whether the labels of a template only depend on the values listed by its values plan."""
+    if get_values_plan(label_template) is None:
+        return False
+    # Global functions, such as next_sequence(), may return a new value every time
+    return not any(isinstance(call.node, nodes.Name) for call in parse_template(label_template).find_all(nodes.Call))
+
+
+def _shape_values(obj, shape: RecordShape) -> list | None:
+    if obj is None:
+        return None
+    values = [getattr(obj, name) for name in shape.fields]
+    values += [_shape_values(getattr(obj, name), related) for name, (_lookup, related) in shape.relations.items()]
+    return values
+
+
+def _termination_values(termination, plan: ValuesPlan) -> list:
+    model = termination.model if isinstance(termination, Record) else type(termination)
+    values = [model._meta.label_lower, _shape_values(termination, plan.terminations.get(model, RecordShape()))]
+    if plan.device is not None:
+        values.append(_shape_values(getattr(termination, "device", None), plan.device))
+    return values
+
+
+def label_inputs(cable, plan: ValuesPlan) -> list:
+    """Return the values the template of `plan` reads from a cable instance or record."""
+    values = [_shape_values(cable, plan.cable)]
+    if plan.uses_terminations:
+        for side in ("a_terminations", "b_terminations"):
+            values.append([_termination_values(termination, plan) for termination in getattr(cable, side)])
+    return values
+
+
+def cache_key(label_template: str, cable, plan: ValuesPlan) -> str:
+    """Return the cache key of the label of `cable` rendered with `label_template`."""
+    inputs = json.dumps(label_inputs(cable, plan), default=str, separators=(",", ":"))
+    return KEY_PREFIX + hashlib.sha256(f"{template_fingerprint(label_template)}:{inputs}".encode()).hexdigest()
+
+
+def render_with_cache(cables: list, label_template: str, render: Callable[[object], str]) -> list[str]:
+    """
+    Return the labels of `cables` rendered with `label_template`, reading them from the cache when possible.
+
+    `render(cable)` renders a label missing from the cache. The whole list is looked up
+    and stored with one round trip to the cache each.
+    """
+    if not render_cache_enabled() or not is_cacheable(label_template):
+        return [render(cable) for cable in cables]
+    plan = get_values_plan(label_template)
+    keys = [cache_key(label_template, cable, plan) for cable in cables]
+    found = cache.get_many(keys)
+    labels, rendered = [], {}
+    for cable, key in zip(cables, keys, strict=True):
+        record_render_cache_lookup(key in found)
+        if key in found:
+            labels.append(found[key])
+            continue
+        if key not in rendered:
+            rendered[key] = render(cable)
+        labels.append(rendered[key])
+    if rendered:
+        cache.set_many(rendered, timeout=get_plugin_setting("render_cache_ttl"))
+    return labels
+
+
+def input_record(cable: Cable) -> tuple[Record, str] | None:
+    """
+    Read what the label of a stored cable being saved depends on as a record, with its template.
+
+    The cable's own fields are taken from the instance and the rest is read with
+    values_list(), without loading the terminations as model instances. Returns None
+    when the render cache is disabled, the template is selected by rules or is not
+    cacheable, or the instance differs from the stored cable in a way a record cannot
+    follow: new terminations, or related objects read through the cable.
+    """
+    if not render_cache_enabled() or cable._state.adding or getattr(cable, "_terminations_modified", False):
+        return None
+    table = get_dispatch_table()
+    if table.rules or not is_cacheable(table.default):
+        return None
+    plan = get_values_plan(table.default)
+    if plan.cable.relations:
+        return None
+    (record,) = next(iter_value_batches(Cable.objects.filter(pk=cable.pk), plan, 1), [None])
+    if record is None:
+        return None
+    record.label = cable.label
+    for name in plan.cable.fields:
+        setattr(record, name, getattr(cable, name))
+    return record, table.default
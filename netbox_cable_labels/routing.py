@@ -0,0 +1,167 @@
+"""
+Selection of the label template of a cable, following the configured rules.
+
+Rules match on the site and tenant slugs, the cable type and the termination type of a
+cable. They are compiled into a dispatch table: one dict per combination of keys used by
+the rules, so selecting the template of a cable takes a fixed number of dict lookups,
+whatever the number of rules.
+"""
+
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from dcim.models.cables import Cable, CableTermination
+from django.core.exceptions import ImproperlyConfigured
+
+# Keys rules can match on
+ROUTING_KEYS = ("site", "tenant", "cable_type", "termination_type")
+
+# Keys read from the cable, with their values_list() lookups
+CABLE_LOOKUPS = {"cable_type": "type", "tenant": "tenant__slug"}
+
+# Keys read from the first termination of the cable, A side first
+TERMINATION_KEYS = frozenset({"site", "termination_type"})
+
+
+@dataclass(frozen=True)
+class TemplateRule:
+    """Template applied to the cables matching every given key; keys list the accepted values."""
+
+    template: str
+    match: tuple[tuple[str, tuple[str, ...]], ...]
+
+    @classmethod
+    def from_setting(cls, index: int, rule) -> "TemplateRule":
+        """Validate one entry of the `template_rules` setting."""
+        if not isinstance(rule, dict) or not isinstance(rule.get("template"), str):
+            raise ImproperlyConfigured(f"template_rules[{index}] must be a dict with a template string")
+        if unknown := set(rule) - {"template", *ROUTING_KEYS}:
+            raise ImproperlyConfigured(f"template_rules[{index}] has unknown keys: {', '.join(sorted(unknown))}")
+        match = []
+        for key in ROUTING_KEYS:
+            if key in rule:
+                values = rule[key] if isinstance(rule[key], list | tuple) else [rule[key]]
+                match.append((key, tuple(str(value) for value in values)))
+        return cls(template=rule["template"], match=tuple(match))
+
+    def as_dict(self) -> dict:
+        """Return the rule in the form of the setting."""
+        return {"template": self.template, **{key: list(values) for key, values in self.match}}
+
+
+class DispatchTable:
+    """Templates indexed by the values of the keys their rules match on, in order of precedence."""
+
+    def __init__(self, default: str, rules: Iterable[TemplateRule] = ()):
+        self.default = default
+        self.rules = tuple(rules)
+        # Combination of keys -> values of those keys -> (rule index, template); the first rule wins
+        self.tables: dict[tuple[str, ...], dict[tuple[str, ...], tuple[int, str]]] = defaultdict(dict)
+        for index, rule in enumerate(self.rules):
+            keys = tuple(key for key, _values in rule.match)
+            for values in _combinations([values for _key, values in rule.match]):
+                self.tables[keys].setdefault(values, (index, rule.template))
+        self.keys = frozenset(key for rule in self.rules for key, _values in rule.match)
+
+    @property
+    def templates(self) -> tuple[str, ...]:
+        """Every template the table can select, the default first."""
+        return tuple(dict.fromkeys([self.default, *(rule.template for rule in self.rules)]))
+
+    def select(self, key: dict[str, str | None]) -> str:
+        """Return the template selected for the values of the routing keys of a cable."""
+        best = None
+        for keys, table in self.tables.items():
+            match = table.get(tuple(key.get(name) for name in keys))
+            if match is not None and (best is None or match[0] < best[0]):
+                best = match
+        return self.default if best is None else best[1]
+
+    def select_for(self, cable: Cable) -> str:
+        """Return the template selected for a cable instance."""
+        if not self.rules:
+            return self.default
+        return self.select(cable_key(cable, self.keys))
+
+    def group(self, pks: list[int]) -> dict[str, list[int]]:
+        """Split the primary keys of stored cables by selected template, keeping their order."""
+        if not self.rules:
+            return {self.default: list(pks)}
+        keys = routing_keys(pks, self.keys)
+        groups = defaultdict(list)
+        for pk in pks:
+            groups[self.select(keys[pk])].append(pk)
+        return dict(groups)
+
+
+def _combinations(values: list[tuple[str, ...]]) -> Iterable[tuple[str, ...]]:
+    if not values:
+        yield ()
+        return
+    for value in values[0]:
+        for rest in _combinations(values[1:]):
+            yield (value, *rest)
+
+
+def _first_termination(cable: Cable):
+    for termination in (*cable.a_terminations, *cable.b_terminations):
+        return termination
+    return None
+
+
+def termination_site(termination):
+    """Return the site of a termination, as cached on its CableTermination."""
+    if (device := getattr(termination, "device", None)) is not None:
+        return device.site
+    if (power_panel := getattr(termination, "power_panel", None)) is not None:
+        return power_panel.site
+    # Circuit terminations keep their own copy of the site
+    return getattr(termination, "_site", None)
+
+
+def cable_key(cable: Cable, keys: frozenset[str]) -> dict[str, str | None]:
+    """Return the values of the routing `keys` of a cable instance, saved or not."""
+    key: dict[str, str | None] = {}
+    if "cable_type" in keys:
+        key["cable_type"] = cable.type or None
+    if "tenant" in keys:
+        key["tenant"] = cable.tenant.slug if cable.tenant_id else None
+    if keys & TERMINATION_KEYS:
+        termination = _first_termination(cable)
+        if "termination_type" in keys and termination is not None:
+            key["termination_type"] = termination._meta.label_lower
+        if "site" in keys and termination is not None:
+            site = termination_site(termination)
+            key["site"] = site.slug if site is not None else None
+    return key
+
+
+def routing_keys(pks: list[int], keys: frozenset[str]) -> dict[int, dict[str, str | None]]:
+    """
+    Return the values of the routing `keys` of stored cables, by primary key.
+
+    Takes one query for the cable fields and one for their first termination, if the keys use them.
+    """
+    result: dict[int, dict[str, str | None]] = {pk: {} for pk in pks}
+    if cable_keys := [key for key in CABLE_LOOKUPS if key in keys]:
+        lookups = [CABLE_LOOKUPS[key] for key in cable_keys]
+        for pk, *values in Cable.objects.filter(pk__in=pks).values_list("pk", *lookups):
+            result[pk].update((key, value or None) for key, value in zip(cable_keys, values, strict=True))
+    if keys & TERMINATION_KEYS:
+        rows = (
+            CableTermination.objects.filter(cable_id__in=pks)
+            .order_by("cable_id", "cable_end", "pk")
+            .values_list("cable_id", "_site__slug", "termination_type__app_label", "termination_type__model")
+        )
+        seen = set()
+        for cable_id, site, app_label, model in rows:
+            if cable_id in seen:
+                continue
+            seen.add(cable_id)
+            key = result[cable_id]
+            if "site" in keys:
+                key["site"] = site
+            if "termination_type" in keys:
+                key["termination_type"] = f"{app_label}.{model}"
+    return result
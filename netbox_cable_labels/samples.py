@@ -0,0 +1,160 @@
+"""
+Sample cables for trying out label templates.
+
+A sample holds a few cables of every combination of site and cable type, loaded once with
+their terminations, devices, racks, locations and sites. It is kept in memory for the
+session, so rendering a template against it runs no queries for what the shortcuts read.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from dcim.models.cables import Cable, CableTermination
+from django.db.models import F, OuterRef, Subquery, Window
+from django.db.models.functions import RowNumber
+from jinja2 import TemplateError
+
+from .analysis import TemplateDependencies
+from .metrics import preview_renders
+from .prefetch import PrefetchPlan, build_prefetch_plan, prime_terminations
+from .sandbox import RenderBudget, budget_scope
+from .sequences import previewing
+from .utils import compile_template, render_label
+
+# Cables sampled per combination of site and cable type, and in total
+SAMPLES_PER_STRATUM = 2
+MAX_SAMPLES = 50
+
+# Number of samples kept in memory, and for how long
+SAMPLE_CACHE_SIZE = 32
+SAMPLE_TTL = 600
+
+# Relations loaded with the samples: those the template shortcuts (a_device, b_rack, ...) read
+SAMPLE_PATHS = frozenset(
+    path
+    for side in ("a_terminations", "b_terminations")
+    for path in (
+        (side, "device", "role"),
+        (side, "device", "tenant"),
+        (side, "device", "rack", "location"),
+        (side, "device", "location"),
+        (side, "device", "site", "region"),
+    )
+) | {("tenant",)}
+
+
+@lru_cache(maxsize=1)
+def get_sample_plan() -> PrefetchPlan:
+    """Return the prefetch plan loading the samples."""
+    return build_prefetch_plan(TemplateDependencies(paths=SAMPLE_PATHS))
+
+
+def sample_pks(queryset=None, per_stratum: int = SAMPLES_PER_STRATUM, limit: int = MAX_SAMPLES) -> list[int]:
+    """
+    Return the primary keys of up to `per_stratum` cables of every (site, cable type) pair.
+
+    The site of a cable is the site of its first termination. Sampling takes one query.
+    """
+    queryset = queryset if queryset is not None else Cable.objects.all()
+    site = CableTermination.objects.filter(cable=OuterRef("pk")).order_by("cable_end", "pk").values("_site")[:1]
+    strata = queryset.annotate(sample_site=Subquery(site)).annotate(
+        sample_rank=Window(RowNumber(), partition_by=[F("sample_site"), F("type")], order_by=F("pk").asc())
+    )
+    # Every stratum contributes its first cable before any contributes a second one
+    strata = strata.filter(sample_rank__lte=per_stratum).order_by("sample_rank", "pk")
+    return list(strata.values_list("pk", flat=True)[:limit])
+
+
+def load_samples(pks: list[int]) -> list[Cable]:
+    """Load the given cables following the sample plan, in primary key order."""
+    cables = list(get_sample_plan().apply(Cable.objects.filter(pk__in=pks).order_by("pk")))
+    prime_terminations(cables)
+    return cables
+
+
+@dataclass
+class SampleRow:
+    """Label rendered for one sample cable, or the error raised rendering it."""
+
+    cable: Cable
+    label: str = ""
+    error: str = ""
+
+
+@dataclass
+class SampleRender:
+    """Labels of the sample cables rendered with one template, and what rendering them cost."""
+
+    rows: list[SampleRow] = field(default_factory=list)
+    error: str = ""
+    seconds: float = 0.0
+    queries: int = 0
+
+    @property
+    def mean_ms(self) -> float:
+        """Mean render time of a label, in milliseconds."""
+        return self.seconds / len(self.rows) * 1000 if self.rows else 0.0
+
+
+def render_samples(cables: list[Cable], label_template: str) -> SampleRender:
+    """
+    Render `label_template` for every sample cable, measuring the time and queries spent.
+
+    Sequence counters are simulated rather than consumed.
+    """
+    result = SampleRender()
+    try:
+        compile_template(label_template)
+    except TemplateError as exc:
+        result.error = str(exc)
+        return result
+    with budget_scope(RenderBudget()) as budget, previewing(), preview_renders():
+        for cable in cables:
+            try:
+                result.rows.append(SampleRow(cable, label=render_label(cable, label_template)))
+            except Exception as exc:
+                result.rows.append(SampleRow(cable, error=str(exc) or type(exc).__name__))
+        result.seconds, result.queries = budget.elapsed, budget.queries
+    return result
+
+
+class SampleCache:
+    """Samples by session, least recently used first, expiring after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = SAMPLE_CACHE_SIZE, ttl: float = SAMPLE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._samples: OrderedDict[str, tuple[float, list[Cable]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, load) -> list[Cable]:
+        """Return the sample of `key`, calling `load()` to build it if it is missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._samples.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._samples.move_to_end(key)
+                return entry[1]
+        cables = load()
+        with self._lock:
+            self._samples[key] = (now, cables)
+            self._samples.move_to_end(key)
+            while len(self._samples) > self.maxsize:
+                self._samples.popitem(last=False)
+        return cables
+
+    def discard(self, key: str):
+        """Forget the sample of `key`."""
+        with self._lock:
+            self._samples.pop(key, None)
+
+    def clear(self):
+        """Forget every sample."""
+        with self._lock:
+            self._samples.clear()
+
+
+sample_cache = SampleCache()
@@ -0,0 +1,202 @@
+"""Sandboxed rendering of label templates with a bounded cost."""
+
+import re
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import cached_property, lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import Manager, Model, QuerySet
+from jinja2 import Template, nodes
+from jinja2.exceptions import SecurityError
+from jinja2.sandbox import ImmutableSandboxedEnvironment
+from jinja2.visitor import NodeTransformer
+
+# Methods templates may call on querysets and related managers
+QUERYSET_METHODS = frozenset({"all", "first", "last", "count", "exists"})
+
+# Filter wrapped around the iterable of every {% for %} loop
+LOOP_LIMIT_FILTER = "loop_limit"
+
+_DISPLAY_METHOD = re.compile(r"^get_\w+_display$")
+
+_budget: ContextVar["RenderBudget | None"] = ContextVar("netbox_cable_labels_render_budget", default=None)
+
+
+class RenderBudgetExceeded(SecurityError):
+    """Raised when rendering a label exceeds one of the limits of its RenderBudget."""
+
+
+@dataclass
+class RenderBudget:
+    """
+    Limits applied while a single label is rendered.
+
+    A limit set to None (or 0) is not enforced. The wall-clock budget is checked on every
+    attribute access, call, loop iteration, output chunk and database query; a single
+    long-running operation is not interrupted.
+    """
+
+    timeout: float | None = None
+    max_queries: int | None = None
+    max_iterations: int | None = None
+    max_length: int | None = None
+    queries: int = field(default=0, init=False)
+    started: float = field(default_factory=time.monotonic, init=False)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds spent since the budget was created."""
+        return time.monotonic() - self.started
+
+    def check_time(self):
+        """Raise RenderBudgetExceeded if the render has run for longer than `timeout`."""
+        if self.timeout and self.elapsed > self.timeout:
+            raise RenderBudgetExceeded(f"Label rendering exceeded its time budget of {self.timeout}s")
+
+    def check_iterations(self, iterations: int):
+        """Raise RenderBudgetExceeded if a loop ran more than `max_iterations` times."""
+        if self.max_iterations and iterations > self.max_iterations:
+            raise RenderBudgetExceeded(f"Label template loop exceeded {self.max_iterations} iterations")
+
+    def check_length(self, length: int):
+        """Raise RenderBudgetExceeded if the output is longer than `max_length` characters."""
+        if self.max_length and length > self.max_length:
+            raise RenderBudgetExceeded(f"Label exceeded {self.max_length} characters")
+
+    def query_wrapper(self, execute, sql, params, many, context):
+        """Database execute wrapper counting the queries issued by the template."""
+        self.queries += 1
+        if self.max_queries and self.queries > self.max_queries:
+            raise RenderBudgetExceeded(f"Label rendering exceeded its budget of {self.max_queries} queries")
+        self.check_time()
+        return execute(sql, params, many, context)
+
+
+def _check_time():
+    if (budget := _budget.get()) is not None:
+        budget.check_time()
+
+
+def limit_loop(iterable: Iterable) -> Iterator:
+    """Iterate over `iterable`, enforcing the iteration and time limits of the current render."""
+    budget = _budget.get()
+    if budget is None:
+        yield from iterable
+        return
+    for iterations, item in enumerate(iterable, start=1):
+        budget.check_iterations(iterations)
+        budget.check_time()
+        yield item
+
+
+@lru_cache(maxsize=1024)
+def is_allowed_model_attribute(model: type[Model], attribute: str) -> bool:
+    """
+    Whether templates may read `attribute` from instances of `model`.
+
+    Fields (including relations), properties and `get_FOO_display()` methods are allowed;
+    other methods, such as `save()` or `delete()`, are not.
+    """
+    if attribute.startswith("_"):
+        return False
+    if attribute == "pk" or _DISPLAY_METHOD.match(attribute):
+        return True
+    try:
+        model._meta.get_field(attribute)
+    except FieldDoesNotExist:
+        return isinstance(getattr(model, attribute, None), (property, cached_property))
+    return True
+
+
+def is_allowed_attribute(obj, attribute: str) -> bool:
+    """Whether templates may read `attribute` from `obj`, following the model and queryset whitelists."""
+    if isinstance(obj, Model):
+        return is_allowed_model_attribute(type(obj), attribute)
+    if isinstance(obj, (Manager, QuerySet)):
+        return attribute in QUERYSET_METHODS
+    return True
+
+
+class _LoopLimiter(NodeTransformer):
+    """Wrap the iterable of every {% for %} loop with the loop limit filter."""
+
+    def visit_For(self, node: nodes.For) -> nodes.For:
+        node = self.generic_visit(node)
+        node.iter = nodes.Filter(node.iter, LOOP_LIMIT_FILTER, [], [], None, None, lineno=node.lineno)
+        return node
+
+
+class LabelEnvironment(ImmutableSandboxedEnvironment):
+    """
+    Sandboxed environment rendering label templates.
+
+    On top of Jinja2's immutable sandbox, model instances only expose their fields,
+    properties and display methods, querysets and managers only expose the read-only
+    methods of QUERYSET_METHODS, and loops are bounded by the current RenderBudget.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.filters[LOOP_LIMIT_FILTER] = limit_loop
+
+    def is_safe_attribute(self, obj, attr, value) -> bool:
+        return is_allowed_attribute(obj, attr) and super().is_safe_attribute(obj, attr, value)
+
+    def unsafe_undefined(self, obj, attribute):
+        # Fail instead of rendering an empty string in place of the refused attribute
+        raise SecurityError(f"access to attribute {attribute!r} of {type(obj).__name__!r} object is unsafe.")
+
+    def getattr(self, obj, attribute):
+        _check_time()
+        if not is_allowed_attribute(obj, attribute):
+            # Refused before the attribute is evaluated, so that it cannot trigger queries
+            return self.unsafe_undefined(obj, attribute)
+        return super().getattr(obj, attribute)
+
+    def getitem(self, obj, argument):
+        _check_time()
+        return super().getitem(obj, argument)
+
+    def call(__self, __context, __obj, *args, **kwargs):  # noqa: N805
+        _check_time()
+        return super().call(__context, __obj, *args, **kwargs)
+
+    def compile_template(self, source: str) -> Template:
+        """Compile a template string with its loops bounded by the loop limit filter."""
+        return self.from_string(_LoopLimiter().visit(self.parse(source)))
+
+
+@contextmanager
+def budget_scope(budget: RenderBudget):
+    """
+    Enforce `budget` on the templates rendered and the queries issued within the block.
+    """
+    token = _budget.set(budget)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(budget.query_wrapper))
+            yield budget
+    finally:
+        _budget.reset(token)
+
+
+def generate_label(template: Template, context: dict, budget: RenderBudget) -> str:
+    """
+    Render `template`, raising RenderBudgetExceeded as soon as `budget` is exhausted.
+
+    The output is generated chunk by chunk so that an oversized label is rejected
+    before it is fully produced. Queries are only counted within budget_scope().
+    """
+    output, length = [], 0
+    for chunk in template.generate(context):
+        length += len(chunk)
+        budget.check_length(length)
+        output.append(chunk)
+    budget.check_time()
+    return "".join(output)
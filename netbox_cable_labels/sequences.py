@@ -0,0 +1,161 @@
+"""
+Sequential counters for label templates, allocated in blocks.
+
+`next_sequence(scope)` hands out the values of a per-scope counter stored in LabelSequence.
+Each thread reserves a block of values with a single update of the counter row, then hands
+them out from memory, so concurrent saves and parallel workers only contend for the row once
+per block. Like a database sequence, the reservation is committed at once, on a connection of
+its own when the thread is within a transaction: the row is only locked while it is updated.
+Values reserved but not used, including those of rolled back transactions, are skipped:
+sequences have gaps, but never repeat a value.
+"""
+
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .models import LabelSequence
+
+_local = threading.local()
+
+# Adds `size` to the counter of a scope, created if needed, and returns the last value reserved
+_RESERVE_SQL = (
+    "INSERT INTO {table} ({scope}, {value}) VALUES (%s, %s) "
+    "ON CONFLICT ({scope}) DO UPDATE SET {value} = {table}.{value} + EXCLUDED.{value} RETURNING {value}"
+)
+
+
+@dataclass
+class _Block:
+    """Values `next` to `end` of a counter, reserved by the current thread."""
+
+    next: int
+    end: int
+
+    def is_usable(self) -> bool:
+        """Whether values remain."""
+        return self.next <= self.end
+
+
+class SequencePreview:
+    """Values counters would hand out, simulated without reserving anything."""
+
+    def __init__(self):
+        self.values: dict[str, int] = {}
+
+    def next(self, scope: str, using: str) -> int:
+        if scope not in self.values:
+            block = _get_blocks().get((using, scope))
+            if block is not None and block.is_usable():
+                self.values[scope] = block.next - 1
+            else:
+                stored = LabelSequence.objects.using(using).filter(scope=scope).values_list("value", flat=True).first()
+                self.values[scope] = stored or 0
+        self.values[scope] += 1
+        return self.values[scope]
+
+
+_preview: ContextVar[SequencePreview | None] = ContextVar("netbox_cable_labels_sequence_preview", default=None)
+
+
+def _get_blocks() -> dict[tuple[str, str], _Block]:
+    if not hasattr(_local, "blocks"):
+        _local.blocks = {}
+    return _local.blocks
+
+
+def _get_connections() -> dict:
+    if not hasattr(_local, "connections"):
+        _local.connections = {}
+    return _local.connections
+
+
+def _reserving_connection(using: str):
+    """
+    Return the connection to reserve blocks of the `using` database on.
+
+    Outside of a transaction, that is the connection of the thread. Within one, it is a second
+    connection of the thread, in autocommit mode, so that the counter row is not left locked
+    until the caller's transaction ends.
+    """
+    connection = connections[using]
+    if not connection.in_atomic_block:
+        return connection
+    reserving = _get_connections().get(using)
+    if reserving is None:
+        reserving = _get_connections()[using] = connection.copy()
+    return reserving
+
+
+def close_reserving_connections(obsolete_only: bool = False):
+    """
+    Close the second connections the current thread opened to reserve blocks.
+
+    With `obsolete_only`, only those unusable or past CONN_MAX_AGE are closed, as Django does
+    with its own connections at the start and end of every request.
+    """
+    for connection in _get_connections().values():
+        if obsolete_only:
+            connection.close_if_unusable_or_obsolete()
+        else:
+            connection.close()
+
+
+def reserve_block(scope: str, size: int, using: str = DEFAULT_DB_ALIAS) -> tuple[int, int]:
+    """
+    Reserve the next `size` values of the counter of `scope`, returning the first and the last one.
+
+    The reservation is committed right away, whatever transaction the caller is in.
+    """
+    connection = _reserving_connection(using)
+    quote = connection.ops.quote_name
+    sql = _RESERVE_SQL.format(table=quote(LabelSequence._meta.db_table), scope=quote("scope"), value=quote("value"))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [scope, size])
+        (end,) = cursor.fetchone()
+    return end - size + 1, end
+
+
+def allocate(scope: str, block_size: int, using: str = DEFAULT_DB_ALIAS) -> int:
+    """
+    Return the next value of the counter of `scope`.
+
+    A block of `block_size` values is reserved when the thread has none left.
+    """
+    if (preview := _preview.get()) is not None:
+        return preview.next(scope, using)
+    blocks = _get_blocks()
+    block = blocks.get((using, scope))
+    if block is None or not block.is_usable():
+        first, end = reserve_block(scope, max(block_size, 1), using)
+        block = blocks[(using, scope)] = _Block(next=first, end=end)
+    value = block.next
+    block.next += 1
+    return value
+
+
+@contextmanager
+def previewing(preview: SequencePreview | None = None) -> Iterator[SequencePreview]:
+    """
+    Simulate counters instead of reserving values, for labels which are rendered but not stored.
+
+    Pass the same `preview` to successive blocks to carry on with the values they simulated.
+    Previewed values continue the block of the current thread, or the stored counter. Other
+    processes may take values in the meantime, so they can differ from the values given when
+    labeling for real.
+    """
+    preview = preview if preview is not None else SequencePreview()
+    token = _preview.set(preview)
+    try:
+        yield preview
+    finally:
+        _preview.reset(token)
+
+
+def discard_blocks():
+    """Forget the blocks reserved by the current thread; their remaining values are skipped."""
+    _get_blocks().clear()
@@ -1,23 +1,227 @@
+import logging
+
+from circuits.models import CircuitTermination
+from dcim.models import (
+    ConsolePort,
+    ConsoleServerPort,
+    Device,
+    FrontPort,
+    Interface,
+    Location,
+    PowerFeed,
+    PowerOutlet,
+    PowerPort,
+    Rack,
+    RearPort,
+    Site,
+)
 from dcim.models.cables import Cable
-from django.db.models.signals import post_save, pre_save
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
+from django.test.signals import setting_changed
+
+from .analysis import get_template_dependencies
+from .bulk import record_fingerprints
+from .deferred import defer_label, deferral_enabled
+from .metrics import instrument_receiver
+from .models import LabelTemplate
+from .prefetch import prefetched
+from .propagation import propagation_enabled, relabel_related_cables, relabel_termination_cable
+from .registry import publish_template_change
+from .render_cache import input_record, render_with_cache
+from .routing import CABLE_LOOKUPS
+from .sequences import close_reserving_connections
+from .uniqueness import cable_scope, get_uniqueness_scope, resolve_collisions
+from .utils import clear_template_cache, get_dispatch_table, get_template_fingerprint, render_label, snapshot_changed
+
+logger = logging.getLogger("netbox_cable_labels.signals")
+
+
+def _skip_update(*_args, **_kwargs) -> bool:
+    # Stands in for Model._do_update() on a cable given a reserved primary key: no row has it
+    # yet, so Django goes straight to the INSERT instead of trying an UPDATE first
+    return False
+
+
+def _reserve_pk(instance: Cable, using: str) -> bool:
+    """
+    Assign the next primary key of the Cable sequence to an unsaved instance.
+
+    The instance is then inserted without first trying to update a row with that key.
+    Returns False when the database does not support reserving it ahead of the INSERT.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT nextval(pg_get_serial_sequence(%s, %s))", [Cable._meta.db_table, Cable._meta.pk.column])
+        instance.pk = cursor.fetchone()[0]
+    instance._do_update = _skip_update
+    return True
+
 
-from .utils import render_label
+def _release_pk(instance: Cable):
+    """
+    Undo the labeling of a new cable whose INSERT failed after its primary key was reserved.
+
+    The reserved key, and the label rendered from it, are dropped so that saving the
+    cable again starts over instead of inserting it without checking for an existing row.
+    """
+    del instance.__dict__["_do_update"]
+    instance.__dict__.pop("_label_fingerprint", None)
+    instance.__dict__.pop("_label_scope", None)
+    instance.pk = None
+    instance.label = ""
+
+
+def _label_cable(instance: Cable):
+    """Render the label of a cable being saved and handle collisions with the labels of its scope."""
+    if (inputs := input_record(instance)) is not None:
+        # Only the values the template reads are loaded, and looked up in the render cache
+        record, label_template = inputs
+        (label,) = render_with_cache([record], label_template, lambda cable: render_label(cable, label_template))
+        scope = cable_scope(instance)
+    else:
+        with prefetched(instance):
+            label = render_label(instance)
+            scope = cable_scope(instance)
+    (instance.label,), collisions = resolve_collisions([instance.pk], [label], [scope])
+    for collision in collisions:
+        logger.warning(str(collision))
+    instance._label_fingerprint = get_template_fingerprint()
+    instance._label_scope = scope
+
+
+def _label_inputs_changed(instance: Cable) -> bool:
+    """
+    Whether saving a stored cable can change the label rendered for it.
+
+    Compares the cable fields the templates and template rules read, and the label, with
+    the pre-change snapshot NetBox takes before editing an object. Changes to the objects
+    the terminations lead to are followed by the relabeling on change instead.
+    """
+    if getattr(instance, "_terminations_modified", False):
+        return True
+    attributes = {"label"}
+    for path in get_template_dependencies().cable_paths:
+        name = path[0]
+        if name in ("pk", "id"):
+            continue
+        # get_FOO_display() reads the FOO field
+        if name.startswith("get_") and name.endswith("_display"):
+            name = name[4 : -len("_display")]
+        attributes.add(name)
+    attributes |= {CABLE_LOOKUPS[key].split("__")[0] for key in get_dispatch_table().keys if key in CABLE_LOOKUPS}
+    if get_uniqueness_scope() == "tenant":
+        attributes.add("tenant")
+    return snapshot_changed(instance, attributes)
 
 
 @receiver(pre_save, sender=Cable)
-def handle_cable_label(instance: Cable, **_kwargs):
+@instrument_receiver
+def handle_cable_label(instance: Cable, using: str = "default", **_kwargs):
     """
-    Update cable label if not defined when Cable is updated.
+    Update cable label if not defined when Cable is saved.
+
+    New cables are labeled before they are inserted so that a single write is needed.
+    If the template depends on the primary key, it is reserved from the sequence first.
+    Stored cables are skipped when none of the fields the label depends on changed.
     """
-    if instance.pk is not None and (instance.label is None or instance.label == ""):
-        instance.label = render_label(instance)
+    if "_do_update" in instance.__dict__:
+        # handle_new_cable_label did not run: the previous save() of this cable failed
+        _release_pk(instance)
+    if instance.label is not None and instance.label != "":
+        return
+    if not instance._state.adding and not _label_inputs_changed(instance):
+        return
+    if deferral_enabled(using):
+        instance.label = ""
+        if not instance._state.adding:
+            defer_label(instance.pk, using)
+        return
+    if instance.pk is None and get_template_dependencies().uses_pk and not _reserve_pk(instance, using):
+        # Labeled by handle_new_cable_label once the primary key is known
+        return
+    _label_cable(instance)
 
 
 @receiver(post_save, sender=Cable)
-def handle_new_cable_label(instance: Cable, created: bool, **_kwargs):
+@instrument_receiver
+def handle_new_cable_label(instance: Cable, created: bool, using: str = "default", **_kwargs):
+    """
+    Update cable label if not defined when Cable is created, and record which
+    template version generated the label.
+    """
+    instance.__dict__.pop("_do_update", None)
+    # Cables labeled by handle_cable_label carry the fingerprint of their template
+    if created and (instance.label is None or instance.label == "") and "_label_fingerprint" not in instance.__dict__:
+        if deferral_enabled(using):
+            defer_label(instance.pk, using)
+            return
+        _label_cable(instance)
+        Cable.objects.filter(pk=instance.pk).update(label=instance.label)
+
+    # Record the template version which generated the label, once the cable is stored
+    scope = instance.__dict__.pop("_label_scope", "")
+    if (template_hash := instance.__dict__.pop("_label_fingerprint", None)) and instance.label:
+        record_fingerprints([instance], template_hash, [scope])
+
+
+@receiver(post_save, sender=Device)
+@receiver(post_save, sender=Rack)
+@receiver(post_save, sender=Location)
+@receiver(post_save, sender=Site)
+@instrument_receiver
+def handle_related_object_change(instance, created: bool, using: str = "default", **_kwargs):
+    """
+    Regenerate the labels rendered from a Device, Rack, Location or Site when it changes.
+    """
+    if not created and propagation_enabled():
+        relabel_related_cables(instance, using)
+
+
+@receiver(post_save, sender=Interface)
+@receiver(post_save, sender=FrontPort)
+@receiver(post_save, sender=RearPort)
+@receiver(post_save, sender=ConsolePort)
+@receiver(post_save, sender=ConsoleServerPort)
+@receiver(post_save, sender=PowerPort)
+@receiver(post_save, sender=PowerOutlet)
+@receiver(post_save, sender=PowerFeed)
+@receiver(post_save, sender=CircuitTermination)
+@instrument_receiver
+def handle_termination_change(instance, created: bool, using: str = "default", **_kwargs):
+    """
+    Regenerate the label rendered from a cable termination when it changes.
+    """
+    if not created and propagation_enabled():
+        relabel_termination_cable(instance, using)
+
+
+@receiver(post_save, sender=LabelTemplate)
+@receiver(post_delete, sender=LabelTemplate)
+def handle_label_template_change(using: str = "default", **_kwargs):
+    """
+    Have every worker reload the active template version once the change is committed.
+    """
+    publish_template_change(using)
+
+
+@receiver(request_started)
+@receiver(request_finished)
+def handle_request_boundary(**_kwargs):
+    """
+    Close the connections reserving sequence blocks once obsolete, as Django does for its own.
+    """
+    close_reserving_connections(obsolete_only=True)
+
+
+@receiver(setting_changed)
+def handle_plugins_config_changed(setting: str, **_kwargs):
     """
-    Update cable label if not defined when Cable is created.
+    Invalidate compiled templates when the plugin configuration changes.
     """
-    if created and (instance.label is None or instance.label == ""):
-        Cable.objects.filter(pk=instance.pk).update(label=render_label(instance))
+    if setting == "PLUGINS_CONFIG":
+        clear_template_cache()
@@ -0,0 +1,86 @@
+"""Test static analysis of label templates."""
+
+from django.test import TestCase, override_settings
+
+from netbox_cable_labels.analysis import analyze_template, get_template_dependencies
+
+
+class AnalyzeTemplateTestCase(TestCase):
+    """Test the attribute paths detected in templates."""
+
+    def test_default_template(self):
+        """Test that the default template only reads the primary key."""
+        dependencies = analyze_template("#{{cable.pk}}")
+
+        self.assertEqual(dependencies.paths, {("pk",)})
+        self.assertTrue(dependencies.uses_pk)
+        self.assertFalse(dependencies.uses_terminations)
+
+    def test_termination_chains(self):
+        """Test that accessor calls are dropped from termination chains."""
+        dependencies = analyze_template(
+            "{{cable.a_terminations.first().device.rack.name}}-{{(cable.b_terminations|first).device.name}}"
+        )
+
+        self.assertEqual(
+            dependencies.paths,
+            {("a_terminations", "device", "rack", "name"), ("b_terminations", "device", "name")},
+        )
+        self.assertEqual(dependencies.termination_paths, {("device", "rack", "name"), ("device", "name")})
+        self.assertFalse(dependencies.uses_pk)
+
+    def test_set_aliases(self):
+        """Test that variables assigned with set are followed."""
+        dependencies = analyze_template(
+            "{% set a = cable.a_terminations.first() %}{{a.device.device_type.manufacturer.name[:3]|upper}}-{{a.name}}"
+        )
+
+        self.assertIn(("a_terminations", "device", "device_type", "manufacturer", "name"), dependencies.paths)
+        self.assertIn(("a_terminations", "name"), dependencies.paths)
+
+    def test_for_loop_aliases(self):
+        """Test that loop variables iterating over terminations are followed."""
+        dependencies = analyze_template("{% for term in cable.a_terminations %}{{term.device.site.name}}{% endfor %}")
+
+        self.assertIn(("a_terminations", "device", "site", "name"), dependencies.paths)
+
+    def test_arguments_are_analyzed(self):
+        """Test that expressions passed to filters and calls are analyzed."""
+        dependencies = analyze_template(
+            "{{cable.a_terminations.first().device.location.name|default(cable.a_terminations.first().device.site.name)}}"
+            "{{'{:05d}'.format(cable.pk)}}"
+        )
+
+        self.assertIn(("a_terminations", "device", "location", "name"), dependencies.paths)
+        self.assertIn(("a_terminations", "device", "site", "name"), dependencies.paths)
+        self.assertTrue(dependencies.uses_pk)
+
+    def test_cable_paths(self):
+        """Test that cable attributes are separated from termination attributes."""
+        dependencies = analyze_template("{{cable.tenant.name}}/{{cable.type}}/{{cable.a_terminations.first().name}}")
+
+        self.assertEqual(dependencies.cable_paths, {("tenant", "name"), ("type",)})
+
+    def test_untracked_variables_are_ignored(self):
+        """Test that names other than the cable are not reported."""
+        dependencies = analyze_template("{{ foo.bar }}{{ range(3)|join }}")
+
+        self.assertEqual(dependencies.paths, frozenset())
+
+    @override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "{{cable.color}}"}})
+    def test_configured_template(self):
+        """Test that the configured template is analyzed."""
+        self.assertEqual(get_template_dependencies().paths, {("color",)})
+
+    def test_shortcut_variables(self):
+        """Test that the termination shortcuts map to their cable paths."""
+        dependencies = analyze_template("{{a_rack.name}}/{{b_term.name}}/{{a_device.site.name}}")
+
+        self.assertEqual(
+            dependencies.paths,
+            {
+                ("a_terminations", "device", "rack", "name"),
+                ("b_terminations", "name"),
+                ("a_terminations", "device", "site", "name"),
+            },
+        )
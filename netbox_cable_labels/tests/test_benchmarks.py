@@ -0,0 +1,91 @@
+"""Test the benchmark suite and the benchmark_labels management command."""
+
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from dcim.models import Cable, Device
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from netbox_cable_labels.benchmarks import TEMPLATE_EXAMPLES, benchmark_render, compare_reports
+from netbox_cable_labels.utils import render_label
+
+
+class BenchmarkLabelsCommandTestCase(TestCase):
+    """Test the benchmark_labels management command on small fixtures."""
+
+    def _run(self, **options):
+        out = StringIO()
+        call_command("benchmark_labels", sizes="5,10", iterations=2, saves=3, stdout=out, stderr=StringIO(), **options)
+        return out
+
+    def test_report(self):
+        """Test that the report covers rendering, saving and bulk generation."""
+        report = json.loads(self._run().getvalue())
+
+        self.assertEqual([result["template"] for result in report["render"]], list(TEMPLATE_EXAMPLES))
+        default = report["render"][0]
+        self.assertNotIn("error", default)
+        self.assertEqual(default["queries_per_render"], 0)
+        self.assertEqual(report["save"]["saves"], 3)
+        self.assertEqual([result["cables"] for result in report["generate"]], [5, 10])
+        self.assertEqual([result["labeled"] for result in report["generate"]], [5, 10])
+
+    def test_render_each_example(self):
+        """Test that every example is rendered with its own template."""
+        with patch("netbox_cable_labels.benchmarks.render_label", wraps=render_label) as mock_render:
+            benchmark_render(iterations=1)
+
+        self.assertEqual({call.args[1] for call in mock_render.call_args_list}, set(TEMPLATE_EXAMPLES.values()))
+
+    def test_fixtures_rolled_back(self):
+        """Test that the synthetic objects are not kept."""
+        self._run()
+
+        self.assertFalse(Cable.objects.exists())
+        self.assertFalse(Device.objects.exists())
+
+    def test_compare_with_previous_report(self):
+        """Test that --compare fails when a measurement regressed beyond the threshold."""
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = os.path.join(directory, "baseline.json")
+            self._run(output=baseline)
+            with open(baseline, encoding="utf-8") as baseline_file:
+                report = json.load(baseline_file)
+            for result in report["generate"]:
+                result["cables_per_second"] *= 1000
+            with open(baseline, "w", encoding="utf-8") as baseline_file:
+                json.dump(report, baseline_file)
+
+            with self.assertRaisesMessage(CommandError, "cables_per_second"):
+                self._run(compare=baseline)
+
+    def test_invalid_sizes(self):
+        """Test that sizes must be positive integers."""
+        with self.assertRaises(CommandError):
+            self._run(sizes="10,abc")
+
+
+class CompareReportsTestCase(TestCase):
+    """Test the detection of regressions between two reports."""
+
+    def test_regressions(self):
+        """Test that growing timings and shrinking throughputs are reported beyond the threshold."""
+        baseline = {
+            "render": [{"template": "default", "warm_ms": 1.0, "queries_per_render": 0}],
+            "generate": [{"cables": 10, "cables_per_second": 100.0, "queries_per_cable": 0.5}],
+        }
+        report = {
+            "render": [{"template": "default", "warm_ms": 1.05, "queries_per_render": 2}],
+            "generate": [{"cables": 10, "cables_per_second": 50.0, "queries_per_cable": 0.5}],
+        }
+
+        regressions = compare_reports(baseline, report, threshold=0.1)
+
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith("render default queries_per_render"))
+        self.assertTrue(regressions[1].startswith("generate 10 cables_per_second"))
@@ -0,0 +1,91 @@
+"""Test the labeling of cables created by a bulk import."""
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from dcim.models import Cable
+from django.test import override_settings
+from netbox.context import current_request
+from netbox.views.generic import BulkImportView, ObjectListView
+
+from netbox_cable_labels.deferred import bulk_import, bulk_import_active
+from netbox_cable_labels.tests.utils import CableTestCase
+from netbox_cable_labels.utils import render_label
+
+
+def _request(view_class, method="POST"):
+    return SimpleNamespace(method=method, resolver_match=SimpleNamespace(func=SimpleNamespace(view_class=view_class)))
+
+
+class BulkImportTestCase(CableTestCase):
+    """Test that cables created by a bulk import are labeled in one batch once it commits."""
+
+    def _import_cables(self, count, **kwargs):
+        with (
+            patch("netbox_cable_labels.bulk.render_label", wraps=render_label) as mock_render_label,
+            patch("netbox_cable_labels.signals._label_cable") as mock_label_cable,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            cables = [self.create_cable(f"eth{index}", **kwargs) for index in range(count)]
+            self.assertFalse(Cable.objects.exclude(label="").exists())
+        mock_label_cable.assert_not_called()
+        self.assertEqual(mock_render_label.call_count, count)
+        return cables
+
+    def test_context_manager(self):
+        """Test that cables saved within bulk_import() are labeled by a single batch on commit."""
+        with bulk_import():
+            cables = self._import_cables(3)
+
+        for cable in cables:
+            cable.refresh_from_db()
+            self.assertEqual(cable.label, f"#{cable.pk}")
+
+    def test_single_update(self):
+        """Test that the labels of the imported cables are written with one UPDATE statement."""
+        with (
+            bulk_import(),
+            patch.object(Cable.objects, "bulk_update", wraps=Cable.objects.bulk_update) as mock_bulk_update,
+        ):
+            self._import_cables(3)
+
+        mock_bulk_update.assert_called_once()
+        self.assertEqual(len(mock_bulk_update.call_args.args[0]), 3)
+
+    def test_import_view_request(self):
+        """Test that saving cables while NetBox's bulk import view handles the request defers their labels."""
+        token = current_request.set(_request(BulkImportView))
+        self.addCleanup(current_request.reset, token)
+
+        self.assertTrue(bulk_import_active())
+        cables = self._import_cables(2)
+
+        for cable in cables:
+            cable.refresh_from_db()
+            self.assertEqual(cable.label, f"#{cable.pk}")
+
+    def test_other_requests(self):
+        """Test that requests to other views, or not posting, are not taken for imports."""
+        requests = (_request(ObjectListView), _request(BulkImportView, method="GET"), SimpleNamespace(method="POST"))
+        for request in requests:
+            token = current_request.set(request)
+            try:
+                self.assertFalse(bulk_import_active())
+            finally:
+                current_request.reset(token)
+
+    @override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"defer_bulk_imports": False}})
+    def test_import_view_disabled(self):
+        """Test that imports through the view label cables row by row unless enabled."""
+        token = current_request.set(_request(BulkImportView))
+        self.addCleanup(current_request.reset, token)
+
+        self.assertFalse(bulk_import_active())
+
+    def test_explicit_labels_kept(self):
+        """Test that the labels given in the import are not replaced."""
+        with bulk_import(), self.captureOnCommitCallbacks(execute=True):
+            cable = self.create_cable("eth0", label="IMPORTED")
+
+        cable.refresh_from_db()
+        self.assertEqual(cable.label, "IMPORTED")
@@ -0,0 +1,86 @@
+"""Test deferred labeling of cables on transaction commit."""
+
+from unittest.mock import patch
+
+from dcim.models import Cable
+from django.db import IntegrityError, transaction
+from django.test import override_settings
+
+from netbox_cable_labels.tests.utils import CableTestCase
+from netbox_cable_labels.utils import render_label
+
+
+@override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"defer_labeling": True}})
+class DeferredLabelingTestCase(CableTestCase):
+    """Test that labels are rendered once the transaction commits."""
+
+    def test_new_cable_labeled_on_commit(self):
+        """Test that a new cable is only labeled when the transaction commits."""
+        with self.captureOnCommitCallbacks(execute=True):
+            cable = self.create_cable("eth0")
+            self.assertEqual(Cable.objects.get(pk=cable.pk).label, "")
+
+        cable.refresh_from_db()
+        self.assertEqual(cable.label, f"#{cable.pk}")
+
+    def test_updated_cable_labeled_on_commit(self):
+        """Test that clearing the label of a cable defers its rendering."""
+        cable = self.create_cable("eth0", label="temporary")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cable.label = None
+            cable.save()
+            self.assertEqual(Cable.objects.get(pk=cable.pk).label, "")
+
+        cable.refresh_from_db()
+        self.assertEqual(cable.label, f"#{cable.pk}")
+
+    def test_rolled_back_cable_labeled_on_next_commit(self):
+        """Test that a cable queued by a rolled back transaction is labeled when saved again."""
+        cable = self.create_cable("eth0", label="temporary")
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            cable.label = None
+            cable.save()
+            raise IntegrityError("Form validation failed")
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            cable = Cable.objects.get(pk=cable.pk)
+            cable.label = None
+            cable.save()
+
+        self.assertEqual(len(callbacks), 1)
+        cable.refresh_from_db()
+        self.assertEqual(cable.label, f"#{cable.pk}")
+
+    def test_repeated_saves_rendered_once(self):
+        """Test that saving the same cable several times renders its label once."""
+        with (
+            patch("netbox_cable_labels.bulk.render_label", wraps=render_label) as mock_render_label,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            cable = self.create_cable("eth0")
+            cable.save()
+            cable.save()
+
+        mock_render_label.assert_called_once()
+        cable.refresh_from_db()
+        self.assertEqual(cable.label, f"#{cable.pk}")
+
+    def test_cables_labeled_in_one_pass(self):
+        """Test that every cable saved in the transaction is labeled by a single flush."""
+        with (
+            patch("netbox_cable_labels.deferred.label_pending_cables", return_value=3) as mock_label,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            cables = [self.create_cable(f"eth{index}") for index in range(3)]
+
+        mock_label.assert_called_once()
+        self.assertEqual(sorted(mock_label.call_args.args[0]), sorted(cable.pk for cable in cables))
+
+    @override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"defer_labeling": False}})
+    def test_disabled(self):
+        """Test that cables are labeled immediately when deferral is disabled."""
+        cable = self.create_cable("eth0")
+
+        self.assertEqual(Cable.objects.get(pk=cable.pk).label, f"#{cable.pk}")
@@ -0,0 +1,102 @@
+"""Test the fast path rendering simple templates without the Jinja2 runtime."""
+
+from functools import partial
+from unittest.mock import Mock, patch
+
+from django.test import TestCase
+from jinja2 import pass_context
+
+from netbox_cable_labels.benchmarks import TEMPLATE_EXAMPLES
+from netbox_cable_labels.fastpath import Unsupported, compile_fast_path
+from netbox_cable_labels.sandbox import RenderBudget, generate_label
+from netbox_cable_labels.tests.utils import template_method
+from netbox_cable_labels.utils import _environment, compile_renderer, compile_template, parse_template
+
+TEMPLATES = [
+    *TEMPLATE_EXAMPLES.values(),
+    "{% set a = cable.a_terminations.first() %}{{a.device.device_type.manufacturer.name[:3]|upper}}{{a.device.name}}",
+    "{{cable.color[:3]|upper if cable.color else 'BLU'}}/{{cable.type if cable.type else 'UNK'}}",
+    "{% if cable.length > 5 and cable.type != 'CAT6' %}L{% elif not cable.color %}C{% else %}-{% endif %}",
+    "{{cable.missing|default('none')}}/{{cable.a_terminations.first().device.position|string|length}}",
+    "{{cable.length ~ cable.length_unit}}{{'{:02d}-{}'.format(cable.pk, cable.type)}}",
+]
+
+
+class FastPathTestCase(TestCase):
+    """Test that the fast path renders the same labels as Jinja2."""
+
+    def setUp(self):
+        """Set up a mock cable with one termination on each side."""
+        site = Mock()
+        site.name = "NYC"
+        rack = Mock()
+        rack.name = "R1A"
+        manufacturer = Mock()
+        manufacturer.name = "Cisco"
+        device = Mock(site=site, rack=rack, position=42, face="front")
+        device.name = "SW01"
+        device.location.name = "Floor2"
+        device.device_type.manufacturer = manufacturer
+        termination = Mock(device=device)
+        termination.name = "gi1/0/1"
+        terminations = Mock()
+        terminations.first = template_method(return_value=termination)
+
+        self.cable = Mock(spec=["pk", "type", "color", "length", "length_unit", "a_terminations", "b_terminations"])
+        self.cable.pk = 123
+        self.cable.type = "CAT6A"
+        self.cable.color = "blue"
+        self.cable.length = 10
+        self.cable.length_unit = "m"
+        self.cable.a_terminations = terminations
+        self.cable.b_terminations = terminations
+        self.variables = {"cable": self.cable, "a_rack": rack, "b_rack": rack, "a_device": device, "b_device": device}
+
+    def _render_both(self, label_template):
+        template = compile_template(label_template)
+        fast = compile_fast_path(_environment, template, parse_template(label_template))
+        return fast(self.variables, RenderBudget()), generate_label(template, self.variables, RenderBudget())
+
+    def test_same_labels_as_jinja(self):
+        """Test that every supported template renders the same label as with Jinja2."""
+        for label_template in TEMPLATES:
+            with self.subTest(label_template=label_template):
+                fast, jinja = self._render_both(label_template)
+                self.assertEqual(fast, jinja)
+
+    def test_repeated_expressions_evaluated_once(self):
+        """Test that an expression used several times in a template is evaluated once per label."""
+        label_template = "{{cable.a_terminations.first().name}}-{{cable.a_terminations.first().device.name}}"
+        fast = compile_fast_path(_environment, compile_template(label_template), parse_template(label_template))
+
+        self.assertEqual(fast(self.variables, RenderBudget()), "gi1/0/1-SW01")
+        self.cable.a_terminations.first.assert_called_once()
+
+    def test_unsupported_constructs(self):
+        """Test that templates outside of the supported subset are rejected by the fast path."""
+        for label_template in (
+            "{% for term in cable.a_terminations.all() %}{{term.name}}{% endfor %}",
+            "{{cable.pk + 1}}",
+            "{{cable.pk is none}}",
+            "{{cable.name|replace('a', 'b')}}",
+        ):
+            with self.subTest(label_template=label_template), self.assertRaises(Unsupported):
+                compile_fast_path(_environment, compile_template(label_template), parse_template(label_template))
+
+    def test_context_functions_unsupported(self):
+        """Test that calls of global functions taking the context are left to Jinja2."""
+        label_template = "{{cable.pk}}-{{counter()}}"
+
+        @pass_context
+        def counter(context):
+            return len(context)
+
+        with patch.dict(_environment.globals, {"counter": counter}), self.assertRaises(Unsupported):
+            compile_fast_path(_environment, compile_template(label_template), parse_template(label_template))
+
+    def test_unsupported_templates_rendered_by_jinja(self):
+        """Test that templates outside of the subset are still rendered."""
+        renderer = compile_renderer("{% for i in [1, 2] %}{{i}}{% endfor %}")
+
+        self.assertIsInstance(renderer, partial)
+        self.assertEqual(renderer({}, RenderBudget()), "12")
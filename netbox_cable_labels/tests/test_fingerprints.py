@@ -0,0 +1,71 @@
+"""Test the template fingerprints recorded for generated labels."""
+
+from io import StringIO
+
+from dcim.models import Cable
+from django.core.management import call_command
+from django.test import override_settings
+
+from netbox_cable_labels.bulk import stale_cables
+from netbox_cable_labels.models import LabelFingerprint
+from netbox_cable_labels.tests.utils import CableTestCase
+from netbox_cable_labels.utils import template_fingerprint
+
+NEW_TEMPLATE = "C{{cable.pk}}"
+
+
+class LabelFingerprintTestCase(CableTestCase):
+    """Test that fingerprints are recorded and used to find stale labels."""
+
+    def test_fingerprint_recorded_on_create(self):
+        """Test that a generated label is recorded with the template hash."""
+        cable = self.create_cable("eth0")
+
+        fingerprint = LabelFingerprint.objects.get(cable=cable)
+        self.assertEqual(fingerprint.label, f"#{cable.pk}")
+        self.assertEqual(fingerprint.template_hash, template_fingerprint("#{{cable.pk}}"))
+
+    def test_no_fingerprint_for_manual_label(self):
+        """Test that labels set by hand are not recorded."""
+        cable = self.create_cable("eth0", label="Manual")
+
+        self.assertFalse(LabelFingerprint.objects.filter(cable=cable).exists())
+
+    def test_fingerprint_recorded_by_command(self):
+        """Test that generate_labels records the fingerprints of the labels it writes."""
+        cable = self.create_cable("eth0", label="temp")
+        Cable.objects.filter(pk=cable.pk).update(label="")
+
+        call_command("generate_labels", stdout=StringIO())
+
+        self.assertEqual(LabelFingerprint.objects.get(cable=cable).label, f"#{cable.pk}")
+
+    def test_stale_cables(self):
+        """Test that only unedited labels generated by another template are stale."""
+        generated = self.create_cable("eth0")
+        edited = self.create_cable("eth1")
+        edited.label = "Edited"
+        edited.save()
+        manual = self.create_cable("eth2", label="Manual")
+
+        self.assertFalse(stale_cables().exists())
+        with override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": NEW_TEMPLATE}}):
+            self.assertEqual(list(stale_cables()), [generated])
+        self.assertNotIn(manual, stale_cables())
+
+    def test_generate_labels_since_template_change(self):
+        """Test that --since-template-change only regenerates stale labels."""
+        generated = self.create_cable("eth0")
+        edited = self.create_cable("eth1")
+        Cable.objects.filter(pk=edited.pk).update(label="Edited")
+
+        with override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": NEW_TEMPLATE}}):
+            call_command("generate_labels", since_template_change=True, stdout=StringIO())
+
+        generated.refresh_from_db()
+        edited.refresh_from_db()
+        self.assertEqual(generated.label, f"C{generated.pk}")
+        self.assertEqual(edited.label, "Edited")
+        self.assertEqual(
+            LabelFingerprint.objects.get(cable=generated).template_hash, template_fingerprint(NEW_TEMPLATE)
+        )
@@ -0,0 +1,148 @@
+"""Test the background job labeling cables."""
+
+import uuid
+from io import StringIO
+from unittest.mock import patch
+
+from core.models import Job
+from dcim.models import Cable
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from netbox_cable_labels.jobs import LabelCablesJob, resume_job
+from netbox_cable_labels.tests.utils import CableTestCase
+
+
+class LabelCablesJobTestCase(CableTestCase):
+    """Test LabelCablesJob and its entry points."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up unlabeled cables."""
+        super().setUpTestData()
+        cls.cables = cls.create_unlabeled_cables(5)
+
+    def _run_job(self, **kwargs):
+        job = Job.objects.create(name="Label cables", job_id=uuid.uuid4())
+        LabelCablesJob(job).run(**kwargs)
+        return job
+
+    def test_job_labels_cables(self):
+        """Test that the job labels every unlabeled cable and records its progress."""
+        job = self._run_job(batch_size=2)
+
+        for cable in self.cables:
+            cable.refresh_from_db()
+            self.assertEqual(cable.label, f"#{cable.pk}")
+        self.assertEqual(job.data["labeled"], 5)
+        self.assertEqual(job.data["last_pk"], self.cables[-1].pk)
+
+    @patch("netbox_cable_labels.jobs.close_reserving_connections")
+    def test_job_closes_reserving_connections(self, mock_close):
+        """Test that the connections reserving sequence blocks are closed once the job ends."""
+        self._run_job()
+
+        mock_close.assert_called_once_with()
+
+    def test_job_limited_to_range(self):
+        """Test that only cables within the primary key range are labeled."""
+        job = self._run_job(start=self.cables[1].pk, end=self.cables[2].pk)
+
+        self.assertEqual(job.data["labeled"], 2)
+        self.assertEqual(Cable.objects.filter(label="").count(), 3)
+
+    def test_resume_job(self):
+        """Test that a resumed job starts after the last committed batch."""
+        job = Job.objects.create(
+            name="Label cables",
+            job_id=uuid.uuid4(),
+            data={"start": None, "end": None, "batch_size": 2, "last_pk": self.cables[1].pk, "labeled": 2},
+        )
+
+        with patch.object(LabelCablesJob, "enqueue") as mock_enqueue:
+            resume_job(job)
+
+        mock_enqueue.assert_called_once_with(user=None, start=self.cables[1].pk + 1, end=None, batch_size=2)
+
+    def test_command_enqueues_job(self):
+        """Test that generate_labels --background enqueues a job."""
+        job = Job(pk=1, job_id=uuid.uuid4())
+        out = StringIO()
+
+        with patch.object(LabelCablesJob, "enqueue", return_value=job) as mock_enqueue:
+            call_command("generate_labels", background=True, batch_size=100, stdout=out)
+
+        mock_enqueue.assert_called_once_with(batch_size=100)
+        self.assertIn("Enqueued job 1", out.getvalue())
+        self.assertEqual(Cable.objects.filter(label="").count(), 5)
+
+    def test_command_resumes_job(self):
+        """Test that generate_labels --resume enqueues a job continuing after the last committed batch."""
+        job = Job.objects.create(
+            name=LabelCablesJob.name,
+            job_id=uuid.uuid4(),
+            data={"start": None, "end": 100, "batch_size": 2, "last_pk": self.cables[1].pk, "labeled": 2},
+        )
+        resumed = Job(pk=job.pk + 1, job_id=uuid.uuid4())
+        out = StringIO()
+
+        with patch.object(LabelCablesJob, "enqueue", return_value=resumed) as mock_enqueue:
+            call_command("generate_labels", resume=job.pk, stdout=out)
+
+        mock_enqueue.assert_called_once_with(user=None, start=self.cables[1].pk + 1, end=100, batch_size=2)
+        self.assertIn(f"resuming job {job.pk}", out.getvalue())
+
+    def test_command_resume_unknown_job(self):
+        """Test that --resume rejects jobs which do not label cables."""
+        job = Job.objects.create(name="Other job", job_id=uuid.uuid4())
+
+        with patch.object(LabelCablesJob, "enqueue") as mock_enqueue, self.assertRaises(CommandError):
+            call_command("generate_labels", resume=job.pk, stdout=StringIO())
+
+        mock_enqueue.assert_not_called()
+
+
+class LabelCablesJobAPITestCase(TestCase):
+    """Test the API endpoint enqueuing LabelCablesJob."""
+
+    def setUp(self):
+        """Set up an authenticated API client."""
+        self.user = get_user_model().objects.create(username="testuser")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse("plugins-api:netbox_cable_labels-api:label_cables_job")
+
+    def test_enqueue_job(self):
+        """Test that a job is enqueued with the requested parameters."""
+        self.user.is_superuser = True
+        self.user.save()
+        job = Job.objects.create(name="Label cables", job_id=uuid.uuid4())
+
+        with patch.object(LabelCablesJob, "enqueue", return_value=job) as mock_enqueue:
+            response = self.client.post(self.url, {"start": 10, "batch_size": 50}, format="json")
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["id"], job.pk)
+        self.assertEqual(mock_enqueue.call_args.kwargs["start"], 10)
+        self.assertEqual(mock_enqueue.call_args.kwargs["batch_size"], 50)
+
+    def test_enqueue_job_invalid_range(self):
+        """Test that an inverted range is rejected."""
+        self.user.is_superuser = True
+        self.user.save()
+
+        response = self.client.post(self.url, {"start": 10, "end": 5}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_enqueue_job_requires_permission(self):
+        """Test that users who cannot change cables cannot enqueue the job."""
+        with patch.object(LabelCablesJob, "enqueue") as mock_enqueue:
+            response = self.client.post(self.url, {}, format="json")
+
+        self.assertEqual(response.status_code, 403)
+        mock_enqueue.assert_not_called()
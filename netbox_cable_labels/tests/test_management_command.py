@@ -1,10 +1,18 @@
 """Test the generate_labels management command."""
 
+import csv
+import json
+import os
+import tempfile
 from io import StringIO
+from unittest.mock import patch
 
+from core.models import ObjectChange
 from dcim.models import Cable, Device, DeviceRole, DeviceType, Interface, Manufacturer, Rack, Site
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
-from django.test import TestCase
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
 
 
 class GenerateLabelsCommandTestCase(TestCase):
@@ -121,3 +129,128 @@ class GenerateLabelsCommandTestCase(TestCase):
         # Output should be empty or minimal
         output = out.getvalue()
         self.assertNotIn("Successfully updated", output)
+
+    def _create_unlabeled_cables(self, count):
+        """Create `count` cables and clear their labels without firing signals."""
+        cables = []
+        for index in range(count):
+            interface_a = Interface.objects.create(device=self.device_a, name=f"ge{index}", type="1000base-t")
+            interface_b = Interface.objects.create(device=self.device_b, name=f"ge{index}", type="1000base-t")
+            cable = Cable(label="temp", a_terminations=[interface_a], b_terminations=[interface_b])
+            cable.save()
+            cables.append(cable)
+        Cable.objects.filter(pk__in=[cable.pk for cable in cables]).update(label="")
+        return cables
+
+    def test_generate_labels_in_small_batches(self):
+        """Test that every cable is labeled when the batch size is smaller than the queryset."""
+        cables = self._create_unlabeled_cables(3)
+
+        out = StringIO()
+        call_command("generate_labels", batch_size=2, stdout=out)
+
+        for cable in cables:
+            cable.refresh_from_db()
+            self.assertEqual(cable.label, f"#{cable.pk}")
+        self.assertIn("Labeled 3 cable(s)", out.getvalue())
+
+    def test_generate_labels_metrics_summary(self):
+        """Test that a summary of the render metrics is written once labeling is done."""
+        self._create_unlabeled_cables(3)
+
+        out = StringIO()
+        call_command("generate_labels", stdout=out)
+
+        self.assertIn("Rendered 3 label(s)", out.getvalue())
+
+    def test_generate_labels_bypasses_save_signals(self):
+        """Test that labels are written without calling Cable.save()."""
+        self._create_unlabeled_cables(2)
+
+        with patch.object(Cable, "save") as mock_save:
+            call_command("generate_labels", stdout=StringIO())
+
+        mock_save.assert_not_called()
+        self.assertFalse(Cable.objects.filter(label="").exists())
+
+    def test_generate_labels_without_changelog(self):
+        """Test that no change records are created by default."""
+        self._create_unlabeled_cables(2)
+
+        call_command("generate_labels", stdout=StringIO())
+
+        self.assertFalse(ObjectChange.objects.filter(changed_object_type__model="cable").exists())
+
+    def test_generate_labels_with_changelog(self):
+        """Test that one change record per cable is created with --changelog."""
+        user = get_user_model().objects.create(username="labeler")
+        cables = self._create_unlabeled_cables(2)
+
+        call_command("generate_labels", changelog=True, user="labeler", stdout=StringIO())
+
+        changes = ObjectChange.objects.filter(changed_object_type__model="cable", user=user)
+        self.assertEqual(changes.count(), 2)
+        self.assertEqual(len({change.request_id for change in changes}), 1)
+        for cable in cables:
+            change = changes.get(changed_object_id=cable.pk)
+            self.assertEqual(change.prechange_data["label"], "")
+            self.assertEqual(change.postchange_data["label"], f"#{cable.pk}")
+
+    def test_generate_labels_changelog_requires_user(self):
+        """Test that --changelog without --user is rejected."""
+        with self.assertRaises(CommandError):
+            call_command("generate_labels", changelog=True, stdout=StringIO())
+
+    def test_generate_labels_user_requires_changelog(self):
+        """Test that --user without --changelog is rejected rather than ignored."""
+        get_user_model().objects.create(username="labeler")
+
+        with self.assertRaises(CommandError):
+            call_command("generate_labels", user="labeler", stdout=StringIO())
+
+    def test_generate_labels_changelog_unknown_user(self):
+        """Test that an unknown --user is rejected."""
+        with self.assertRaises(CommandError):
+            call_command("generate_labels", changelog=True, user="nobody", stdout=StringIO())
+
+    @override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "{{cable.pk + 'x'}}"}})
+    def test_generate_labels_render_error(self):
+        """Test that a failing template is reported as a CommandError."""
+        self._create_unlabeled_cables(1)
+
+        with self.assertRaises(CommandError):
+            call_command("generate_labels", stdout=StringIO())
+
+    def test_generate_labels_dry_run_jsonl(self):
+        """Test that --dry-run outputs the labels as JSON lines without saving them."""
+        cables = self._create_unlabeled_cables(2)
+
+        out = StringIO()
+        call_command("generate_labels", dry_run=True, stdout=out, stderr=StringIO())
+
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(
+            rows, [{"cable_id": cable.pk, "old_label": "", "new_label": f"#{cable.pk}"} for cable in cables]
+        )
+        self.assertEqual(Cable.objects.filter(label="").count(), 2)
+
+    def test_generate_labels_dry_run_csv_file(self):
+        """Test that --dry-run writes CSV to the --output file."""
+        cables = self._create_unlabeled_cables(3)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "labels.csv")
+            err = StringIO()
+            call_command("generate_labels", dry_run=True, format="csv", output=path, batch_size=2, stderr=err)
+            with open(path, encoding="utf-8", newline="") as csv_file:
+                rows = list(csv.reader(csv_file))
+
+        self.assertEqual(rows[0], ["cable_id", "old_label", "new_label"])
+        self.assertEqual(rows[1:], [[str(cable.pk), "", f"#{cable.pk}"] for cable in cables])
+        self.assertIn("Previewed 3 cable(s)", err.getvalue())
+        self.assertEqual(Cable.objects.filter(label="").count(), 3)
+
+    def test_generate_labels_output_requires_dry_run(self):
+        """Test that --output is rejected without --dry-run."""
+        with self.assertRaises(CommandError):
+            call_command("generate_labels", output="labels.jsonl", stdout=StringIO())
@@ -0,0 +1,83 @@
+"""Test the instrumentation of label rendering."""
+
+from unittest.mock import Mock
+
+from django.test import TestCase, override_settings
+from prometheus_client import REGISTRY, generate_latest
+
+from netbox_cable_labels.metrics import (
+    MODE_LABEL,
+    MODE_PREVIEW,
+    instrument_receiver,
+    metric_value,
+    preview_renders,
+    render_summary,
+)
+from netbox_cable_labels.tests.utils import template_method
+from netbox_cable_labels.utils import clear_template_cache, render_label
+
+
+class RenderMetricsTestCase(TestCase):
+    """Test the metrics recorded when labels are rendered."""
+
+    def setUp(self):
+        """Start from an empty template cache and the current totals of the metrics."""
+        clear_template_cache()
+        self.before = {mode: render_summary(mode=mode) for mode in (MODE_LABEL, MODE_PREVIEW)}
+        self.cable = Mock()
+        self.cable.pk = 1
+
+    def _summary(self, mode=MODE_LABEL):
+        return render_summary(mode) - self.before[mode]
+
+    @override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "#{{ cable.pk }}"}})
+    def test_render_recorded(self):
+        """Test that every render is timed and its queries counted."""
+        render_label(self.cable)
+        render_label(self.cable)
+
+        summary = self._summary()
+        self.assertEqual((summary.renders, summary.queries), (2, 0))
+        self.assertEqual((summary.cache_hits, summary.cache_misses), (1, 1))
+
+    @override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "{{ cable.fail() }}"}})
+    def test_render_error_recorded(self):
+        """Test that failed renders are counted."""
+        self.cable.fail = template_method(side_effect=ValueError)
+
+        with self.assertRaises(ValueError):
+            render_label(self.cable)
+
+        summary = self._summary()
+        self.assertEqual((summary.renders, summary.errors), (1, 1))
+
+    @override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "#{{ cable.pk }}"}})
+    def test_previews_recorded_apart(self):
+        """Test that previewed renders do not count as renders of stored labels."""
+        with preview_renders():
+            render_label(self.cable)
+
+        self.assertEqual(self._summary().renders, 0)
+        self.assertEqual(self._summary(MODE_PREVIEW).renders, 1)
+
+    def test_receiver_timed(self):
+        """Test that instrumented receivers are timed under their name."""
+        before = metric_value("netbox_cable_labels_signal_seconds_count", receiver="handle_test")
+
+        @instrument_receiver
+        def handle_test(**_kwargs):
+            return "done"
+
+        self.assertEqual(handle_test(sender=None), "done")
+        self.assertEqual(metric_value("netbox_cable_labels_signal_seconds_count", receiver="handle_test"), before + 1)
+
+    @override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "#{{ cable.pk }}"}})
+    def test_registered(self):
+        """Test that the metrics are exported by the registry NetBox's /metrics endpoint serves."""
+        render_label(self.cable)
+
+        output = generate_latest(REGISTRY).decode()
+
+        self.assertIn("# TYPE netbox_cable_labels_render_seconds histogram", output)
+        self.assertIn('netbox_cable_labels_render_seconds_count{mode="label"}', output)
+        self.assertIn('netbox_cable_labels_template_cache_lookups_total{mode="label",result="miss"}', output)
@@ -0,0 +1,123 @@
+"""Test labeling cables across several worker processes."""
+
+from concurrent.futures import Future
+from io import StringIO
+from itertools import pairwise
+from unittest.mock import patch
+
+from dcim.models import Cable
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import override_settings
+
+from netbox_cable_labels.bulk import unlabeled_cables
+from netbox_cable_labels.parallel import label_range, partition_pk_range
+from netbox_cable_labels.tests.utils import CableTestCase
+
+
+class InlineExecutor:
+    """Executor running submitted calls immediately in the current process and transaction."""
+
+    def __init__(self, *args, **kwargs):
+        self.initializer = kwargs.get("initializer")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+@patch("netbox_cable_labels.parallel.ProcessPoolExecutor", InlineExecutor)
+class ParallelLabelingTestCase(CableTestCase):
+    """Test the partitioning of cables and the --workers option of generate_labels."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up unlabeled cables."""
+        super().setUpTestData()
+        cls.cables = cls.create_unlabeled_cables(7)
+
+    def test_partition_covers_every_cable(self):
+        """Test that the ranges are contiguous, disjoint and cover every cable."""
+        ranges = partition_pk_range(unlabeled_cables(), 3)
+
+        self.assertEqual(len(ranges), 3)
+        self.assertEqual(ranges[0][0], self.cables[0].pk)
+        self.assertIsNone(ranges[-1][1])
+        for (_start, end), (next_start, _next_end) in pairwise(ranges):
+            self.assertEqual(end + 1, next_start)
+
+    def test_partition_more_parts_than_cables(self):
+        """Test that no more ranges than cables are produced."""
+        self.assertEqual(len(partition_pk_range(unlabeled_cables(), 20)), 7)
+
+    def test_partition_empty_queryset(self):
+        """Test that nothing is partitioned when every cable has a label."""
+        Cable.objects.update(label="set")
+
+        self.assertEqual(partition_pk_range(unlabeled_cables(), 4), [])
+
+    def test_generate_labels_with_workers(self):
+        """Test that every cable is labeled when the work is split across workers."""
+        out = StringIO()
+        call_command("generate_labels", workers=3, batch_size=2, stdout=out)
+
+        for cable in self.cables:
+            cable.refresh_from_db()
+            self.assertEqual(cable.label, f"#{cable.pk}")
+        self.assertIn("Labeled 7 cable(s)", out.getvalue())
+
+    @patch("netbox_cable_labels.sequences.close_reserving_connections")
+    def test_range_closes_reserving_connections(self, mock_close):
+        """Test that a worker closes the connections reserving sequence blocks once its range is labeled."""
+        label_range(self.cables[0].pk, None, 10)
+
+        mock_close.assert_called_once_with()
+
+    @patch("netbox_cable_labels.management.commands.generate_labels.close_reserving_connections")
+    def test_generate_labels_closes_reserving_connections(self, mock_close):
+        """Test that generate_labels closes the connections reserving sequence blocks once the workers are done."""
+        call_command("generate_labels", workers=2, stdout=StringIO())
+
+        mock_close.assert_called_once_with()
+
+    @override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "{{cable.pk + 'x'}}"}})
+    def test_generate_labels_with_workers_reports_errors(self):
+        """Test that errors raised in workers are aggregated into a CommandError."""
+        with self.assertRaises(CommandError):
+            call_command("generate_labels", workers=2, stdout=StringIO())
+
+    @override_settings(
+        PLUGINS_CONFIG={
+            "netbox_cable_labels": {"label_template": "SW", "unique_labels": "global", "on_collision": "fail"}
+        }
+    )
+    def test_range_collision_ends_range(self):
+        """Test that a collision refused by the "fail" policy ends the range with an error instead of raising."""
+        result = label_range(self.cables[0].pk, None, 2)
+
+        self.assertIn('Label "SW"', result.error)
+        self.assertEqual(result.labeled, 0)
+
+    @override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "SW", "unique_labels": "global"}})
+    def test_range_collisions_returned(self):
+        """Test that the collisions reported in a range are returned with its result."""
+        result = label_range(self.cables[0].pk, None, 10)
+
+        self.assertEqual(result.labeled, 7)
+        self.assertEqual(len(result.collisions), 6)
+        self.assertEqual({collision.label for collision in result.collisions}, {"SW"})
+
+    @override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"unique_labels": "site"}})
+    def test_workers_refused_with_unique_labels(self):
+        """Test that --workers is refused when labels must be unique, as workers do not see each other's labels."""
+        with self.assertRaises(CommandError):
+            call_command("generate_labels", workers=2, stdout=StringIO())
+
+        self.assertEqual(Cable.objects.filter(label="").count(), 7)
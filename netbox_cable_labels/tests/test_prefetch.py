@@ -0,0 +1,83 @@
+"""Test the prefetch plans derived from label templates."""
+
+from io import StringIO
+
+from dcim.models import Cable, Rack
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from netbox_cable_labels.analysis import analyze_template
+from netbox_cable_labels.prefetch import build_prefetch_plan, get_prefetch_plan, prefetch_cables
+from netbox_cable_labels.tests.utils import CableTestCase
+
+RACK_TEMPLATE = "{{(cable.a_terminations|first).device.rack.name}}-{{(cable.b_terminations|first).device.name}}"
+
+
+class PrefetchPlanTestCase(TestCase):
+    """Test the mapping of template dependencies to queryset lookups."""
+
+    def test_default_template_needs_no_lookups(self):
+        """Test that the default template does not load any relation."""
+        plan = get_prefetch_plan()
+
+        self.assertEqual(plan.select_related, ())
+        self.assertEqual(plan.get_prefetch_lookups(), [])
+
+    def test_termination_device_relations_are_joined(self):
+        """Test that device relations of terminations are joined through the CableTermination."""
+        plan = build_prefetch_plan(analyze_template(RACK_TEMPLATE))
+
+        self.assertTrue(plan.load_terminations)
+        self.assertEqual(plan.termination_select_related, ("_device", "_device__rack"))
+
+    def test_cable_relations(self):
+        """Test that single-valued relations are joined and multi-valued ones prefetched."""
+        plan = build_prefetch_plan(analyze_template("{{cable.tenant.group.name}}{{cable.tags.all()|join(',')}}"))
+
+        self.assertEqual(plan.select_related, ("tenant__group",))
+        self.assertEqual(plan.prefetch_related, ("tags",))
+        self.assertFalse(plan.load_terminations)
+
+
+@override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": RACK_TEMPLATE}})
+class PrefetchQueriesTestCase(CableTestCase):
+    """Test that rendering with a prefetch plan issues a fixed number of queries."""
+
+    @classmethod
+    def create_devices(cls):
+        """Set up devices in a rack to connect cables to."""
+        rack = Rack.objects.create(name="R1", site=cls.site)
+        return (
+            cls.create_device("Device A", rack=rack, position=1, face="front"),
+            cls.create_device("Device B", rack=rack, position=2, face="front"),
+        )
+
+    def _count_generate_labels_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            call_command("generate_labels", stdout=StringIO())
+        return len(queries)
+
+    def test_query_count_independent_of_cable_count(self):
+        """Test that labeling more cables in one batch does not issue more queries."""
+        self.create_unlabeled_cables(2)
+        small_batch_queries = self._count_generate_labels_queries()
+
+        cables = self.create_unlabeled_cables(6)
+        large_batch_queries = self._count_generate_labels_queries()
+
+        self.assertEqual(small_batch_queries, large_batch_queries)
+        cables[0].refresh_from_db()
+        self.assertEqual(cables[0].label, "R1-Device B")
+
+    def test_prefetched_cables_render_without_queries(self):
+        """Test that termination devices are attached to the prefetched terminations."""
+        self.create_unlabeled_cables(2)
+        cables = list(Cable.objects.all())
+
+        prefetch_cables(cables)
+
+        with self.assertNumQueries(0):
+            for cable in cables:
+                self.assertEqual(cable.a_terminations[0].device.rack.name, "R1")
@@ -0,0 +1,94 @@
+"""Test the regeneration of labels when related objects change."""
+
+from unittest.mock import patch
+
+from dcim.models import Cable, Interface, Rack
+from django.test import override_settings
+
+from netbox_cable_labels.tests.utils import CableTestCase
+
+TEMPLATE = "{{a_rack.name}}-{{a_device.name}}-{{a_term.name}}/{{b_device.name}}-{{b_term.name}}"
+
+
+@override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": TEMPLATE}})
+class RelabelOnChangeTestCase(CableTestCase):
+    """Test that generated labels follow renamed devices, racks and interfaces."""
+
+    @classmethod
+    def create_devices(cls):
+        """Create a device in a rack and another outside of it."""
+        cls.rack = Rack.objects.create(name="R1", site=cls.site)
+        return cls.create_device("SW01", rack=cls.rack), cls.create_device("SW02")
+
+    def setUp(self):
+        """Create two cables labeled from the template."""
+        self.cables = [self.create_cable(f"eth{index}") for index in range(2)]
+
+    def _labels(self):
+        return [Cable.objects.get(pk=cable.pk).label for cable in self.cables]
+
+    def test_rack_rename(self):
+        """Test that renaming a rack regenerates the labels of the cables in it."""
+        self.assertEqual(self._labels(), ["R1-SW01-eth0/SW02-eth0", "R1-SW01-eth1/SW02-eth1"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rack.snapshot()
+            self.rack.name = "R9"
+            self.rack.save()
+
+        self.assertEqual(self._labels(), ["R9-SW01-eth0/SW02-eth0", "R9-SW01-eth1/SW02-eth1"])
+
+    def test_device_rename(self):
+        """Test that renaming a device regenerates the labels of its cables."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.device_b.name = "SW99"
+            self.device_b.save()
+
+        self.assertEqual(self._labels(), ["R1-SW01-eth0/SW99-eth0", "R1-SW01-eth1/SW99-eth1"])
+
+    def test_interface_rename(self):
+        """Test that renaming an interface regenerates the label of its cable."""
+        interface = Interface.objects.get(device=self.device_a, name="eth1")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            interface.snapshot()
+            interface.name = "eth42"
+            interface.save()
+
+        self.assertEqual(self._labels(), ["R1-SW01-eth0/SW02-eth0", "R1-SW01-eth42/SW02-eth1"])
+
+    def test_unread_attribute_change_ignored(self):
+        """Test that changes to attributes the template does not read do not relabel cables."""
+        with patch("netbox_cable_labels.propagation.defer_labels") as mock_defer_labels:
+            self.device_a.snapshot()
+            self.device_a.serial = "ABC123"
+            self.device_a.save()
+
+        mock_defer_labels.assert_not_called()
+
+    def test_unread_object_ignored(self):
+        """Test that changes to objects the template does not read do not relabel cables."""
+        with patch("netbox_cable_labels.propagation.defer_labels") as mock_defer_labels:
+            self.site.name = "Renamed Site"
+            self.site.save()
+
+        mock_defer_labels.assert_not_called()
+
+    def test_edited_label_preserved(self):
+        """Test that labels edited by hand are not regenerated."""
+        Cable.objects.filter(pk=self.cables[0].pk).update(label="Manual")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rack.name = "R9"
+            self.rack.save()
+
+        self.assertEqual(self._labels(), ["Manual", "R9-SW01-eth1/SW02-eth1"])
+
+    @override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": TEMPLATE, "relabel_on_change": False}})
+    def test_disabled(self):
+        """Test that labels are not regenerated when relabel_on_change is disabled."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rack.name = "R9"
+            self.rack.save()
+
+        self.assertEqual(self._labels(), ["R1-SW01-eth0/SW02-eth0", "R1-SW01-eth1/SW02-eth1"])
@@ -0,0 +1,126 @@
+"""Test the stored versions of the label template."""
+
+from io import StringIO
+from unittest.mock import Mock, patch
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from netbox_cable_labels.models import LabelTemplate
+from netbox_cable_labels.registry import STAMP_CACHE_KEY, template_registry
+from netbox_cable_labels.utils import get_template_fingerprint, render_label
+
+
+def _cable(pk):
+    cable = Mock()
+    cable.pk = pk
+    cable.a_terminations, cable.b_terminations = [], []
+    return cable
+
+
+@override_settings(
+    PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "CONF-{{cable.pk}}", "template_check_interval": 60}}
+)
+class TemplateRegistryTestCase(TestCase):
+    """Test that the active template version replaces the configured template."""
+
+    def setUp(self):
+        """Start every test with no loaded version and forget the versions loaded by the test."""
+        template_registry.reset()
+        self.addCleanup(template_registry.reset)
+
+    def _activate(self, template, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            version = LabelTemplate.objects.create(template=template, **kwargs)
+            version.activate()
+        return version
+
+    def test_configured_template_without_active_version(self):
+        """Test that the template of PLUGINS_CONFIG is used until a version is activated."""
+        LabelTemplate.objects.create(template="DB-{{cable.pk}}")
+
+        self.assertEqual(render_label(_cable(1)), "CONF-1")
+
+    def test_activated_version_is_used(self):
+        """Test that activating a version swaps the template and its fingerprint."""
+        before = get_template_fingerprint()
+
+        first = self._activate("V1-{{cable.pk}}")
+        self.assertEqual(render_label(_cable(1)), "V1-1")
+        self._activate("V2-{{cable.pk}}", rules=[{"cable_type": "smf", "template": "FO-{{cable.pk}}"}])
+        self.assertEqual(render_label(_cable(2)), "V2-2")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.activate()
+
+        self.assertEqual(render_label(_cable(3)), "V1-3")
+        self.assertEqual(LabelTemplate.objects.filter(is_active=True).count(), 1)
+        self.assertNotEqual(get_template_fingerprint(), before)
+
+    def test_no_query_per_render(self):
+        """Test that the version is only read again when its stamp changes."""
+        self._activate("V1-{{cable.pk}}")
+        render_label(_cable(1))
+
+        with self.assertNumQueries(0):
+            render_label(_cable(2))
+
+        # Another worker activates a version: only the stamp tells this one
+        LabelTemplate.objects.update(template="V2-{{cable.pk}}")
+        cache.set(STAMP_CACHE_KEY, "other-worker")
+        # The version is read within a savepoint
+        with (
+            override_settings(
+                PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "CONF", "template_check_interval": 0}}
+            ),
+            self.assertNumQueries(3),
+        ):
+            self.assertEqual(render_label(_cable(3)), "V2-3")
+
+    def test_failed_read_keeps_transaction(self):
+        """Test that a failed read of the active version falls back to the configuration, sparing the transaction."""
+
+        def load():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT * FROM netbox_cable_labels_missing")
+
+        with patch.object(template_registry, "load", side_effect=load):
+            self.assertEqual(render_label(_cable(1)), "CONF-1")
+
+        self.assertFalse(LabelTemplate.objects.exists())
+
+    def test_concurrent_versions(self):
+        """Test that a version numbered like one saved concurrently takes the next number."""
+        LabelTemplate.objects.create(template="V1-{{cable.pk}}")
+        stale = [{"version__max": None}, {"version__max": 1}]
+
+        with patch.object(LabelTemplate.objects, "aggregate", side_effect=stale):
+            version = LabelTemplate.objects.create(template="V2-{{cable.pk}}")
+
+        self.assertEqual(version.version, 2)
+
+    def test_validation(self):
+        """Test that versions with an invalid template or invalid rules are rejected."""
+        with self.assertRaises(ValidationError):
+            LabelTemplate(template="{{cable.pk").full_clean(exclude=["version"])
+        with self.assertRaises(ValidationError):
+            LabelTemplate(template="{{cable.pk}}", rules=[{"region": "eu"}]).full_clean(exclude=["version"])
+
+    def test_command(self):
+        """Test that label_template adds, lists and deactivates versions."""
+        out = StringIO()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("label_template", "--set", "CMD-{{cable.pk}}", "--comment", "first", stdout=out)
+        self.assertEqual(render_label(_cable(1)), "CMD-1")
+
+        call_command("label_template", stdout=out)
+        self.assertIn("*    1", out.getvalue())
+        self.assertIn("- first", out.getvalue())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("label_template", "--deactivate", stdout=out)
+        self.assertEqual(render_label(_cable(2)), "CONF-2")
@@ -0,0 +1,121 @@
+"""Test the API endpoint rendering the labels of a selection of cables."""
+
+import json
+
+from core.models import ObjectChange
+from dcim.models import Cable
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from netbox_cable_labels.tests.utils import CableTestCase
+
+
+class RenderLabelsAPITestCase(CableTestCase):
+    """Test RenderLabelsView."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up unlabeled cables, one of them a fiber."""
+        super().setUpTestData()
+        cls.cables = [
+            cls.create_cable(f"eth{index}", label="temp", type=cable_type)
+            for index, cable_type in enumerate(["cat6", "cat6", "smf"])
+        ]
+        Cable.objects.update(label="")
+
+    def setUp(self):
+        """Set up an authenticated API client."""
+        self.user = get_user_model().objects.create(username="testuser", is_superuser=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse("plugins-api:netbox_cable_labels-api:render_labels")
+
+    def _post(self, data):
+        response = self.client.post(self.url, data, format="json")
+        if response.streaming:
+            return response, json.loads(b"".join(response.streaming_content))
+        return response, response.data
+
+    def test_preview_by_id(self):
+        """Test that the labels of the given cables are returned without being stored."""
+        pks = [self.cables[0].pk, self.cables[2].pk]
+
+        response, data = self._post({"cables": pks, "batch_size": 1})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(data["applied"])
+        self.assertEqual([row["cable_id"] for row in data["results"]], pks)
+        self.assertEqual(data["results"][0], {"cable_id": pks[0], "old_label": "", "new_label": f"#{pks[0]}"})
+        self.assertIsNone(data["error"])
+        self.assertEqual(Cable.objects.filter(label="").count(), 3)
+
+    def test_preview_by_filter(self):
+        """Test that cables can be selected with the filters of the cable list."""
+        _response, data = self._post({"filters": {"type": ["smf"]}})
+
+        self.assertEqual([row["cable_id"] for row in data["results"]], [self.cables[2].pk])
+
+    def test_template_override(self):
+        """Test that a template can be previewed without changing the configuration."""
+        _response, data = self._post({"cables": [self.cables[0].pk], "template": "{{a_device.name}}-{{a_term.name}}"})
+
+        self.assertEqual(data["results"][0]["new_label"], "Device A-eth0")
+
+    def test_apply(self):
+        """Test that applied labels are stored and change-logged."""
+        response, data = self._post({"filters": {"type": ["cat6"]}, "apply": True})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(data["applied"])
+        self.assertEqual(len(data["results"]), 2)
+        for cable in self.cables[:2]:
+            cable.refresh_from_db()
+            self.assertEqual(cable.label, f"#{cable.pk}")
+        self.assertEqual(ObjectChange.objects.filter(user=self.user).count(), 2)
+
+    def test_apply_keeps_edited_labels(self):
+        """Test that applying labels skips the labels edited by hand, unless overwrite is set."""
+        Cable.objects.filter(pk=self.cables[0].pk).update(label="EDITED")
+
+        _response, data = self._post({"filters": {"type": ["cat6"]}, "apply": True})
+
+        self.assertEqual([row["cable_id"] for row in data["results"]], [self.cables[1].pk])
+        self.cables[0].refresh_from_db()
+        self.assertEqual(self.cables[0].label, "EDITED")
+
+        _response, data = self._post({"filters": {"type": ["cat6"]}, "apply": True, "overwrite": True})
+
+        self.assertEqual(
+            data["results"][0],
+            {"cable_id": self.cables[0].pk, "old_label": "EDITED", "new_label": f"#{self.cables[0].pk}"},
+        )
+        self.cables[0].refresh_from_db()
+        self.assertEqual(self.cables[0].label, f"#{self.cables[0].pk}")
+
+    def test_invalid_requests(self):
+        """Test that requests without a selection, with an invalid template or applying one are rejected."""
+        for data in (
+            {},
+            {"cables": [self.cables[0].pk], "template": "{{cable.pk"},
+            {"cables": [self.cables[0].pk], "template": "{{cable.pk}}", "apply": True},
+        ):
+            with self.subTest(data=data):
+                response, _data = self._post(data)
+                self.assertEqual(response.status_code, 400)
+
+    def test_render_error(self):
+        """Test that a template failing on the first batch is reported with a 400."""
+        response, _data = self._post({"cables": [self.cables[0].pk], "template": "{{cable.pk / 0}}"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_apply_requires_permission(self):
+        """Test that users who cannot change cables cannot apply labels."""
+        self.user.is_superuser = False
+        self.user.save()
+
+        response, _data = self._post({"cables": [self.cables[0].pk], "apply": True})
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Cable.objects.filter(label="").count(), 3)
@@ -0,0 +1,95 @@
+"""Test the render cache shared by worker processes."""
+
+from unittest.mock import patch
+
+from dcim.models import Cable, Device
+from django.core.cache import cache
+from django.test import override_settings
+
+from netbox_cable_labels.bulk import label_cables, unlabeled_cables
+from netbox_cable_labels.metrics import metric_value
+from netbox_cable_labels.render_cache import is_cacheable
+from netbox_cable_labels.tests.utils import CableTestCase
+
+TEMPLATE = "{{a_device.name}}:{{a_term.name}}"
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": TEMPLATE, "render_cache": True}},
+)
+class RenderCacheTestCase(CableTestCase):
+    """Test that labels rendered from the same values are read from the cache."""
+
+    @classmethod
+    def create_devices(cls):
+        """Create a single device, cables looping between its interfaces."""
+        cls.device = cls.create_device("SW1")
+        return cls.device, cls.device
+
+    def setUp(self):
+        """Start every test with an empty cache, and note the lookups recorded so far."""
+        cache.clear()
+        self.before = self._lookups()
+
+    def _lookups(self):
+        return tuple(
+            metric_value("netbox_cable_labels_render_cache_lookups_total", result=result) for result in ("hit", "miss")
+        )
+
+    def _hits(self):
+        return tuple(value - before for value, before in zip(self._lookups(), self.before, strict=True))
+
+    def test_unchanged_inputs_hit(self):
+        """Test that relabeling a cable whose inputs did not change reads the label from the cache."""
+        cable = self.create_unlabeled_cables(1)[0]
+        list(label_cables(unlabeled_cables()))
+        Cable.objects.filter(pk=cable.pk).update(label="")
+
+        with patch("netbox_cable_labels.bulk.render_label") as mock_render:
+            list(label_cables(unlabeled_cables()))
+
+        mock_render.assert_not_called()
+        cable.refresh_from_db()
+        self.assertEqual(cable.label, "SW1:ge0")
+        self.assertEqual(self._hits(), (1, 1))
+
+    def test_changed_inputs_miss(self):
+        """Test that changing a value the template reads renders the label again."""
+        cable = self.create_unlabeled_cables(1)[0]
+        list(label_cables(unlabeled_cables()))
+        Cable.objects.filter(pk=cable.pk).update(label="")
+        Device.objects.filter(pk=self.device.pk).update(name="SW2")
+
+        list(label_cables(unlabeled_cables()))
+
+        cable.refresh_from_db()
+        self.assertEqual(cable.label, "SW2:ge0")
+        self.assertEqual(self._hits(), (0, 2))
+
+    def test_saved_cable(self):
+        """Test that saving a stored cable looks its label up from the values it reads."""
+        cable = self.create_unlabeled_cables(1)[0]
+        list(label_cables(unlabeled_cables()))
+        cable = Cable.objects.get(pk=cable.pk)
+        cable.label = ""
+
+        cable.save()
+
+        self.assertEqual(cable.label, "SW1:ge0")
+        self.assertEqual(self._hits(), (1, 1))
+
+    def test_uncacheable_templates(self):
+        """Test that templates calling functions or reading whole objects are not cached."""
+        self.assertTrue(is_cacheable(TEMPLATE))
+        self.assertFalse(is_cacheable("{{a_device.name}}-{{next_sequence(a_device.name)}}"))
+        self.assertFalse(is_cacheable("{{a_device}}"))
+
+    @override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": TEMPLATE}})
+    def test_disabled(self):
+        """Test that the cache is not used unless enabled."""
+        self.create_unlabeled_cables(1)
+
+        list(label_cables(unlabeled_cables()))
+
+        self.assertEqual(self._hits(), (0, 0))
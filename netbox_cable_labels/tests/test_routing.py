@@ -0,0 +1,144 @@
+"""Test the selection of label templates by rule."""
+
+from io import StringIO
+from unittest.mock import Mock
+
+from dcim.models import Cable, Site
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from netbox_cable_labels.bulk import iter_label_batches, unlabeled_cables
+from netbox_cable_labels.routing import DispatchTable, TemplateRule
+from netbox_cable_labels.tests.utils import CableTestCase
+from netbox_cable_labels.utils import get_template_fingerprint, render_label
+
+RULES = [
+    {"site": "dc1", "cable_type": ["smf", "mmf"], "template": "DC-FIBER-{{cable.pk}}"},
+    {"site": ["dc1", "dc2"], "template": "DC-{{cable.pk}}"},
+    {"cable_type": "cat6", "template": "CAT6-{{cable.pk}}"},
+]
+
+
+def _table(rules, default="#{{cable.pk}}"):
+    return DispatchTable(default, [TemplateRule.from_setting(index, rule) for index, rule in enumerate(rules)])
+
+
+class DispatchTableTestCase(TestCase):
+    """Test the compilation of template rules into a dispatch table."""
+
+    def test_first_matching_rule_wins(self):
+        """Test that rules are applied in the order they are defined in."""
+        table = _table(RULES)
+
+        self.assertEqual(table.select({"site": "dc1", "cable_type": "smf"}), "DC-FIBER-{{cable.pk}}")
+        self.assertEqual(table.select({"site": "dc1", "cable_type": "cat6"}), "DC-{{cable.pk}}")
+        self.assertEqual(table.select({"site": "campus", "cable_type": "cat6"}), "CAT6-{{cable.pk}}")
+
+    def test_default_template(self):
+        """Test that cables matching no rule are labeled with the label_template setting."""
+        table = _table(RULES)
+
+        self.assertEqual(table.select({"site": "campus", "cable_type": "smf"}), "#{{cable.pk}}")
+        self.assertEqual(table.select({}), "#{{cable.pk}}")
+
+    def test_one_lookup_per_combination_of_keys(self):
+        """Test that rules are indexed by the combination of keys they match on."""
+        table = _table(RULES)
+
+        self.assertEqual(set(table.tables), {("site", "cable_type"), ("site",), ("cable_type",)})
+        self.assertEqual(len(table.tables[("site", "cable_type")]), 2)
+        self.assertEqual(table.keys, {"site", "cable_type"})
+        self.assertEqual(
+            table.templates, ("#{{cable.pk}}", "DC-FIBER-{{cable.pk}}", "DC-{{cable.pk}}", "CAT6-{{cable.pk}}")
+        )
+
+    def test_invalid_rules(self):
+        """Test that invalid rules are reported as configuration errors."""
+        with self.assertRaises(ImproperlyConfigured):
+            _table([{"site": "dc1"}])
+        with self.assertRaises(ImproperlyConfigured):
+            _table([{"region": "eu", "template": "{{cable.pk}}"}])
+
+    @override_settings(
+        PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "{{cable.pk}}", "template_rules": RULES}}
+    )
+    def test_render_label_selects_template(self):
+        """Test that render_label renders the template selected for the cable."""
+        cable = Mock()
+        cable.pk = 7
+        cable.type = "cat6"
+        cable.a_terminations, cable.b_terminations = [], []
+
+        self.assertEqual(render_label(cable), "CAT6-7")
+        self.assertEqual(render_label(cable, "X{{cable.pk}}"), "X7")
+
+    def test_fingerprint_covers_rules(self):
+        """Test that changing a rule changes the template fingerprint."""
+        with override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "{{cable.pk}}"}}):
+            without_rules = get_template_fingerprint()
+        with override_settings(
+            PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "{{cable.pk}}", "template_rules": RULES}}
+        ):
+            with_rules = get_template_fingerprint()
+
+        self.assertNotEqual(without_rules, with_rules)
+
+
+@override_settings(
+    PLUGINS_CONFIG={
+        "netbox_cable_labels": {
+            "label_template": "#{{cable.pk}}",
+            "template_rules": [
+                {"site": "dc1", "template": "DC-{{a_device.name}}-{{a_term.name}}"},
+                {"site": "campus", "template": "CAMPUS-{{cable.pk}}"},
+            ],
+        }
+    }
+)
+class TemplateRoutingTestCase(CableTestCase):
+    """Test that generate_labels labels cables with the template selected for their site."""
+
+    @classmethod
+    def create_devices(cls):
+        """Create one device per site."""
+        cls.devices = {
+            slug: cls.create_device(f"{slug}-sw", site=Site.objects.create(name=slug, slug=slug))
+            for slug in ("dc1", "campus", "other")
+        }
+        return cls.devices["dc1"], cls.devices["campus"]
+
+    def _create_unlabeled_cables(self, slug, count=1):
+        """Create cables between interfaces of the device of a site and clear their labels."""
+        return self.create_unlabeled_cables(count, self.devices[slug], self.devices[slug])
+
+    def test_cable_saved_with_selected_template(self):
+        """Test that cables are labeled with the template selected for them when saved."""
+        cable = self.create_cable("x0", "x1", self.devices["dc1"], self.devices["dc1"])
+
+        self.assertEqual(cable.label, "DC-dc1-sw-x0")
+
+    def test_generate_labels_groups_by_template(self):
+        """Test that every batch is rendered with a single template."""
+        cables = [self._create_unlabeled_cables(slug)[0] for slug in ("dc1", "campus", "other")]
+
+        batches = list(iter_label_batches(unlabeled_cables(), batch_size=10))
+        call_command("generate_labels", stdout=StringIO())
+
+        self.assertEqual([len(batch) for _label_template, batch in batches], [1, 1, 1])
+        labels = [Cable.objects.get(pk=cable.pk).label for cable in cables]
+        self.assertEqual(labels, ["DC-dc1-sw-ge0", f"CAMPUS-{cables[1].pk}", f"#{cables[2].pk}"])
+
+    def test_fixed_query_count_per_batch(self):
+        """Test that selecting templates takes the same number of queries whatever the batch size."""
+        self._create_unlabeled_cables("campus", 2)
+        with CaptureQueriesContext(connection) as small:
+            list(iter_label_batches(unlabeled_cables(), batch_size=100))
+
+        self._create_unlabeled_cables("campus", 8)
+        with CaptureQueriesContext(connection) as large:
+            list(iter_label_batches(unlabeled_cables(), batch_size=100))
+
+        self.assertEqual(len(small), len(large))
@@ -0,0 +1,82 @@
+"""Test the sample cables templates are tried out on."""
+
+from dcim.models import Rack, Site
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from netbox_cable_labels.samples import SampleCache, load_samples, render_samples, sample_cache, sample_pks
+from netbox_cable_labels.tests.utils import CableTestCase
+
+
+class SampleTestCase(CableTestCase):
+    """Test sampling cables and rendering templates for them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up three copper cables in one site and one fiber in another."""
+        super().setUpTestData()
+        cls.cables = [
+            cls.create_cable(f"a{index}", f"b{index}", device, device, type=cable_type)
+            for index, (device, cable_type) in enumerate([(cls.device_a, "cat6")] * 3 + [(cls.device_b, "smf")])
+        ]
+
+    @classmethod
+    def create_devices(cls):
+        """Create a racked device in the sites dc1 and dc2."""
+        devices = []
+        for slug in ("dc1", "dc2"):
+            site = Site.objects.create(name=slug, slug=slug)
+            rack = Rack.objects.create(name=f"{slug}-r1", site=site)
+            devices.append(cls.create_device(f"{slug}-sw", site=site, rack=rack))
+        return tuple(devices)
+
+    def test_stratified_sample(self):
+        """Test that every site and cable type is sampled, up to the number of cables per stratum."""
+        pks = sample_pks(per_stratum=2)
+
+        self.assertEqual(sorted(pks), [self.cables[0].pk, self.cables[1].pk, self.cables[3].pk])
+        self.assertEqual(len(sample_pks(per_stratum=2, limit=2)), 2)
+
+    def test_render_without_queries(self):
+        """Test that templates reading the shortcuts render the loaded sample without queries."""
+        cables = load_samples(sample_pks())
+
+        preview = render_samples(cables, "{{a_site.slug|upper}}-{{a_rack.name}}-{{a_device.name}}-{{a_term.name}}")
+
+        self.assertEqual(preview.queries, 0)
+        self.assertEqual(preview.rows[0].label, "DC1-dc1-r1-dc1-sw-a0")
+        self.assertEqual(preview.error, "")
+
+    def test_render_errors(self):
+        """Test that syntax errors and errors of single labels are reported."""
+        cables = load_samples(sample_pks())
+
+        self.assertTrue(render_samples(cables, "{{cable.pk").error)
+        self.assertTrue(all(row.error for row in render_samples(cables, "{{cable.pk / 0}}").rows))
+
+    def test_sample_cache(self):
+        """Test that samples are loaded once per key until they expire."""
+        cache, loads = SampleCache(maxsize=1), []
+
+        def load():
+            loads.append(1)
+            return []
+
+        cache.get("a", load)
+        cache.get("a", load)
+        cache.get("b", load)
+        cache.get("a", load)
+
+        self.assertEqual(len(loads), 3)
+
+    def test_preview_view(self):
+        """Test that the view renders the edited template for the sample."""
+        user = get_user_model().objects.create(username="testuser", is_superuser=True)
+        self.client.force_login(user)
+        self.addCleanup(sample_cache.clear)
+        url = reverse("plugins:netbox_cable_labels:template_preview")
+
+        response = self.client.get(url, {"template": "X-{{cable.pk}}"}, headers={"HX-Request": "true"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f"X-{self.cables[0].pk}")
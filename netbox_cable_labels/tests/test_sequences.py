@@ -0,0 +1,95 @@
+"""Test the sequence counters available to label templates."""
+
+from unittest.mock import Mock
+
+from django.db import DatabaseError, connection, transaction
+from django.test import TransactionTestCase, override_settings
+
+from netbox_cable_labels.models import LabelSequence
+from netbox_cable_labels.sequences import allocate, close_reserving_connections, discard_blocks, previewing
+from netbox_cable_labels.utils import render_label
+
+
+class SequenceTestCase(TransactionTestCase):
+    """Test the allocation of counter values in blocks, reserved outside of the caller's transaction."""
+
+    def setUp(self):
+        """Start every test without reserved blocks, and close the connections reserving them afterwards."""
+        discard_blocks()
+        self.addCleanup(discard_blocks)
+        self.addCleanup(close_reserving_connections)
+
+    def _stored(self, scope):
+        return LabelSequence.objects.get(scope=scope).value
+
+    def test_values_are_sequential(self):
+        """Test that a counter hands out consecutive values, independently of other scopes."""
+        self.assertEqual([allocate("A", 5) for _ in range(3)], [1, 2, 3])
+        self.assertEqual(allocate("B", 5), 1)
+        self.assertEqual(allocate("A", 5), 4)
+
+    def test_one_reservation_per_block(self):
+        """Test that the counter row is only updated when a block runs out."""
+        values = [allocate("A", 5) for _ in range(7)]
+
+        self.assertEqual(values, list(range(1, 8)))
+        self.assertEqual(self._stored("A"), 10)
+
+    def test_unused_values_are_skipped(self):
+        """Test that values left in a discarded block are never handed out."""
+        allocate("A", 5)
+        discard_blocks()
+
+        self.assertEqual(allocate("A", 5), 6)
+
+    def test_rolled_back_values_are_skipped(self):
+        """Test that a reservation survives the rollback of its transaction, whose values are not reused."""
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.assertEqual(allocate("A", 5), 1)
+            raise RuntimeError
+
+        self.assertEqual(self._stored("A"), 5)
+        self.assertEqual(allocate("A", 5), 2)
+
+    def test_counter_not_locked_by_transaction(self):
+        """Test that reserving a block within a transaction does not keep the counter row locked."""
+        other = connection.copy()
+        self.addCleanup(other.close)
+
+        with transaction.atomic():
+            allocate("A", 5)
+            try:
+                with other.cursor() as cursor:
+                    cursor.execute(
+                        f"SELECT value FROM {LabelSequence._meta.db_table} WHERE scope = %s FOR UPDATE NOWAIT", ["A"]
+                    )
+                    self.assertEqual(cursor.fetchone(), (5,))
+            except DatabaseError:
+                self.fail("The counter row is locked until the transaction ends")
+
+    def test_preview_does_not_reserve(self):
+        """Test that previewed values continue the counter without storing anything."""
+        allocate("A", 5)
+        discard_blocks()
+
+        with previewing() as preview:
+            self.assertEqual([allocate("A", 5), allocate("A", 5)], [6, 7])
+            self.assertEqual(allocate("B", 5), 1)
+        with previewing(preview):
+            self.assertEqual(allocate("A", 5), 8)
+
+        self.assertEqual(self._stored("A"), 5)
+        self.assertFalse(LabelSequence.objects.filter(scope="B").exists())
+
+    @override_settings(
+        PLUGINS_CONFIG={
+            "netbox_cable_labels": {"label_template": "R{{'{:03d}'.format(next_sequence('R'))}}/{{next_sequence('R')}}"}
+        }
+    )
+    def test_template_function(self):
+        """Test that every call of next_sequence in a template takes a new value."""
+        cable = Mock()
+        cable.a_terminations, cable.b_terminations = [], []
+
+        self.assertEqual(render_label(cable), "R001/2")
+        self.assertEqual(render_label(cable), "R003/4")
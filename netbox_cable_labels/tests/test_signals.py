@@ -1,7 +1,14 @@
 """Test signal handlers for automatic cable labeling."""
 
+from unittest.mock import patch
+
 from dcim.models import Cable, Device, DeviceRole, DeviceType, Interface, Manufacturer, Rack, Site
-from django.test import TestCase
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from netbox_cable_labels.signals import handle_cable_label
+from netbox_cable_labels.utils import render_label
 
 
 class CableSignalTestCase(TestCase):
@@ -108,3 +115,111 @@ class CableSignalTestCase(TestCase):
 
         # Check that label was generated
         self.assertEqual(cable.label, f"#{cable.pk}")
+
+    def test_new_cable_labeled_before_insert(self):
+        """Test that a new cable is labeled by pre_save, with its primary key reserved."""
+        cable = Cable(a_terminations=[self.interface_a], b_terminations=[self.interface_b])
+
+        handle_cable_label(instance=cable, using="default")
+
+        self.assertIsNotNone(cable.pk)
+        self.assertEqual(cable.label, f"#{cable.pk}")
+        self.assertFalse(Cable.objects.filter(pk=cable.pk).exists())
+
+    def test_new_cable_written_once(self):
+        """Test that creating a cable issues a single INSERT, and no UPDATE, for the cable and its label."""
+        cable = Cable(a_terminations=[self.interface_a], b_terminations=[self.interface_b])
+
+        with (
+            patch("netbox_cable_labels.signals.render_label", wraps=render_label) as mock_render_label,
+            CaptureQueriesContext(connection) as queries,
+        ):
+            cable.save()
+
+        mock_render_label.assert_called_once()
+        statements = [query["sql"] for query in queries.captured_queries]
+        self.assertEqual(len([sql for sql in statements if sql.startswith('INSERT INTO "dcim_cable"')]), 1)
+        self.assertFalse([sql for sql in statements if sql.startswith('UPDATE "dcim_cable"')])
+        cable.refresh_from_db()
+        self.assertEqual(cable.label, f"#{cable.pk}")
+
+    @override_settings(
+        PLUGINS_CONFIG={
+            "netbox_cable_labels": {
+                "label_template": "{{a_device.name}}:{{a_term.name}}/{{b_device.name}}:{{b_term.name}}"
+            }
+        }
+    )
+    def test_new_cable_labeled_without_pk_reservation(self):
+        """Test that templates not depending on the primary key are rendered before the INSERT."""
+        cable = Cable(a_terminations=[self.interface_a], b_terminations=[self.interface_b])
+
+        with patch("netbox_cable_labels.signals._reserve_pk") as mock_reserve_pk:
+            handle_cable_label(instance=cable, using="default")
+
+        mock_reserve_pk.assert_not_called()
+        self.assertIsNone(cable.pk)
+        self.assertEqual(cable.label, "Device A:eth0/Device B:eth0")
+
+    def test_failed_insert_releases_reserved_pk(self):
+        """Test that saving a cable again after a failed INSERT reserves a new primary key and label."""
+        cable = Cable(a_terminations=[self.interface_a], b_terminations=[self.interface_b])
+
+        with (
+            patch.object(Cable, "_do_insert", side_effect=IntegrityError("Insert failed")),
+            self.assertRaises(IntegrityError),
+            transaction.atomic(),
+        ):
+            cable.save()
+        reserved_pk = cable.pk
+
+        cable.save()
+
+        self.assertNotEqual(cable.pk, reserved_pk)
+        self.assertNotIn("_do_update", cable.__dict__)
+        cable.refresh_from_db()
+        self.assertEqual(cable.label, f"#{cable.pk}")
+
+    def test_new_cable_labeled_after_insert_without_reservation(self):
+        """Test that cables are labeled after the INSERT when the primary key cannot be reserved."""
+        cable = Cable(a_terminations=[self.interface_a], b_terminations=[self.interface_b])
+
+        with patch("netbox_cable_labels.signals._reserve_pk", return_value=False):
+            cable.save()
+
+        self.assertEqual(cable.label, f"#{cable.pk}")
+        cable.refresh_from_db()
+        self.assertEqual(cable.label, f"#{cable.pk}")
+
+    @override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "{{cable.get_type_display()}}"}})
+    def test_unrelated_edit_not_rendered(self):
+        """Test that saving a cable without changing the fields its label reads skips rendering."""
+        cable = Cable(type="cat6", a_terminations=[self.interface_a], b_terminations=[self.interface_b])
+        cable.save()
+        Cable.objects.filter(pk=cable.pk).update(label="")
+        cable = Cable.objects.get(pk=cable.pk)
+
+        cable.snapshot()
+        cable.description = "Patched by hand"
+        with patch("netbox_cable_labels.signals.render_label", wraps=render_label) as mock_render_label:
+            cable.save()
+        mock_render_label.assert_not_called()
+
+        cable.snapshot()
+        cable.type = "cat5e"
+        with patch("netbox_cable_labels.signals.render_label", wraps=render_label) as mock_render_label:
+            cable.save()
+        mock_render_label.assert_called_once()
+        self.assertEqual(cable.label, "CAT5e")
+
+    def test_cleared_label_rendered(self):
+        """Test that clearing the label of a cable regenerates it, even if nothing else changed."""
+        cable = Cable(label="temporary", a_terminations=[self.interface_a], b_terminations=[self.interface_b])
+        cable.save()
+        cable = Cable.objects.get(pk=cable.pk)
+
+        cable.snapshot()
+        cable.label = ""
+        cable.save()
+
+        self.assertEqual(cable.label, f"#{cable.pk}")
@@ -4,6 +4,7 @@ from unittest.mock import Mock
 
 from django.test import TestCase, override_settings
 
+from netbox_cable_labels.tests.utils import template_method
 from netbox_cable_labels.utils import render_label
 
 
@@ -77,10 +78,10 @@ class TIA606CTemplateTestCase(TestCase):
 
         # Create mock terminations manager
         self.mock_a_terminations = Mock()
-        self.mock_a_terminations.first.return_value = self.mock_termination_a
+        self.mock_a_terminations.first = template_method(return_value=self.mock_termination_a)
 
         self.mock_b_terminations = Mock()
-        self.mock_b_terminations.first.return_value = self.mock_termination_b
+        self.mock_b_terminations.first = template_method(return_value=self.mock_termination_b)
 
         # Create mock cable object
         self.mock_cable = Mock()
@@ -179,7 +180,7 @@ class TIA606CTemplateTestCase(TestCase):
         mock_termination_minimal.name = "port1"
 
         mock_terminations = Mock()
-        mock_terminations.first.return_value = mock_termination_minimal
+        mock_terminations.first = template_method(return_value=mock_termination_minimal)
 
         mock_cable_minimal = Mock()
         mock_cable_minimal.pk = 456
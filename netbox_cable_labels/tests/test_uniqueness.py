@@ -0,0 +1,121 @@
+"""Test the detection of duplicate labels."""
+
+from io import StringIO
+
+from dcim.models import Cable, Site
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import override_settings
+
+from netbox_cable_labels.models import LabelFingerprint
+from netbox_cable_labels.tests.utils import CableTestCase
+
+
+def _settings(**settings):
+    config = {"label_template": "{{a_device.name}}", "unique_labels": "global", **settings}
+    return override_settings(PLUGINS_CONFIG={"netbox_cable_labels": config})
+
+
+class LabelUniquenessTestCase(CableTestCase):
+    """Test that generated labels are checked for collisions within their scope."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up one device in each of two sites."""
+        super().setUpTestData()
+        cls.devices = [cls.device_a, cls.device_b]
+
+    @classmethod
+    def create_devices(cls):
+        """Create a device named SW in each of two sites."""
+        return tuple(
+            cls.create_device("SW", site=Site.objects.create(name=f"Site {index}", slug=f"site-{index}"))
+            for index in range(2)
+        )
+
+    def _create_unlabeled_cables(self, device, count):
+        """Create `count` cables between interfaces of `device` and clear their labels without firing signals."""
+        return self.create_unlabeled_cables(count, device, device)
+
+    def _labels(self, cables):
+        return [Cable.objects.get(pk=cable.pk).label for cable in cables]
+
+    @_settings(on_collision="suffix")
+    def test_suffix_policy(self):
+        """Test that colliding labels get a counter suffix, within and across batches."""
+        cables = self._create_unlabeled_cables(self.devices[0], 3)
+
+        call_command("generate_labels", "--batch-size", "2", stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(self._labels(cables), ["SW", "SW-2", "SW-3"])
+        self.assertEqual(set(LabelFingerprint.objects.values_list("scope", flat=True)), {""})
+
+    @_settings(on_collision="report")
+    def test_report_policy(self):
+        """Test that colliding labels are kept and reported in the command summary."""
+        cables = self._create_unlabeled_cables(self.devices[0], 2)
+        err = StringIO()
+
+        call_command("generate_labels", stdout=StringIO(), stderr=err)
+
+        self.assertEqual(self._labels(cables), ["SW", "SW"])
+        self.assertIn(f'Label "SW" of cable #{cables[1].pk} is already used', err.getvalue())
+        self.assertIn("1 label collision(s)", err.getvalue())
+
+    @_settings(on_collision="fail")
+    def test_fail_policy(self):
+        """Test that a collision stops generate_labels, leaving the colliding batch unsaved."""
+        cables = self._create_unlabeled_cables(self.devices[0], 2)
+
+        with self.assertRaisesMessage(CommandError, "is already used"):
+            call_command("generate_labels", "--batch-size", "1", stdout=StringIO())
+
+        self.assertEqual(self._labels(cables), ["SW", ""])
+
+    @_settings(on_collision="suffix", unique_labels="site")
+    def test_site_scope(self):
+        """Test that labels only have to be unique within the site of the cable."""
+        cables = self._create_unlabeled_cables(self.devices[0], 1) + self._create_unlabeled_cables(self.devices[1], 1)
+
+        call_command("generate_labels", stdout=StringIO())
+
+        self.assertEqual(self._labels(cables), ["SW", "SW"])
+        self.assertEqual(
+            set(LabelFingerprint.objects.values_list("scope", flat=True)),
+            {f"site:{device.site_id}" for device in self.devices},
+        )
+
+    @_settings(on_collision="suffix")
+    def test_labels_edited_by_hand_are_ignored(self):
+        """Test that a label generated then edited by hand no longer reserves the generated label."""
+        (first,) = self._create_unlabeled_cables(self.devices[0], 1)
+        call_command("generate_labels", stdout=StringIO())
+        Cable.objects.filter(pk=first.pk).update(label="custom")
+
+        (second,) = self._create_unlabeled_cables(self.devices[0], 1)
+        call_command("generate_labels", stdout=StringIO())
+
+        self.assertEqual(self._labels([second]), ["SW"])
+
+    @_settings(on_collision="suffix")
+    def test_saved_cable(self):
+        """Test that cables labeled when saved are checked for collisions too."""
+        self._create_unlabeled_cables(self.devices[0], 1)
+        call_command("generate_labels", stdout=StringIO())
+
+        cable = self.create_cable("x0", "x1", device_a=self.devices[0], device_b=self.devices[0])
+
+        self.assertEqual(cable.label, "SW-2")
+        self.assertEqual(cable.label_fingerprint.label, "SW-2")
+
+    @_settings(on_collision="suffix")
+    def test_dry_run_reports_resolved_labels(self):
+        """Test that --dry-run previews the labels collisions would be resolved to."""
+        cables = self._create_unlabeled_cables(self.devices[0], 2)
+        out, err = StringIO(), StringIO()
+
+        call_command("generate_labels", "--dry-run", stdout=out, stderr=err)
+
+        self.assertIn('"new_label": "SW-2"', out.getvalue())
+        self.assertIn("1 label collision(s)", err.getvalue())
+        self.assertEqual(self._labels(cables), ["", ""])
@@ -1,10 +1,23 @@
 """Test utility functions for cable label generation."""
 
+import time
 from unittest.mock import Mock
 
+from dcim.models import Site
+from django.db import connection
 from django.test import TestCase, override_settings
+from jinja2.exceptions import SecurityError
 
-from netbox_cable_labels.utils import render_label
+from netbox_cable_labels.context import LabelContext
+from netbox_cable_labels.sandbox import RenderBudgetExceeded, is_allowed_model_attribute
+from netbox_cable_labels.tests.utils import template_method
+from netbox_cable_labels.utils import (
+    clear_template_cache,
+    compile_template,
+    render_label,
+    snapshot_changed,
+    template_cache_info,
+)
 
 
 class RenderLabelTestCase(TestCase):
@@ -61,10 +74,10 @@ class RenderLabelTestCase(TestCase):
         mock_b_termination.device = mock_b_device
 
         mock_a_terminations = Mock()
-        mock_a_terminations.first.return_value = mock_a_termination
+        mock_a_terminations.first = template_method(return_value=mock_a_termination)
 
         mock_b_terminations = Mock()
-        mock_b_terminations.first.return_value = mock_b_termination
+        mock_b_terminations.first = template_method(return_value=mock_b_termination)
 
         mock_cable = Mock()
         mock_cable.a_terminations = mock_a_terminations
@@ -94,3 +107,250 @@ class RenderLabelTestCase(TestCase):
         mock_cable.length = None
         label = render_label(mock_cable)
         self.assertEqual(label, "N/A")
+
+
+class TemplateCacheTestCase(TestCase):
+    """Test the compiled template cache used by render_label."""
+
+    def setUp(self):
+        """Start every test with an empty cache."""
+        clear_template_cache()
+
+    def test_template_compiled_once(self):
+        """Test that repeated renders reuse the compiled template."""
+        mock_cable = Mock()
+        mock_cable.pk = 1
+
+        render_label(mock_cable)
+        render_label(mock_cable)
+        render_label(mock_cable)
+
+        info = template_cache_info()
+        self.assertEqual(info.misses, 1)
+        self.assertEqual(info.hits, 2)
+        self.assertEqual(info.currsize, 1)
+
+    def test_cache_invalidated_on_config_change(self):
+        """Test that changing PLUGINS_CONFIG drops compiled templates."""
+        mock_cable = Mock()
+        mock_cable.pk = 7
+
+        self.assertEqual(render_label(mock_cable), "#7")
+        self.assertEqual(template_cache_info().currsize, 1)
+
+        with override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "C{{cable.pk}}"}}):
+            self.assertEqual(template_cache_info().currsize, 0)
+            self.assertEqual(render_label(mock_cable), "C7")
+
+        self.assertEqual(render_label(mock_cable), "#7")
+
+    def test_compile_template_is_keyed_on_string(self):
+        """Test that distinct template strings get distinct compiled templates."""
+        first = compile_template("{{cable.pk}}")
+        second = compile_template("{{cable.pk}}-x")
+
+        self.assertIsNot(first, second)
+        self.assertIs(compile_template("{{cable.pk}}"), first)
+
+
+class LabelContextTestCase(TestCase):
+    """Test the termination shortcuts passed to templates."""
+
+    def setUp(self):
+        """Set up a mock cable with one termination on each side."""
+        self.mock_rack = Mock()
+        self.mock_rack.name = "R1A"
+
+        self.mock_device_a = Mock()
+        self.mock_device_a.name = "SW01"
+        self.mock_device_a.rack = self.mock_rack
+
+        self.mock_device_b = Mock()
+        self.mock_device_b.name = "SW02"
+
+        self.mock_termination_a = Mock()
+        self.mock_termination_a.name = "gi1"
+        self.mock_termination_a.device = self.mock_device_a
+
+        self.mock_termination_b = Mock()
+        self.mock_termination_b.name = "gi2"
+        self.mock_termination_b.device = self.mock_device_b
+
+        self.mock_a_terminations = Mock()
+        self.mock_a_terminations.first = template_method(return_value=self.mock_termination_a)
+
+        self.mock_cable = Mock()
+        self.mock_cable.pk = 42
+        self.mock_cable.a_terminations = self.mock_a_terminations
+        self.mock_cable.b_terminations = [self.mock_termination_b]
+
+    @override_settings(
+        PLUGINS_CONFIG={
+            "netbox_cable_labels": {
+                "label_template": "{{a_rack.name}}-{{a_device.name}}-{{a_term.name}}/{{b_device.name}}-{{b_term.name}}/{{cable.pk}}"
+            }
+        }
+    )
+    def test_render_with_shortcuts(self):
+        """Test rendering a template using the termination shortcuts."""
+        label = render_label(self.mock_cable)
+
+        self.assertEqual(label, "R1A-SW01-gi1/SW02-gi2/42")
+
+    @override_settings(
+        PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "{{a_term.name}}{{a_term.name}}{{a_device.name}}"}}
+    )
+    def test_shortcuts_resolved_once(self):
+        """Test that a termination is looked up only once per render."""
+        render_label(self.mock_cable)
+
+        self.mock_a_terminations.first.assert_called_once()
+
+    @override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "{{cable.pk}}"}})
+    def test_unused_shortcuts_not_resolved(self):
+        """Test that shortcuts absent from the template are not looked up."""
+        render_label(self.mock_cable)
+
+        self.mock_a_terminations.first.assert_not_called()
+
+    @override_settings(
+        PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "{{b_terms|map(attribute='name')|join(',')}}"}}
+    )
+    def test_all_terminations(self):
+        """Test that every termination of a side is available."""
+        mock_termination = Mock()
+        mock_termination.name = "gi3"
+        self.mock_cable.b_terminations = [self.mock_termination_b, mock_termination]
+
+        self.assertEqual(render_label(self.mock_cable), "gi2,gi3")
+
+    def test_missing_termination(self):
+        """Test that shortcuts of a side without terminations are None."""
+        self.mock_cable.b_terminations = []
+        context = LabelContext(self.mock_cable)
+
+        self.assertIsNone(context.b_term)
+        self.assertIsNone(context.b_device)
+        self.assertIsNone(context.b_site)
+
+
+class SnapshotChangedTestCase(TestCase):
+    """Test the comparison of objects with their pre-change snapshot."""
+
+    def test_without_snapshot(self):
+        """Test that objects without a snapshot are considered changed."""
+        site = Site(name="Site", slug="site")
+
+        self.assertTrue(snapshot_changed(site, {"name"}))
+
+    def test_changed_and_unchanged_attributes(self):
+        """Test that only the given attributes are compared."""
+        site = Site(name="Site", slug="site")
+        site._prechange_snapshot = {"name": "Site", "slug": "site", "description": ""}
+        site.description = "Updated"
+
+        self.assertFalse(snapshot_changed(site, {"name", "slug"}))
+        self.assertTrue(snapshot_changed(site, {"description"}))
+        self.assertTrue(snapshot_changed(site, None))
+
+    def test_unknown_attribute(self):
+        """Test that attributes which are not fields are considered changed."""
+        site = Site(name="Site", slug="site")
+        site._prechange_snapshot = {"name": "Site"}
+
+        self.assertTrue(snapshot_changed(site, {"not_a_field"}))
+
+
+class SandboxedRenderTestCase(TestCase):
+    """Test the limits applied to templates while rendering labels."""
+
+    def setUp(self):
+        """Set up a mock cable and drop previously compiled templates."""
+        clear_template_cache()
+        self.cable = Mock()
+        self.cable.pk = 7
+        self.cable.items = list(range(1000))
+
+    @override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "{{ cable.__class__ }}"}})
+    def test_private_attributes_refused(self):
+        """Test that templates cannot reach private attributes."""
+        with self.assertRaises(SecurityError):
+            render_label(self.cable)
+
+    @override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "{{ cable.delete() }}"}})
+    def test_data_altering_methods_refused(self):
+        """Test that methods flagged as altering data cannot be called."""
+        self.cable.delete.alters_data = True
+
+        with self.assertRaises(SecurityError):
+            render_label(self.cable)
+        self.cable.delete.assert_not_called()
+
+    @override_settings(
+        PLUGINS_CONFIG={
+            "netbox_cable_labels": {
+                "label_template": "{% for item in cable.items %}x{% endfor %}",
+                "max_loop_iterations": 10,
+            }
+        }
+    )
+    def test_loop_iterations_capped(self):
+        """Test that loops running more iterations than allowed are aborted."""
+        with self.assertRaises(RenderBudgetExceeded):
+            render_label(self.cable)
+
+    @override_settings(
+        PLUGINS_CONFIG={
+            "netbox_cable_labels": {
+                "label_template": "{% for item in cable.items[:10] %}{{ item }}{% endfor %}",
+                "max_loop_iterations": 10,
+            }
+        }
+    )
+    def test_loop_within_limit(self):
+        """Test that loops within the limit render normally."""
+        self.assertEqual(render_label(self.cable), "0123456789")
+
+    @override_settings(
+        PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "{{ 'x' * 500 }}", "max_label_length": 100}}
+    )
+    def test_output_length_capped(self):
+        """Test that labels longer than allowed are rejected."""
+        with self.assertRaises(RenderBudgetExceeded):
+            render_label(self.cable)
+
+    @override_settings(
+        PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "{{ cable.count() }}", "render_query_limit": 2}}
+    )
+    def test_query_budget(self):
+        """Test that templates issuing more queries than allowed are aborted."""
+
+        def run_queries():
+            with connection.cursor() as cursor:
+                for _ in range(3):
+                    cursor.execute("SELECT 1")
+
+        self.cable.count = template_method(side_effect=run_queries)
+
+        with self.assertRaises(RenderBudgetExceeded):
+            render_label(self.cable)
+
+    @override_settings(
+        PLUGINS_CONFIG={
+            "netbox_cable_labels": {"label_template": "{{ cable.wait() }}{{ cable.pk }}", "render_timeout": 0.01}
+        }
+    )
+    def test_time_budget(self):
+        """Test that slow templates fail once their time budget is spent."""
+        self.cable.wait = template_method(side_effect=lambda: time.sleep(0.05))
+
+        with self.assertRaises(RenderBudgetExceeded):
+            render_label(self.cable)
+
+    def test_model_attribute_whitelist(self):
+        """Test that only fields, properties and display methods of models are exposed."""
+        self.assertTrue(is_allowed_model_attribute(Site, "name"))
+        self.assertTrue(is_allowed_model_attribute(Site, "pk"))
+        self.assertTrue(is_allowed_model_attribute(Site, "get_status_display"))
+        self.assertFalse(is_allowed_model_attribute(Site, "delete"))
+        self.assertFalse(is_allowed_model_attribute(Site, "_meta"))
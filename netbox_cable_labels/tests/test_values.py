@@ -0,0 +1,128 @@
+"""Test the values-only labeling pipeline."""
+
+from io import StringIO
+
+from dcim.models import Interface, Rack
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from netbox_cable_labels.analysis import analyze_template
+from netbox_cable_labels.bulk import iter_batches, preview_labels, unlabeled_cables
+from netbox_cable_labels.tests.utils import CableTestCase
+from netbox_cable_labels.utils import render_label
+from netbox_cable_labels.values import build_values_plan, get_values_plan, iter_value_batches
+
+RACK_TEMPLATE = "{{a_rack.name}}/{{a_device.name}}:{{a_term.name}}-{{b_device.name}}:{{b_term.name}} {{cable.pk}}"
+
+
+def _plan(label_template):
+    return build_values_plan(analyze_template(label_template))
+
+
+class ValuesPlanTestCase(TestCase):
+    """Test which templates can be rendered from field values."""
+
+    def test_field_paths_are_eligible(self):
+        """Test that fields of the cable, terminations and devices are read as values."""
+        plan = _plan(RACK_TEMPLATE)
+
+        self.assertIsNotNone(plan)
+        self.assertTrue(plan.uses_terminations)
+        self.assertIn("pk", plan.cable.fields)
+        self.assertEqual(plan.device.fields, {"name": "_device__name"})
+        self.assertEqual(plan.device.relations["rack"][0], "_device__rack__pk")
+        self.assertEqual(plan.terminations[Interface].fields, {"name": "name"})
+
+    def test_whole_objects_need_instances(self):
+        """Test that printing a whole related object falls back to model instances."""
+        self.assertIsNone(_plan("{{a_device}}"))
+        self.assertIsNone(_plan("{{a_term}}"))
+        self.assertIsNone(_plan("{{cable.tenant}}"))
+
+    def test_properties_and_multi_valued_relations_need_instances(self):
+        """Test that properties, methods and multi-valued relations fall back to model instances."""
+        self.assertIsNone(_plan("{{cable.get_type_display()}}"))
+        self.assertIsNone(_plan("{{cable.tags.all()|join(',')}}"))
+        self.assertIsNone(_plan("{{a_device.primary_ip}}"))
+
+
+@override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": RACK_TEMPLATE}})
+class ValuesPipelineTestCase(CableTestCase):
+    """Test that labels rendered from values match those rendered from model instances."""
+
+    @classmethod
+    def create_devices(cls):
+        """Set up a device in a rack, and one not racked: its rack is read as None."""
+        rack = Rack.objects.create(name="R1", site=cls.site)
+        return cls.create_device("Device A", rack=rack, position=1, face="front"), cls.create_device("Device B")
+
+    def test_records_have_no_instance_dict(self):
+        """Test that cables, terminations and devices are read as slotted records."""
+        self.create_unlabeled_cables(1)
+
+        (batch,) = iter_value_batches(unlabeled_cables(), get_values_plan(), 10)
+        cable = batch[0]
+
+        for record in (cable, cable.a_terminations[0], cable.a_terminations[0].device):
+            self.assertFalse(hasattr(record, "__dict__"))
+        self.assertIsNone(cable.b_terminations[0].device.rack)
+
+    def test_labels_match_model_instances(self):
+        """Test that the values pipeline renders the same labels as model instances."""
+        self.create_unlabeled_cables(3)
+
+        expected = [render_label(cable) for batch in iter_batches(unlabeled_cables()) for cable in batch]
+        batches = iter_value_batches(unlabeled_cables(), get_values_plan(), 10)
+        from_values = [render_label(cable) for batch in batches for cable in batch]
+
+        self.assertEqual(from_values, expected)
+        self.assertIn("R1/Device A:ge0-Device B:ge0", expected[0])
+
+    def test_fixed_query_count_per_batch(self):
+        """Test that a batch of records is read with the same number of queries whatever its size."""
+        self.create_unlabeled_cables(2)
+        with CaptureQueriesContext(connection) as small:
+            list(preview_labels(unlabeled_cables(), values=True))
+
+        self.create_unlabeled_cables(8)
+        with CaptureQueriesContext(connection) as large:
+            list(preview_labels(unlabeled_cables(), values=True))
+
+        self.assertEqual(len(small), len(large))
+
+    def test_generate_labels_values_only(self):
+        """Test that the command stores labels and fingerprints with --values-only."""
+        cables = self.create_unlabeled_cables(2)
+
+        call_command("generate_labels", "--values-only", stdout=StringIO())
+
+        for cable in cables:
+            cable.refresh_from_db()
+            name = cable.a_terminations[0].name
+            self.assertEqual(cable.label, f"R1/Device A:{name}-Device B:{name} {cable.pk}")
+            self.assertEqual(cable.label_fingerprint.label, cable.label)
+
+    def test_dry_run_values_only(self):
+        """Test that --dry-run --values-only previews the labels without saving them."""
+        (cable,) = self.create_unlabeled_cables(1)
+        out = StringIO()
+
+        call_command("generate_labels", "--dry-run", "--values-only", stdout=out, stderr=StringIO())
+
+        self.assertIn(f"Device B:ge0 {cable.pk}", out.getvalue())
+        cable.refresh_from_db()
+        self.assertEqual(cable.label, "")
+
+    @override_settings(PLUGINS_CONFIG={"netbox_cable_labels": {"label_template": "{{a_device}}"}})
+    def test_template_needing_instances_falls_back(self):
+        """Test that --values-only warns and renders from model instances when the template needs them."""
+        (cable,) = self.create_unlabeled_cables(1)
+        err = StringIO()
+
+        call_command("generate_labels", "--values-only", stdout=StringIO(), stderr=err)
+
+        self.assertIn("needs model instances", err.getvalue())
+        cable.refresh_from_db()
+        self.assertEqual(cable.label, "Device A")
@@ -0,0 +1,93 @@
+"""Fixtures shared by the test cases."""
+
+from unittest.mock import Mock
+
+from dcim.models import Cable, Device, DeviceRole, DeviceType, Interface, Manufacturer, Site
+from django.test import TestCase
+
+
+def _method():
+    """Function template_method() mocks are specced after."""
+
+
+def template_method(**kwargs) -> Mock:
+    """
+    Return a mock of a method templates may call, configured by `kwargs`.
+
+    The sandbox refuses to call objects with a truthy `alters_data` or `unsafe_callable`
+    attribute, which a plain Mock creates on access; specced after a function, this one has neither.
+    """
+    return Mock(spec=_method, **kwargs)
+
+
+class CableTestCase(TestCase):
+    """
+    Base of the test cases labeling cables between the interfaces of two devices.
+
+    Subclasses needing other devices, in racks or other sites for instance, override
+    `create_devices()`.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up a site with two devices to connect cables to."""
+        cls.site = Site.objects.create(name="Test Site", slug="test-site")
+        manufacturer = Manufacturer.objects.create(name="Test Manufacturer", slug="test-manufacturer")
+        cls.device_role = DeviceRole.objects.create(name="Test Role", slug="test-role")
+        cls.device_type = DeviceType.objects.create(manufacturer=manufacturer, model="Test Model", slug="test-model")
+        cls.device_a, cls.device_b = cls.create_devices()
+
+    @classmethod
+    def create_devices(cls) -> tuple[Device, Device]:
+        """Create the devices cables are connected between by default."""
+        return cls.create_device("Device A"), cls.create_device("Device B")
+
+    @classmethod
+    def create_device(cls, name: str, **kwargs) -> Device:
+        """Create a device of the test device type and role, in the test site unless given another."""
+        kwargs.setdefault("site", cls.site)
+        return Device.objects.create(name=name, device_type=cls.device_type, role=cls.device_role, **kwargs)
+
+    @classmethod
+    def create_cable(
+        cls,
+        name_a: str,
+        name_b: str | None = None,
+        device_a: Device | None = None,
+        device_b: Device | None = None,
+        **kwargs,
+    ) -> Cable:
+        """
+        Connect a new interface `name_a` of `device_a` to a new interface `name_b` of `device_b`.
+
+        The devices default to those of the test case and `name_b` to `name_a`. The cable
+        is saved, firing the signals of the plugin; `kwargs` are passed to the Cable.
+        """
+        interface_a = Interface.objects.create(device=device_a or cls.device_a, name=name_a, type="1000base-t")
+        interface_b = Interface.objects.create(
+            device=device_b or cls.device_b, name=name_b or name_a, type="1000base-t"
+        )
+        cable = Cable(a_terminations=[interface_a], b_terminations=[interface_b], **kwargs)
+        cable.save()
+        return cable
+
+    @classmethod
+    def create_unlabeled_cables(
+        cls, count: int, device_a: Device | None = None, device_b: Device | None = None
+    ) -> list[Cable]:
+        """
+        Create `count` cables between new interfaces `ge<n>` and clear their labels without firing signals.
+
+        Both ends of a cable share their interface name, unless both are on the same device.
+        """
+        device_a, device_b = device_a or cls.device_a, device_b or cls.device_b
+        offset = max(Interface.objects.filter(device=device).count() for device in (device_a, device_b))
+        cables = []
+        for index in range(count):
+            if device_a == device_b:
+                names = (f"ge{offset + 2 * index}", f"ge{offset + 2 * index + 1}")
+            else:
+                names = (f"ge{offset + index}", f"ge{offset + index}")
+            cables.append(cls.create_cable(*names, device_a=device_a, device_b=device_b, label="temp"))
+        Cable.objects.filter(pk__in=[cable.pk for cable in cables]).update(label="")
+        return cables
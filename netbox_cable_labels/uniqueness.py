@@ -0,0 +1,174 @@
+"""
+Detection of generated labels which are already used.
+
+With `unique_labels` set to a scope (the whole NetBox, a site or a tenant), every batch of
+generated labels is checked against the other labels of the batch with a set, and against
+the labels generated earlier in the same scope with one query on the (scope, label) index
+of LabelFingerprint. Collisions are handled following `on_collision`.
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from functools import reduce
+from operator import or_
+
+from dcim.models.cables import Cable, CableTermination
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import F, Q
+from utilities.exceptions import AbortRequest
+
+from .models import LabelFingerprint
+from .routing import termination_site
+from .utils import get_plugin_setting
+
+# Values of the `unique_labels` setting: cables whose labels must differ from each other
+SCOPES = ("global", "site", "tenant")
+
+# Values of the `on_collision` setting
+REPORT, SUFFIX, FAIL = "report", "suffix", "fail"
+POLICIES = (REPORT, SUFFIX, FAIL)
+
+
+@dataclass(frozen=True)
+class Collision:
+    """Generated label already used by another cable of its scope."""
+
+    cable_id: int | None
+    label: str
+    scope: str
+    # Label given to the cable instead, with the suffix policy
+    resolved_label: str | None = None
+
+    def __str__(self):
+        scope = f" in {self.scope}" if self.scope else ""
+        message = f'Label "{self.label}" of cable #{self.cable_id} is already used{scope}'
+        return f'{message}, labeled "{self.resolved_label}" instead' if self.resolved_label else message
+
+
+class LabelCollisionError(AbortRequest):
+    """Raised when a generated label is already used in its scope and `on_collision` is "fail"."""
+
+    def __init__(self, collision: Collision):
+        self.collision = collision
+        super().__init__(str(collision))
+
+
+def get_uniqueness_scope() -> str | None:
+    """Return the scope labels must be unique within, or None if uniqueness is not checked."""
+    scope = get_plugin_setting("unique_labels")
+    if scope is not None and scope not in SCOPES:
+        raise ImproperlyConfigured(f"unique_labels must be one of {', '.join(SCOPES)} or None")
+    return scope
+
+
+def get_collision_policy() -> str:
+    """Return how collisions are handled."""
+    policy = get_plugin_setting("on_collision")
+    if policy not in POLICIES:
+        raise ImproperlyConfigured(f"on_collision must be one of {', '.join(POLICIES)}")
+    return policy
+
+
+def cable_scope(cable: Cable) -> str:
+    """Return the uniqueness scope of a cable instance, saved or not, from its in-memory terminations."""
+    scope = get_uniqueness_scope()
+    if scope == "tenant":
+        return f"tenant:{cable.tenant_id or ''}"
+    if scope == "site":
+        site = None
+        for termination in (*cable.a_terminations, *cable.b_terminations):
+            site = termination_site(termination)
+            break
+        return f"site:{site.pk if site is not None else ''}"
+    return ""
+
+
+def cable_scopes(cables: Sequence) -> list[str]:
+    """Return the uniqueness scopes of stored cables, with at most one query."""
+    scope = get_uniqueness_scope()
+    pks = [cable.pk for cable in cables]
+    if scope == "tenant":
+        tenants = dict(Cable.objects.filter(pk__in=pks).values_list("pk", "tenant_id"))
+        return [f"tenant:{tenants.get(pk) or ''}" for pk in pks]
+    if scope == "site":
+        sites: dict[int, int | None] = {}
+        rows = (
+            CableTermination.objects.filter(cable_id__in=pks)
+            .order_by("cable_id", "cable_end", "pk")
+            .values_list("cable_id", "_site_id")
+        )
+        for cable_id, site_id in rows:
+            sites.setdefault(cable_id, site_id)
+        return [f"site:{sites.get(pk) or ''}" for pk in pks]
+    return [""] * len(cables)
+
+
+def _generated_labels(condition: Q, exclude: Sequence[int | None]) -> set[tuple[str, str]]:
+    """Return the (scope, label) pairs of the generated labels matching `condition`, excluding some cables."""
+    return set(
+        LabelFingerprint.objects.filter(condition, cable__label=F("label"))
+        .exclude(cable_id__in=[pk for pk in exclude if pk is not None])
+        .values_list("scope", "label")
+    )
+
+
+def _suffixed(label: str, number: int) -> str:
+    suffix = f"-{number}"
+    return label[: _max_length() - len(suffix)] + suffix
+
+
+def _max_length() -> int:
+    return Cable._meta.get_field("label").max_length
+
+
+def resolve_collisions(
+    pks: Sequence[int | None], labels: Sequence[str], scopes: Sequence[str]
+) -> tuple[list[str], list[Collision]]:
+    """
+    Check the labels of a batch of cables for collisions, and handle them following `on_collision`.
+
+    `pks`, `labels` and `scopes` describe one cable each; empty labels are ignored. The first cable of the batch using
+    a label keeps it. With the "suffix" policy, the next ones get the first free `-2`, `-3`...
+    suffix; with "fail", LabelCollisionError is raised. Returns the labels to store and the
+    collisions found.
+    """
+    labels = list(labels)
+    if get_uniqueness_scope() is None or not labels:
+        return labels, []
+    policy = get_collision_policy()
+    taken = _generated_labels(Q(scope__in=set(scopes), label__in=set(labels)), pks)
+
+    collided = []
+    seen: set[tuple[str, str]] = set()
+    for index, (label, scope) in enumerate(zip(labels, scopes, strict=True)):
+        if not label:
+            continue
+        if (scope, label) in taken or (scope, label) in seen:
+            collided.append(index)
+        else:
+            seen.add((scope, label))
+    if not collided:
+        return labels, []
+    if policy == FAIL:
+        index = collided[0]
+        raise LabelCollisionError(Collision(pks[index], labels[index], scopes[index]))
+    if policy == REPORT:
+        return labels, [Collision(pks[index], labels[index], scopes[index]) for index in collided]
+
+    # Suffixed labels already in use, read with one query for every collided label; the prefix
+    # leaves room for suffixes of up to 10 characters, which may shorten long labels
+    condition = reduce(
+        or_, (Q(scope=scopes[index], label__startswith=labels[index][: _max_length() - 10]) for index in collided)
+    )
+    taken |= _generated_labels(condition, pks)
+    collisions = []
+    for index in collided:
+        scope, number = scopes[index], 2
+        label = _suffixed(labels[index], number)
+        while (scope, label) in taken or (scope, label) in seen:
+            number += 1
+            label = _suffixed(labels[index], number)
+        seen.add((scope, label))
+        collisions.append(Collision(pks[index], labels[index], scope, resolved_label=label))
+        labels[index] = label
+    return labels, collisions
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path("template-preview/", views.TemplatePreviewView.as_view(), name="template_preview"),
+]
@@ -1,15 +1,237 @@
+import hashlib
+import json
+from collections.abc import Callable
+from functools import lru_cache, partial
+
 from dcim.models.cables import Cable
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured, ValidationError
 
 try:
     from netbox.plugins.utils import get_plugin_config
 except ImportError:
     from netbox.plugins import get_plugin_config  # type: ignore
-from jinja2 import BaseLoader, Environment
+from jinja2 import BaseLoader, Template, TemplateSyntaxError, meta, nodes
+
+from . import AutoCableLabelsConfig
+from .context import LabelContext
+from .fastpath import Unsupported, compile_fast_path
+from .metrics import record_render, record_template_cache_lookup
+from .registry import ActiveTemplate, template_registry
+from .routing import DispatchTable, TemplateRule
+from .sandbox import LabelEnvironment, RenderBudget, budget_scope, generate_label
+from .sequences import allocate
+
+# Maximum number of distinct compiled templates kept in memory
+TEMPLATE_CACHE_SIZE = 32
+
+_environment = LabelEnvironment(loader=BaseLoader)  # type: ignore
+
+
+def next_sequence(scope) -> int:
+    """Template function returning the next value of the counter of `scope`, e.g. `next_sequence(a_site.slug)`."""
+    return allocate(str(scope), get_plugin_setting("sequence_block_size"))
+
+
+_environment.globals["next_sequence"] = next_sequence
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_template(label_template: str) -> Template:
+    """Compile a template string, reusing a previously compiled template when possible."""
+    return _environment.compile_template(label_template)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_renderer(label_template: str) -> Callable[[dict, RenderBudget], str]:
+    """
+    Return the function rendering a template string from its variables, within a budget.
+
+    Templates made of attribute paths, filters and simple conditions are rendered by the
+    fast path, bypassing the Jinja2 runtime; others by their compiled Jinja2 template.
+    """
+    template = compile_template(label_template)
+    try:
+        return compile_fast_path(_environment, template, parse_template(label_template))
+    except Unsupported:
+        return partial(generate_label, template)
+
+
+def parse_template(label_template: str) -> nodes.Template:
+    """Parse a template string into its Jinja2 abstract syntax tree."""
+    return _environment.parse(label_template)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def get_template_variables(label_template: str) -> frozenset[str]:
+    """Return the names of the variables a template expects to be given."""
+    return frozenset(meta.find_undeclared_variables(parse_template(label_template)))
+
+
+def get_plugin_setting(name: str):
+    """Return a setting of the plugin from PLUGINS_CONFIG, falling back to its default value."""
+    return get_plugin_config("netbox_cable_labels", name, AutoCableLabelsConfig.default_settings.get(name))
+
+
+def get_active_template() -> ActiveTemplate | None:
+    """Return the active LabelTemplate version, or None if the configured template is used."""
+    return template_registry.get(get_plugin_setting("template_check_interval"))
+
+
+def get_template_source() -> str:
+    """Return the label template string used for cables matching no template rule."""
+    if (active := get_active_template()) is not None:
+        return active.template
+    return get_plugin_setting("label_template")
+
+
+def _serialize_rules(rules) -> str:
+    return json.dumps(rules, sort_keys=True, default=str) if rules else ""
+
+
+def _get_rules_source() -> str:
+    """Return the template rules serialized, or an empty string without rules."""
+    if (active := get_active_template()) is not None:
+        return _serialize_rules(active.rules)
+    return _serialize_rules(get_plugin_setting("template_rules"))
+
+
+@lru_cache(maxsize=8)
+def compile_dispatch_table(label_template: str, rules_source: str) -> DispatchTable:
+    """Compile the template rules serialized in `rules_source` into a dispatch table."""
+    rules = json.loads(rules_source) if rules_source else []
+    if not isinstance(rules, list):
+        raise ImproperlyConfigured("template_rules must be a list")
+    return DispatchTable(label_template, [TemplateRule.from_setting(index, rule) for index, rule in enumerate(rules)])
+
+
+def get_dispatch_table() -> DispatchTable:
+    """Return the dispatch table of the label template and template rules in use."""
+    return compile_dispatch_table(get_template_source(), _get_rules_source())
+
+
+def get_configured_dispatch_table() -> DispatchTable:
+    """Return the dispatch table of the label template and template rules of PLUGINS_CONFIG."""
+    return compile_dispatch_table(
+        get_plugin_setting("label_template"), _serialize_rules(get_plugin_setting("template_rules"))
+    )
+
+
+def validate_template_source(label_template: str, rules):
+    """Raise ValidationError if a template or the template rules selecting templates are invalid."""
+    try:
+        table = compile_dispatch_table(label_template, _serialize_rules(rules))
+        for template in table.templates:
+            compile_template(template)
+    except (ImproperlyConfigured, TemplateSyntaxError) as exc:
+        raise ValidationError(str(exc)) from exc
+
+
+def select_template(cable: Cable) -> str:
+    """Return the template string the configured rules select for a cable."""
+    return get_dispatch_table().select_for(cable)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def template_fingerprint(label_template: str) -> str:
+    """Return a hash identifying the content of a template string."""
+    return hashlib.sha256(label_template.encode()).hexdigest()
+
+
+def get_template_fingerprint() -> str:
+    """
+    Return the hash of the configured label template.
+
+    With template rules or label uniqueness, the hash also covers the rules, every
+    template they select and the uniqueness settings, so that changing any of them
+    makes the labels they generated stale.
+    """
+    parts = [get_template_source()]
+    if rules_source := _get_rules_source():
+        parts.append(rules_source)
+    if unique_labels := get_plugin_setting("unique_labels"):
+        parts += [unique_labels, get_plugin_setting("on_collision")]
+    if len(parts) == 1:
+        return template_fingerprint(parts[0])
+    return template_fingerprint(json.dumps(parts))
+
+
+def get_label_template() -> Template:
+    """Return the compiled version of the configured label template."""
+    return compile_template(get_template_source())
+
+
+def _get_renderer(label_template: str) -> Callable[[dict, RenderBudget], str]:
+    """Return the renderer of a template from the compiled template cache, recording whether it was cached."""
+    misses = compile_renderer.cache_info().misses
+    renderer = compile_renderer(label_template)
+    record_template_cache_lookup(hit=compile_renderer.cache_info().misses == misses)
+    return renderer
+
+
+def template_cache_info():
+    """Return the hit/miss counters of the compiled template cache."""
+    return compile_renderer.cache_info()
+
+
+def clear_template_cache():
+    """Drop every compiled template, forcing the next render to recompile."""
+    compile_renderer.cache_clear()
+    compile_template.cache_clear()
+    compile_dispatch_table.cache_clear()
+    get_template_variables.cache_clear()
+
+
+def get_render_budget() -> RenderBudget:
+    """Return a fresh budget for one render, with the limits configured for the plugin."""
+    return RenderBudget(
+        timeout=get_plugin_setting("render_timeout"),
+        max_queries=get_plugin_setting("render_query_limit"),
+        max_iterations=get_plugin_setting("max_loop_iterations"),
+        max_length=get_plugin_setting("max_label_length"),
+    )
+
+
+def snapshot_changed(instance, attributes) -> bool:
+    """
+    Whether any of `attributes` differs from the pre-change snapshot of a NetBox object.
+
+    `attributes` set to None stands for the whole object. Without a snapshot, or for
+    attributes which are not concrete fields, the object is assumed to have changed.
+    """
+    snapshot = getattr(instance, "_prechange_snapshot", None)
+    if attributes is None or not snapshot:
+        return True
+    for attribute in attributes:
+        try:
+            field = instance._meta.get_field(attribute)
+        except FieldDoesNotExist:
+            return True
+        if not field.concrete or field.name not in snapshot:
+            return True
+        value, previous = field.value_from_object(instance), snapshot[field.name]
+        # Snapshots are serialized to JSON: compare string representations
+        if (value is None) != (previous is None) or str(value) != str(previous):
+            return True
+    return False
+
 
+def render_label(cable: Cable, label_template: str | None = None):
+    """
+    Render a cable label using the template selected for it, or `label_template` if given.
 
-def render_label(cable: Cable):
-    """Render a cable label using the configured template."""
-    label_template = get_plugin_config("netbox_cable_labels", "label_template")
-    env = Environment(loader=BaseLoader)  # type: ignore
-    template = env.from_string(label_template)
-    return template.render(cable=cable)
+    Besides `cable`, the template receives the shortcuts defined by LabelContext
+    (`a_term`, `b_device`, ...). Only the variables it refers to are resolved.
+    The template runs in a sandbox, within the configured render budget, and its
+    cost is recorded in the plugin metrics.
+    """
+    label_template = label_template if label_template is not None else select_template(cable)
+    budget = get_render_budget()
+    failed = True
+    try:
+        with budget_scope(budget):
+            variables = LabelContext(cable).get_variables(get_template_variables(label_template))
+            label = _get_renderer(label_template)({"cable": cable, **variables}, budget)
+        failed = False
+        return label
+    finally:
+        record_render(budget.elapsed, budget.queries, failed)
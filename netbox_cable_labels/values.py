@@ -0,0 +1,260 @@
+"""
+Rendering labels from flat value rows instead of model instances.
+
+For large runs, the fields a template reads are fetched with `values_list()` and wrapped
+in `__slots__` records which mimic the attribute paths of cables, terminations and
+devices. Templates whose paths cannot be mimicked exactly (whole objects, properties,
+methods or multi-valued relations) are rendered from model instances instead.
+"""
+
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import islice
+
+from circuits.models import CircuitTermination
+from dcim.models import (
+    ConsolePort,
+    ConsoleServerPort,
+    Device,
+    FrontPort,
+    Interface,
+    PowerFeed,
+    PowerOutlet,
+    PowerPort,
+    RearPort,
+)
+from dcim.models.cables import Cable, CableTermination
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Case, QuerySet, Value, When
+
+from .analysis import TemplateDependencies, analyze_template, get_template_dependencies
+
+# Models which can be attached to a cable
+TERMINATION_MODELS = (
+    Interface,
+    FrontPort,
+    RearPort,
+    ConsolePort,
+    ConsoleServerPort,
+    PowerPort,
+    PowerOutlet,
+    PowerFeed,
+    CircuitTermination,
+)
+
+
+class Record:
+    """Row of values exposed as attributes. Attributes which were not fetched are missing."""
+
+    __slots__ = ()
+    # Model the record stands for
+    model = None
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__ if hasattr(self, name))
+        return f"<{type(self).__name__} {values}>"
+
+
+class CableRecord(Record):
+    """Record standing for a cable, printed like Cable."""
+
+    __slots__ = ()
+
+    def __str__(self):
+        return self.label or f"#{self.pk}"
+
+
+@dataclass
+class RecordShape:
+    """
+    Attributes of a record and the `values_list()` lookups they are read from.
+
+    Related objects are nested shapes, along with the lookup of their primary key:
+    a null key stands for a missing relation, read as None like on model instances.
+    """
+
+    fields: dict[str, str] = field(default_factory=dict)
+    relations: dict[str, tuple[str, "RecordShape"]] = field(default_factory=dict)
+
+    def lookups(self) -> list[str]:
+        """Return every lookup read by the shape and its relations."""
+        lookups = list(self.fields.values())
+        for pk_lookup, shape in self.relations.values():
+            lookups += [pk_lookup, *shape.lookups()]
+        return list(dict.fromkeys(lookups))
+
+    def add_path(self, model, path: tuple[str, ...], prefix: str = "") -> bool:
+        """
+        Add the attribute path read from instances of `model`.
+
+        Returns False if the path does not end on a concrete field through single-valued relations.
+        """
+        name, rest = path[0], path[1:]
+        if name == "pk":
+            self.fields[name] = f"{prefix}pk"
+            return True
+        try:
+            model_field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        if not model_field.concrete or model_field.many_to_many:
+            return False
+        if model_field.is_relation and name != model_field.attname:
+            if not rest or model_field.related_model is None:
+                return False
+            _, shape = self.relations.setdefault(name, (f"{prefix}{name}__pk", RecordShape()))
+            return shape.add_path(model_field.related_model, rest, f"{prefix}{name}__")
+        # Anything read from the value itself (`name.upper()`, ...) behaves the same on both
+        self.fields[name] = f"{prefix}{name}"
+        return True
+
+    def builder(
+        self, name: str, columns: dict[str, int], base=Record, extra=(), model=None
+    ) -> Callable[[tuple], Record]:
+        """Return a function building records of the shape from rows whose `columns` are indexed by lookup."""
+        record_class = type(name, (base,), {"__slots__": (*self.fields, *self.relations, *extra), "model": model})
+        fields = [(attribute, columns[lookup]) for attribute, lookup in self.fields.items()]
+        relations = [
+            (attribute, columns[pk_lookup], shape.builder(f"{name}_{attribute}", columns))
+            for attribute, (pk_lookup, shape) in self.relations.items()
+        ]
+
+        def build(row: tuple) -> Record:
+            record = record_class()
+            for attribute, column in fields:
+                setattr(record, attribute, row[column])
+            for attribute, column, build_related in relations:
+                setattr(record, attribute, None if row[column] is None else build_related(row))
+            return record
+
+        return build
+
+
+@dataclass
+class ValuesPlan:
+    """Shapes of the records a template is rendered from."""
+
+    cable: RecordShape
+    uses_terminations: bool = False
+    device: RecordShape | None = None
+    terminations: dict[type, RecordShape] = field(default_factory=dict)
+
+
+def _add_termination_path(plan: ValuesPlan, path: tuple[str, ...]) -> bool:
+    if not path:
+        return False
+    if path[0] == "device":
+        # Devices are read through the copy cached on the CableTermination
+        plan.device = plan.device or RecordShape()
+        return bool(path[1:]) and plan.device.add_path(Device, path[1:], "_device__")
+    for model in TERMINATION_MODELS:
+        if hasattr(model, path[0]):
+            shape = plan.terminations.setdefault(model, RecordShape())
+            if not shape.add_path(model, path):
+                return False
+    return True
+
+
+def build_values_plan(dependencies: TemplateDependencies) -> ValuesPlan | None:
+    """Map the attribute paths read by a template to record shapes, or return None if they cannot be mimicked."""
+    plan = ValuesPlan(cable=RecordShape(), uses_terminations=dependencies.uses_terminations)
+    for path in dependencies.paths:
+        if not path:
+            return None
+        if path[0] in ("a_terminations", "b_terminations"):
+            # Termination objects used as a whole cannot be mimicked
+            if not _add_termination_path(plan, path[1:]):
+                return None
+        elif not plan.cable.add_path(Cable, path):
+            return None
+    return plan
+
+
+@lru_cache(maxsize=32)
+def _get_values_plan(dependencies: TemplateDependencies) -> ValuesPlan | None:
+    return build_values_plan(dependencies)
+
+
+def get_values_plan(label_template: str | None = None) -> ValuesPlan | None:
+    """
+    Return the values plan of `label_template`, or of every configured label template.
+
+    Returns None if the template needs model instances.
+    """
+    if label_template is not None:
+        return _get_values_plan(analyze_template(label_template))
+    return _get_values_plan(get_template_dependencies())
+
+
+def _columns(lookups: list[str]) -> dict[str, int]:
+    return {lookup: index for index, lookup in reversed(list(enumerate(lookups)))}
+
+
+def _load_terminations(plan: ValuesPlan, cables: dict[int, CableRecord]):
+    """Attach the A and B side termination records to a batch of cable records."""
+    for cable in cables.values():
+        cable.a_terminations, cable.b_terminations = [], []
+    device_lookups = plan.device.lookups() if plan.device else []
+    lookups = list(
+        dict.fromkeys(["cable_id", "cable_end", "termination_type_id", "termination_id", "_device_id", *device_lookups])
+    )
+    build_device = plan.device.builder("DeviceRecord", _columns(lookups), model=Device) if plan.device else None
+    rows = list(
+        CableTermination.objects.filter(cable_id__in=cables)
+        .order_by("cable_id", "cable_end", "pk")
+        .values_list(*lookups)
+    )
+
+    # Attributes of the termination objects themselves are read once per model
+    termination_values: dict[tuple[int, int], tuple] = {}
+    builders: dict[int, Callable[[tuple], Record]] = {}
+    ids_by_type = defaultdict(list)
+    for row in rows:
+        ids_by_type[row[2]].append(row[3])
+    for type_id, ids in ids_by_type.items():
+        model = ContentType.objects.get_for_id(type_id).model_class()
+        shape = plan.terminations.get(model, RecordShape())
+        model_lookups = list(dict.fromkeys(["pk", *shape.lookups()]))
+        builders[type_id] = shape.builder(
+            f"{model.__name__}Record", _columns(model_lookups), extra=("device",), model=model
+        )
+        if shape.fields or shape.relations:
+            for values in model.objects.filter(pk__in=ids).values_list(*model_lookups):
+                termination_values[type_id, values[0]] = values
+
+    for row in rows:
+        cable_id, cable_end, type_id, termination_id, device_id = row[:5]
+        termination = builders[type_id](termination_values.get((type_id, termination_id), (termination_id,)))
+        if build_device is not None and device_id is not None:
+            termination.device = build_device(row)
+        side = cables[cable_id].a_terminations if cable_end == "A" else cables[cable_id].b_terminations
+        side.append(termination)
+
+
+def iter_value_batches(queryset: QuerySet, plan: ValuesPlan, batch_size: int) -> Iterator[list[CableRecord]]:
+    """
+    Read cables from the queryset as records, in lists of at most `batch_size` items.
+
+    Every batch takes one query for the cables, plus one for their terminations and
+    one per termination model read from, if the template uses terminations.
+    """
+    lookups = list(dict.fromkeys(["pk", "label", *plan.cable.lookups()]))
+    extra = ("a_terminations", "b_terminations") if plan.uses_terminations else ()
+    shape = RecordShape(fields={"pk": "pk", "label": "label", **plan.cable.fields}, relations=plan.cable.relations)
+    build_cable = shape.builder("CableRecord", _columns(lookups), base=CableRecord, extra=extra, model=Cable)
+    rows = queryset.values_list(*lookups).iterator(chunk_size=batch_size)
+    while batch := list(islice(rows, batch_size)):
+        cables = [build_cable(row) for row in batch]
+        if plan.uses_terminations:
+            _load_terminations(plan, {cable.pk: cable for cable in cables})
+        yield cables
+
+
+def update_labels(records: list[Record]):
+    """Write the labels of records with a single UPDATE statement."""
+    Cable.objects.filter(pk__in=[record.pk for record in records]).update(
+        label=Case(*(When(pk=record.pk, then=Value(record.label)) for record in records))
+    )
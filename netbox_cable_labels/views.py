@@ -0,0 +1,37 @@
+from dcim.models import Cable
+from django.contrib.auth.mixins import PermissionRequiredMixin
+from django.shortcuts import render
+from django.views import View
+
+from .samples import load_samples, render_samples, sample_cache, sample_pks
+from .utils import get_template_source
+
+
+class TemplatePreviewView(PermissionRequiredMixin, View):
+    """
+    Render a label template for a sample of cables as it is edited.
+
+    The sample is loaded once per session (see netbox_cable_labels.samples); every edit
+    then only compiles and renders the template. `?refresh` draws a new sample.
+    """
+
+    permission_required = "dcim.view_cable"
+    template_name = "netbox_cable_labels/template_preview.html"
+    results_template_name = "netbox_cable_labels/inc/template_preview_results.html"
+
+    def get_samples(self, request):
+        """Return the sample cables of the session, among the cables the user may view."""
+        key = f"{request.user.pk}:{request.session.session_key}"
+        if "refresh" in request.GET:
+            sample_cache.discard(key)
+        return sample_cache.get(key, lambda: load_samples(sample_pks(Cable.objects.restrict(request.user, "view"))))
+
+    def get(self, request):
+        label_template = request.GET.get("template", get_template_source())
+        context = {
+            "label_template": label_template,
+            "preview": render_samples(self.get_samples(request), label_template),
+        }
+        if request.htmx:
+            return render(request, self.results_template_name, context)
+        return render(request, self.template_name, context)